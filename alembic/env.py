@@ -15,12 +15,19 @@ fileConfig(context.config.config_file_name)
 # Agrega la ruta del proyecto para importar modelos
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Importa la base de los modelos
-from cart.models.cart_models import Base
+# Importa la base y los modelos de la app (main.py), no los del carrito heredado
+from config import STRCNX
+from config.basemodel import Base
+import config.associations  # noqa: F401
+import permisos.model  # noqa: F401
+import roles.model  # noqa: F401
+import usuarios.model  # noqa: F401
+import productos.model  # noqa: F401
+import cart_items.model  # noqa: F401
 
-# Configura la URL de la base de datos (por defecto SQLite local)
+# Configura la URL de la base de datos (por defecto la misma que usa la app)
 config = context.config
-config.set_main_option('sqlalchemy.url', os.getenv('DATABASE_URL', 'sqlite:///./kickshopping.db'))
+config.set_main_option('sqlalchemy.url', os.getenv('DATABASE_URL') or STRCNX)
 
 target_metadata = Base.metadata  # Metadatos de los modelos para migraciones
 
@@ -0,0 +1,155 @@
+"""product catalog schema
+
+Columnas, índices, tablas auxiliares y triggers de `products` que antes se
+creaban al arrancar la app (productos/schema.py):
+
+- `category_key` (completada desde `category`), `effective_price` (columna
+  generada; en SQLite queda VIRTUAL porque ALTER TABLE no agrega STORED),
+  `updated_at` e `image_variants_ready`.
+- Índices (columna de orden, id) de la paginación keyset y de los filtros.
+- Sólo SQLite: índice FTS5 (search.py), conteos de facetas (facets.py),
+  referencias a imágenes (images.py), seguimiento de cambios (exporter.py) y
+  versión del catálogo (catalog_cache.py), con sus triggers.
+
+Es idempotente: bases donde la app ya había creado algo de esto se completan
+sin error. El DDL de los triggers es el de cada módulo (`CREATE ... IF NOT
+EXISTS`); cambiarlo después requiere una revisión nueva que los recree.
+
+Revision ID: 2105dfef153e
+Revises: 76bfceeb7ef1
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from productos.catalog_cache import CATALOG_STATE_DDL
+from productos.exporter import CHANGE_TRACKING_DDL, TIMESTAMP_SQL
+from productos.facets import FACETS_DDL, FACETS_TABLE, normalize_category, rebuild_facets
+from productos.images import IMAGES_DDL, IMAGES_TABLE
+from productos.pricing import EFFECTIVE_PRICE_SQL
+from productos.search import FTS_DDL, FTS_TABLE
+from productos.variants import sync_variant_readiness
+
+
+# revision identifiers, used by Alembic.
+revision = '2105dfef153e'
+down_revision = '76bfceeb7ef1'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_products_category_key', ['category_key']),
+    ('ix_products_price_id', ['price', 'id']),
+    ('ix_products_discount_id', ['discount', 'id']),
+    ('ix_products_name_id', ['name', 'id']),
+    ('ix_products_category_key_price_id', ['category_key', 'price', 'id']),
+    ('ix_products_effective_price_id', ['effective_price', 'id']),
+    ('ix_products_category_key_effective_price_id', ['category_key', 'effective_price', 'id']),
+    ('ix_products_updated_at_id', ['updated_at', 'id']),
+]
+
+TRIGGERS = [
+    'products_fts_ai', 'products_fts_ad', 'products_fts_au',
+    'products_facets_ai', 'products_facets_ad', 'products_facets_au',
+    'products_images_ai', 'products_images_ad', 'products_images_au',
+    'products_variants_ai', 'products_variants_au',
+    'products_touch_ai', 'products_touch_au',
+    'products_version_ai', 'products_version_au', 'products_version_ad',
+]
+
+
+def _add_columns(bind) -> None:
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('products')}
+    if 'category_key' not in columns:
+        op.add_column('products', sa.Column('category_key', sa.String(), nullable=True))
+    if 'effective_price' not in columns:
+        if bind.dialect.name == 'sqlite':
+            op.execute(
+                'ALTER TABLE products ADD COLUMN effective_price FLOAT '
+                f'GENERATED ALWAYS AS ({EFFECTIVE_PRICE_SQL}) VIRTUAL'
+            )
+        else:
+            op.add_column('products', sa.Column(
+                'effective_price', sa.Float(), sa.Computed(EFFECTIVE_PRICE_SQL, persisted=True)
+            ))
+    if 'updated_at' not in columns:
+        op.add_column('products', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    if 'image_variants_ready' not in columns:
+        op.add_column('products', sa.Column(
+            'image_variants_ready', sa.Boolean(), nullable=False, server_default=sa.false()
+        ))
+
+
+def _backfill_category_keys(bind) -> None:
+    rows = bind.execute(sa.text(
+        'SELECT id, category FROM products WHERE category IS NOT NULL AND category_key IS NULL'
+    )).all()
+    if rows:
+        bind.execute(
+            sa.text('UPDATE products SET category_key = :key WHERE id = :id'),
+            [{'id': row.id, 'key': normalize_category(row.category)} for row in rows],
+        )
+
+
+def _create_indexes(bind) -> None:
+    existing = {index['name'] for index in sa.inspect(bind).get_indexes('products')}
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, 'products', columns, unique=False)
+
+
+def _install_sqlite_tables(bind) -> None:
+    tables = set(sa.inspect(bind).get_table_names())
+
+    for statement in FTS_DDL:
+        op.execute(statement)
+    if FTS_TABLE not in tables:
+        op.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    for statement in FACETS_DDL:
+        op.execute(statement)
+    if FACETS_TABLE not in tables:
+        rebuild_facets(bind)
+
+    for statement in IMAGES_DDL:
+        op.execute(statement)
+    image_columns = {column['name'] for column in sa.inspect(bind).get_columns(IMAGES_TABLE)}
+    if 'variants_at' not in image_columns:
+        op.add_column(IMAGES_TABLE, sa.Column('variants_at', sa.TIMESTAMP(), nullable=True))
+    # Variantes generadas antes de que la base las registrara
+    sync_variant_readiness(bind)
+
+    op.execute(f'UPDATE products SET updated_at = {TIMESTAMP_SQL} WHERE updated_at IS NULL')
+    for statement in CHANGE_TRACKING_DDL:
+        op.execute(statement)
+
+    for statement in CATALOG_STATE_DDL:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    _add_columns(bind)
+    _backfill_category_keys(bind)
+    _create_indexes(bind)
+    if bind.dialect.name == 'sqlite':
+        _install_sqlite_tables(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for trigger in TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        for table in ('catalog_state', IMAGES_TABLE, FACETS_TABLE, FTS_TABLE):
+            op.execute(f'DROP TABLE IF EXISTS {table}')
+    existing = {index['name'] for index in sa.inspect(bind).get_indexes('products')}
+    for name, _ in reversed(INDEXES):
+        if name in existing:
+            op.drop_index(name, table_name='products')
+    with op.batch_alter_table('products') as batch:
+        for column in ('image_variants_ready', 'updated_at', 'effective_price', 'category_key'):
+            batch.drop_column(column)
@@ -0,0 +1,62 @@
+"""cart items unique index
+
+Índice único (user_id, product_id) de `cart_items`, que usa el upsert del
+carrito (cart_items/statements.py). Antes de crearlo une los items repetidos
+de un mismo usuario y producto en el de menor id, sumando las cantidades.
+Antes lo hacía la app al arrancar (cart_items/schema.py).
+
+Revision ID: 44d9fc48d016
+Revises: 2105dfef153e
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '44d9fc48d016'
+down_revision = '2105dfef153e'
+branch_labels = None
+depends_on = None
+
+UNIQUE_INDEX_NAME = 'uq_cart_items_user_product'
+
+MERGE_DUPLICATES_SQL = [
+    """
+    UPDATE cart_items SET quantity = (
+        SELECT SUM(COALESCE(dup.quantity, 1)) FROM cart_items AS dup
+        WHERE dup.user_id = cart_items.user_id AND dup.product_id = cart_items.product_id
+    )
+    WHERE id IN (
+        SELECT MIN(id) FROM cart_items
+        WHERE user_id IS NOT NULL AND product_id IS NOT NULL
+        GROUP BY user_id, product_id HAVING COUNT(*) > 1
+    )
+    """,
+    """
+    DELETE FROM cart_items
+    WHERE user_id IS NOT NULL AND product_id IS NOT NULL AND id NOT IN (
+        SELECT MIN(id) FROM cart_items
+        WHERE user_id IS NOT NULL AND product_id IS NOT NULL
+        GROUP BY user_id, product_id
+    )
+    """,
+]
+
+
+def upgrade() -> None:
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('cart_items')}
+    if UNIQUE_INDEX_NAME in existing:
+        return
+    for statement in MERGE_DUPLICATES_SQL:
+        op.execute(statement)
+    op.create_index(UNIQUE_INDEX_NAME, 'cart_items', ['user_id', 'product_id'], unique=True)
+
+
+def downgrade() -> None:
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('cart_items')}
+    if UNIQUE_INDEX_NAME in existing:
+        op.drop_index(UNIQUE_INDEX_NAME, table_name='cart_items')
@@ -0,0 +1,38 @@
+"""permission state
+
+Tabla `permission_state` con la versión de la matriz de permisos
+(permisos/matrix.py): `invalidate()` la incrementa y cada proceso recarga su
+copia cuando la versión que lee de la base cambia.
+
+Revision ID: 9c3e51a7b2d4
+Revises: 44d9fc48d016
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e51a7b2d4'
+down_revision = '44d9fc48d016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if 'permission_state' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    state = op.create_table(
+        'permission_state',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+    )
+    op.bulk_insert(state, [{'id': 1, 'version': 0}])
+
+
+def downgrade() -> None:
+    if 'permission_state' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_table('permission_state')
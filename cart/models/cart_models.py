@@ -4,8 +4,14 @@ Cada clase representa una tabla en la base de datos y define sus relaciones.
 """
 
 from sqlalchemy import Column, Integer, String, Float, ForeignKey  # Importa tipos y claves foráneas
-from sqlalchemy.orm import relationship  # Importa para definir relaciones entre tablas
-from config.basemodel import Base  # Importa la base declarativa
+from sqlalchemy.orm import DeclarativeBase, relationship  # Base declarativa y relaciones entre tablas
+
+
+class Base(DeclarativeBase):
+    """
+    Base propia del carrito heredado: su tabla 'products' no es la de
+    productos/model.py, así que no comparten metadata con config.basemodel.
+    """
 
 class Product(Base):
     """
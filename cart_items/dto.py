@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
+from config.cart import CART_BATCH_MAX_OPERATIONS
 
 
 class CartItemBase(BaseModel):
@@ -45,6 +46,59 @@ class CartItemOut(CartItemBase):
         }
 
 
+class CartBatchOperation(BaseModel):
+    op: Literal["add", "set", "remove"] = Field(..., description="add suma, set fija la cantidad (0 quita), remove quita")
+    product_id: int = Field(..., gt=0, description="ID del producto")
+    quantity: Optional[int] = Field(None, ge=0, description="Cantidad a sumar (add, por defecto 1) o a fijar (set)")
+
+    @model_validator(mode="after")
+    def check_quantity(self):
+        if self.op == "add":
+            if self.quantity is None:
+                self.quantity = 1
+            elif self.quantity == 0:
+                raise ValueError("add requiere una cantidad mayor a 0")
+        elif self.op == "set" and self.quantity is None:
+            raise ValueError("set requiere una cantidad")
+        return self
+
+
+class CartBatchRequest(BaseModel):
+    operations: List[CartBatchOperation] = Field(..., min_length=1, max_length=CART_BATCH_MAX_OPERATIONS)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "operations": [
+                    {"op": "add", "product_id": 1, "quantity": 2},
+                    {"op": "set", "product_id": 2, "quantity": 5},
+                    {"op": "remove", "product_id": 3}
+                ]
+            }
+        }
+
+
+class CartSummaryOut(BaseModel):
+    user_id: int
+    line_count: int = Field(..., description="Productos distintos en el carrito")
+    item_count: int = Field(..., description="Unidades en el carrito")
+    subtotal: float = Field(..., description="Total a precio de lista")
+    discount_total: float = Field(..., description="Descuento aplicado")
+    grand_total: float = Field(..., description="Total a pagar (precio efectivo)")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "user_id": 1,
+                "line_count": 2,
+                "item_count": 3,
+                "subtotal": 450.0,
+                "discount_total": 45.0,
+                "grand_total": 405.0
+            }
+        }
+
+
 # DTOs con información extendida incluyendo detalles del usuario y producto
 class UserSimple(BaseModel):
     usu_id: int
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from config.basemodel import Base
 
@@ -9,6 +9,11 @@ class CartItem(Base):
     user_id = Column(Integer, ForeignKey("usuarios.usu_id"))
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, default=1)
+
+    # Un solo item por producto y usuario: agregar suma la cantidad (statements.py)
+    __table_args__ = (
+        Index("uq_cart_items_user_product", "user_id", "product_id", unique=True),
+    )
     
     # Relaciones
     user = relationship("Usuario", lazy="joined")
@@ -0,0 +1,77 @@
+"""
+Vista del carrito de un usuario con proyección de columnas.
+
+Se leen sólo las columnas que necesita `CartItemOutDetailed`: el usuario una
+vez y los items con su producto en una consulta (`cart_items LEFT JOIN
+products`). Las filas se convierten directo a dicts con la forma de la
+respuesta, sin hidratar objetos del ORM ni repetir la fila del usuario en
+cada item. Todos los items comparten el mismo dict de usuario.
+"""
+from typing import List, Tuple
+
+from sqlalchemy import bindparam, delete, select
+
+from productos.model import Product
+from usuarios.model import Usuario
+from .model import CartItem
+
+_items = CartItem.__table__
+_products = Product.__table__
+_users = Usuario.__table__
+
+USER_QUERY = select(_users.c.usu_id, _users.c.usu_usuario, _users.c.usu_nombre_completo).where(
+    _users.c.usu_id == bindparam("user_id")
+)
+
+ITEMS_QUERY = (
+    select(
+        _items.c.id, _items.c.user_id, _items.c.product_id, _items.c.quantity,
+        _products.c.id.label("p_id"), _products.c.name.label("p_name"), _products.c.price.label("p_price"),
+        _products.c.image_url.label("p_image_url"), _products.c.description.label("p_description"),
+        _products.c.discount.label("p_discount"),
+    )
+    .select_from(_items.outerjoin(_products, _products.c.id == _items.c.product_id))
+    .where(_items.c.user_id == bindparam("user_id"))
+    .order_by(_items.c.id)
+)
+
+DELETE_ITEMS = delete(_items).where(_items.c.id.in_(bindparam("ids", expanding=True)))
+
+
+def read_user_cart(conn, user_id: int) -> Tuple[List[dict], List[int]]:
+    """
+    Items del carrito en la forma de `CartItemOutDetailed` e ids de los items
+    cuyo producto ya no existe (que no se incluyen).
+    """
+    user_row = conn.execute(USER_QUERY, {"user_id": user_id}).first()
+    user = dict(user_row._mapping) if user_row is not None else None
+
+    items: List[dict] = []
+    orphans: List[int] = []
+    for row in conn.execute(ITEMS_QUERY, {"user_id": user_id}):
+        if row.p_id is None:
+            orphans.append(row.id)
+            continue
+        items.append({
+            "id": row.id,
+            "user_id": row.user_id,
+            "product_id": row.product_id,
+            "quantity": row.quantity,
+            "user": user,
+            "product": {
+                "id": row.p_id,
+                "name": row.p_name,
+                "price": row.p_price,
+                "image_url": row.p_image_url,
+                "description": row.p_description,
+                "discount": row.p_discount if row.p_discount is not None else 0.0,
+            },
+        })
+    return items, orphans
+
+
+def delete_items(conn, item_ids: List[int]) -> int:
+    """Borrar items por id (p.ej. los que quedaron sin producto)"""
+    if not item_ids:
+        return 0
+    return conn.execute(DELETE_ITEMS, {"ids": item_ids}).rowcount
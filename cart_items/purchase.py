@@ -5,6 +5,8 @@ from typing import List
 class PurchaseItemOut(BaseModel):
     product_name: str
     quantity: int
+    list_price: float
+    discount: float = 0.0
     unit_price: float
     total: float
 
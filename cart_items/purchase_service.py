@@ -6,6 +6,8 @@ from datetime import datetime
 from usuarios.model import Usuario
 import uuid
 from .email import send_purchase_ticket_email
+from productos.pricing import effective_price
+from .summary import summary_cache
 
 def generate_purchase_ticket(user_id: int):
     """
@@ -40,13 +42,19 @@ def generate_purchase_ticket(user_id: int):
             if not item.product:
                 continue
 
-            # Usar los campos del modelo Product (name, price)
-            unit_price = getattr(item.product, 'price', None) or getattr(item.product, 'precio', 0.0)
+            # Se cobra el precio efectivo (con descuento), el mismo que muestra el catálogo
+            list_price = getattr(item.product, 'price', None) or getattr(item.product, 'precio', 0.0)
+            discount = getattr(item.product, 'discount', None) or 0.0
+            unit_price = getattr(item.product, 'effective_price', None)
+            if unit_price is None:
+                unit_price = effective_price(list_price, discount)
             product_name = getattr(item.product, 'name', None) or getattr(item.product, 'nombre', 'Producto')
-            item_total = (item.quantity or 0) * (unit_price or 0.0)
+            item_total = round((item.quantity or 0) * (unit_price or 0.0), 2)
             ticket_items.append({
                 "product_name": product_name,
                 "quantity": item.quantity,
+                "list_price": list_price,
+                "discount": discount,
                 "unit_price": unit_price,
                 "total": item_total
             })
@@ -58,7 +66,7 @@ def generate_purchase_ticket(user_id: int):
             # serializar fecha a ISO para que el frontend la entienda sin problemas
             "purchase_date": datetime.now().isoformat(),
             "items": ticket_items,
-            "total_amount": total_amount,
+            "total_amount": round(total_amount, 2),
             "user_id": getattr(user, 'usu_id', None) or getattr(user, 'user_id', None),
             "user_name": getattr(user, 'usu_nombre_completo', None) or getattr(user, 'usu_usuario', None)
         }
@@ -68,6 +76,7 @@ def generate_purchase_ticket(user_id: int):
             db.delete(item)
         
         db.commit()
+        summary_cache.invalidate(user_id)
         # Intentar enviar el ticket por email a los destinatarios configurados.
         try:
             send_purchase_ticket_email(ticket)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Request
+from fastapi.responses import JSONResponse
 from typing import List
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from .dto import CartItemCreate, CartItemOut, CartItemUpdate, CartItemOutDetailed
+from .dto import CartItemCreate, CartItemOut, CartItemUpdate, CartItemOutDetailed, CartBatchRequest, CartSummaryOut
 from .purchase import PurchaseTicket
 from .purchase_service import generate_purchase_ticket
 import logging
 from middlewares.cart_auth import verify_token_and_permissions
+from config.fast_json import FastJSON
 
 logger = logging.getLogger(__name__)
 from .services import (
@@ -13,6 +15,8 @@ from .services import (
     get_cart_items_by_user,
     get_cart_item_by_id,
     create_cart_item,
+    apply_cart_batch,
+    get_cart_summary,
     update_cart_item,
     update_cart_item_quantity,
     delete_cart_item,
@@ -20,6 +24,7 @@ from .services import (
 )
 
 cart_items = APIRouter()
+fast_json = FastJSON("cart_items")
 
 
 
@@ -27,7 +32,7 @@ cart_items = APIRouter()
 def get_cart_items():
     """Obtener todos los elementos del carrito"""
     try:
-        return get_all_cart_items()
+        return fast_json.respond(List[CartItemOut], get_all_cart_items())
     except SQLAlchemyError:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -46,40 +51,29 @@ def get_user_cart(user_id: int):
     try:
         if user_id <= 0:
             return []
-        cart_items_list = get_cart_items_by_user(user_id)
-        result = []
-        for item in cart_items_list:
-            user = None
-            if hasattr(item, 'user') and item.user:
-                user = {
-                    'usu_id': getattr(item.user, 'usu_id', None),
-                    'usu_usuario': getattr(item.user, 'usu_usuario', None),
-                    'usu_nombre_completo': getattr(item.user, 'usu_nombre_completo', None)
-                }
-            product = None
-            if hasattr(item, 'product') and item.product:
-                product = {
-                    'id': getattr(item.product, 'id', None),
-                    'name': getattr(item.product, 'name', None),
-                    'price': getattr(item.product, 'price', None),
-                    'image_url': getattr(item.product, 'image_url', None),
-                    'description': getattr(item.product, 'description', None),
-                    'discount': getattr(item.product, 'discount', 0.0)
-                }
-            result.append({
-                'id': item.id,
-                'user_id': item.user_id,
-                'product_id': item.product_id,
-                'quantity': item.quantity,
-                'user': user,
-                'product': product
-            })
-        return result
+        return fast_json.respond(List[CartItemOutDetailed], get_cart_items_by_user(user_id))
     except Exception:
         # Si hay cualquier error, devolver array vacío
         return []
 
 
+@cart_items.get('/me/summary', response_model=CartSummaryOut, status_code=status.HTTP_200_OK)
+def get_my_cart_summary(payload: dict = Depends(verify_token_and_permissions)):
+    """Cantidad de items, subtotal, descuento y total del carrito del usuario autenticado"""
+    try:
+        return get_cart_summary(payload['user_id'])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al calcular el resumen del carrito"
+        )
+
+
 @cart_items.get('/{cart_item_id}', response_model=CartItemOut, status_code=status.HTTP_200_OK)
 def get_cart_item(cart_item_id: int):
     """Obtener un elemento del carrito por ID"""
@@ -131,7 +125,7 @@ def post_cart_item(cart_item: CartItemCreate):
             )
         
         result = create_cart_item(cart_item)
-        logger.info(f"Elemento agregado exitosamente al carrito: {result.__dict__}")
+        logger.info(f"Elemento agregado exitosamente al carrito: {result}")
         return result
     except HTTPException as he:
         logger.error(f"Error HTTP al crear elemento del carrito: {str(he)}")
@@ -162,6 +156,23 @@ def post_cart_item(cart_item: CartItemCreate):
         )
 
 
+@cart_items.post('/batch', response_model=List[CartItemOut], status_code=status.HTTP_200_OK)
+def post_cart_batch(batch: CartBatchRequest, payload: dict = Depends(verify_token_and_permissions)):
+    """Aplicar varias operaciones (add, set, remove) al carrito del usuario autenticado y devolverlo"""
+    try:
+        return fast_json.respond(List[CartItemOut], apply_cart_batch(payload['user_id'], batch))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al aplicar las operaciones del carrito"
+        )
+
+
 @cart_items.patch('/{cart_item_id}', response_model=CartItemOut, status_code=status.HTTP_200_OK)
 def patch_cart_item(cart_item_id: int, update_data: CartItemUpdate):
     """Actualizar campos de un elemento del carrito existente"""
@@ -234,7 +245,11 @@ def decrement_quantity(cart_item_id: int):
         
         cart_item = update_cart_item_quantity(cart_item_id, increment=False)
         if cart_item is None:
-            return {"detail": f"Elemento del carrito con ID {cart_item_id} eliminado por cantidad 0"}
+            # Fuera del response_model: el item ya no existe
+            return JSONResponse(
+                status_code=status.HTTP_200_OK,
+                content={"detail": f"Elemento del carrito con ID {cart_item_id} eliminado por cantidad 0"}
+            )
         return cart_item
     except HTTPException:
         raise
@@ -0,0 +1,24 @@
+"""
+Verificación del esquema de `cart_items` al arrancar.
+
+El upsert de statements.py necesita el índice único (user_id, product_id):
+sin él los items repetidos volverían a aparecer. `create_all` lo crea en
+bases nuevas; en bases existentes lo crea la migración 44d9fc48d016
+(`alembic upgrade head`), que antes une los items repetidos. Si falta, el
+arranque se corta.
+"""
+from sqlalchemy import inspect
+
+from .statements import UNIQUE_INDEX_NAME
+
+
+def check_cart_schema(engine) -> None:
+    """Error si `cart_items` no tiene la restricción única del carrito"""
+    inspector = inspect(engine)
+    unique_columns = [
+        index["column_names"] for index in inspector.get_indexes("cart_items") if index.get("unique")
+    ] + [constraint["column_names"] for constraint in inspector.get_unique_constraints("cart_items")]
+    if ["user_id", "product_id"] not in unique_columns:
+        raise RuntimeError(
+            f"Falta el índice único {UNIQUE_INDEX_NAME} de cart_items: correr `alembic upgrade head`"
+        )
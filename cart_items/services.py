@@ -1,8 +1,18 @@
-from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from config.cnx import SessionLocal
 from .model import CartItem
-from .dto import CartItemCreate, CartItemUpdate
+from .dto import CartItemCreate, CartItemUpdate, CartBatchRequest
+from .statements import (
+    add_item,
+    apply_operations,
+    decrement_item,
+    increment_item,
+    read_item,
+    set_item_quantity,
+)
+from .summary import read_summary, summary_cache
+from .projection import delete_items, read_user_cart
+from productos.catalog_cache import catalog_version
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -26,40 +36,31 @@ def get_all_cart_items():
 
 
 def get_cart_items_by_user(user_id: int):
-    """Obtener todos los elementos del carrito de un usuario específico"""
+    """Carrito de un usuario con usuario y producto, ya en la forma de CartItemOutDetailed"""
     db = None
     try:
         if user_id <= 0:
             raise ValueError("ID de usuario inválido")
 
         db = SessionLocal()
-        # Usar joinedload para cargar los productos y usuarios eficientemente
-        cart_items = (
-            db.query(CartItem)
-            .options(joinedload(CartItem.product))  # Cargar productos en una sola consulta
-            .options(joinedload(CartItem.user))     # Cargar usuarios en una sola consulta
-            .filter(CartItem.user_id == user_id)
-            .all()
-        )
-        
-        # Verificar que todos los items tengan sus productos asociados
-        valid_items = []
-        for item in cart_items:
-            if item.product:
-                valid_items.append(item)
-            else:
-                logger.warning(f"Item de carrito {item.id} sin producto asociado, eliminando...")
-                db.delete(item)
-        
-        if len(valid_items) != len(cart_items):
+        # Proyección de columnas: el usuario una vez y los items con su producto en otra consulta
+        cart_items, orphans = read_user_cart(db, user_id)
+
+        # Los items cuyo producto ya no existe se eliminan
+        if orphans:
+            logger.warning(f"Items de carrito {orphans} sin producto asociado, eliminando...")
+            delete_items(db, orphans)
             db.commit()
-            logger.info(f"Se eliminaron {len(cart_items) - len(valid_items)} items inválidos del carrito")
-        
-        logger.info(f"Se obtuvieron {len(valid_items)} elementos válidos del carrito para el usuario {user_id}")
-        return valid_items
+            summary_cache.invalidate(user_id)
+            logger.info(f"Se eliminaron {len(orphans)} items inválidos del carrito")
+
+        logger.info(f"Se obtuvieron {len(cart_items)} elementos válidos del carrito para el usuario {user_id}")
+        return cart_items
     except ValueError:
         raise
     except SQLAlchemyError as e:
+        if db:
+            db.rollback()
         logger.error(f"Error de base de datos al obtener carrito del usuario {user_id}: {str(e)}")
         raise SQLAlchemyError("Error al acceder a la base de datos")
     finally:
@@ -94,44 +95,24 @@ def get_cart_item_by_id(cart_item_id: int):
 
 
 def create_cart_item(cart_item_data: CartItemCreate):
-    """Crear un nuevo elemento del carrito"""
+    """Agregar un producto al carrito o sumar la cantidad si ya estaba (un solo upsert)"""
     db = None
     try:
         db = SessionLocal()
 
-        # Verificar si ya existe un item del mismo producto para el mismo usuario
-        existing_item = (
-            db.query(CartItem)
-            .options(joinedload(CartItem.product))
-            .options(joinedload(CartItem.user))
-            .filter(
-                CartItem.user_id == cart_item_data.user_id,
-                CartItem.product_id == cart_item_data.product_id
-            )
-            .first()
+        cart_item = add_item(
+            db.connection(),
+            CartItem.__table__,
+            db.get_bind().dialect.name,
+            cart_item_data.user_id,
+            cart_item_data.product_id,
+            cart_item_data.quantity,
         )
+        db.commit()
+        summary_cache.invalidate(cart_item_data.user_id)
 
-        if existing_item:
-            # Si ya existe, actualizar la cantidad
-            existing_item.quantity += cart_item_data.quantity
-            db.commit()
-            db.refresh(existing_item)
-            logger.info(f"Actualizada cantidad del elemento existente: ID {existing_item.id}, Nueva cantidad: {existing_item.quantity}")
-            return existing_item
-        else:
-            # Si no existe, crear nuevo elemento
-            cart_item = CartItem(
-                user_id=cart_item_data.user_id,
-                product_id=cart_item_data.product_id,
-                quantity=cart_item_data.quantity,
-            )
-
-            db.add(cart_item)
-            db.commit()
-            db.refresh(cart_item)
-
-            logger.info(f"Elemento del carrito creado exitosamente: ID {cart_item.id}")
-            return cart_item
+        logger.info(f"Elemento del carrito guardado: ID {cart_item['id']}, cantidad: {cart_item['quantity']}")
+        return cart_item
 
     except ValueError:
         if db:
@@ -152,8 +133,36 @@ def create_cart_item(cart_item_data: CartItemCreate):
             db.close()
 
 
+def apply_cart_batch(user_id: int, batch: CartBatchRequest):
+    """Aplicar un lote de operaciones al carrito del usuario en una sola transacción"""
+    db = None
+    try:
+        if user_id <= 0:
+            raise ValueError("ID de usuario inválido")
+
+        db = SessionLocal()
+        cart = apply_operations(db.connection(), CartItem.__table__, db.get_bind().dialect.name, user_id, batch.operations)
+        db.commit()
+        summary_cache.invalidate(user_id)
+
+        logger.info(f"Lote de {len(batch.operations)} operaciones aplicado al carrito del usuario {user_id}: {len(cart)} elementos")
+        return cart
+    except ValueError:
+        if db:
+            db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        if db:
+            db.rollback()
+        logger.error(f"Error de base de datos al aplicar lote al carrito del usuario {user_id}: {str(e)}")
+        raise SQLAlchemyError("Error al acceder a la base de datos")
+    finally:
+        if db:
+            db.close()
+
+
 def update_cart_item(cart_item_id: int, update_data: CartItemUpdate):
-    """Actualizar campos de un elemento del carrito existente"""
+    """Actualizar campos de un elemento del carrito existente (un UPDATE ... RETURNING)"""
     db = None
     try:
         db = SessionLocal()
@@ -161,17 +170,17 @@ def update_cart_item(cart_item_id: int, update_data: CartItemUpdate):
         if cart_item_id <= 0:
             raise ValueError("ID de elemento del carrito inválido")
 
-        cart_item = db.query(CartItem).filter(CartItem.id == cart_item_id).first()
+        if update_data.quantity is not None:
+            cart_item = set_item_quantity(db.connection(), CartItem.__table__, cart_item_id, update_data.quantity)
+        else:
+            cart_item = read_item(db.connection(), CartItem.__table__, cart_item_id)
 
         if not cart_item:
             logger.warning(f"Intento de actualizar elemento del carrito inexistente: {cart_item_id}")
             raise ValueError("Elemento del carrito no encontrado")
 
-        if update_data.quantity is not None:
-            cart_item.quantity = update_data.quantity
-
         db.commit()
-        db.refresh(cart_item)
+        summary_cache.invalidate(cart_item['user_id'])
 
         logger.info(f"Elemento del carrito {cart_item_id} actualizado exitosamente")
         return cart_item
@@ -196,7 +205,7 @@ def update_cart_item(cart_item_id: int, update_data: CartItemUpdate):
 
 
 def update_cart_item_quantity(cart_item_id: int, increment: bool = True):
-    """Incrementar o decrementar la cantidad de un elemento del carrito"""
+    """Incrementar o decrementar la cantidad de un elemento del carrito (sin leer la fila antes)"""
     db = None
     try:
         db = SessionLocal()
@@ -204,29 +213,25 @@ def update_cart_item_quantity(cart_item_id: int, increment: bool = True):
         if cart_item_id <= 0:
             raise ValueError("ID de elemento del carrito inválido")
 
-        cart_item = db.query(CartItem).filter(CartItem.id == cart_item_id).first()
+        deleted = False
+        if increment:
+            cart_item = increment_item(db.connection(), CartItem.__table__, cart_item_id)
+        else:
+            # Con cantidad 1 el item se elimina en la misma transacción
+            cart_item, deleted = decrement_item(db.connection(), CartItem.__table__, cart_item_id)
 
         if not cart_item:
             logger.warning(f"Intento de actualizar elemento del carrito inexistente: {cart_item_id}")
             raise ValueError("Elemento del carrito no encontrado")
 
-        # Incrementar o decrementar la cantidad
-        if increment:
-            cart_item.quantity += 1
-        else:
-            if cart_item.quantity > 1:
-                cart_item.quantity -= 1
-            else:
-                # Si la cantidad llega a 0, eliminamos el item
-                db.delete(cart_item)
-                db.commit()
-                logger.info(f"Elemento del carrito {cart_item_id} eliminado por cantidad 0")
-                return None
-
         db.commit()
-        db.refresh(cart_item)
+        summary_cache.invalidate(cart_item['user_id'])
+
+        if deleted:
+            logger.info(f"Elemento del carrito {cart_item_id} eliminado por cantidad 0")
+            return None
 
-        logger.info(f"Cantidad del elemento {cart_item_id} actualizada a {cart_item.quantity}")
+        logger.info(f"Cantidad del elemento {cart_item_id} actualizada a {cart_item['quantity']}")
         return cart_item
 
     except ValueError:
@@ -257,8 +262,10 @@ def delete_cart_item(cart_item_id: int):
             logger.warning(f"Intento de eliminar item {cart_item_id} no encontrado")
             return False
 
+        user_id = cart_item.user_id
         db.delete(cart_item)
         db.commit()
+        summary_cache.invalidate(user_id)
 
         logger.info(f"Elemento del carrito {cart_item_id} eliminado exitosamente")
         return True
@@ -286,6 +293,7 @@ def clear_user_cart(user_id: int):
         db = SessionLocal()
         deleted_count = db.query(CartItem).filter(CartItem.user_id == user_id).delete()
         db.commit()
+        summary_cache.invalidate(user_id)
 
         logger.info(f"Carrito del usuario {user_id} vaciado exitosamente. {deleted_count} elementos eliminados")
         return deleted_count
@@ -300,4 +308,35 @@ def clear_user_cart(user_id: int):
         raise SQLAlchemyError("Error al acceder a la base de datos")
     finally:
         if db:
-            db.close()
\ No newline at end of file
+            db.close()
+
+
+def get_cart_summary(user_id: int):
+    """Totales del carrito de un usuario (una consulta agregada, con caché opcional)"""
+    db = None
+    try:
+        if user_id <= 0:
+            raise ValueError("ID de usuario inválido")
+
+        db = SessionLocal()
+        if not summary_cache.enabled:
+            # Sin caché (el default) no hace falta leer la versión del catálogo
+            return read_summary(db, user_id)
+
+        catalog = catalog_version.value
+        summary = summary_cache.get(user_id, catalog)
+        if summary is not None:
+            return summary
+
+        generation = summary_cache.generation
+        summary = read_summary(db, user_id)
+        summary_cache.put(user_id, catalog, summary, generation)
+        return summary
+    except ValueError:
+        raise
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al calcular el resumen del carrito del usuario {user_id}: {str(e)}")
+        raise SQLAlchemyError("Error al acceder a la base de datos")
+    finally:
+        if db:
+            db.close()
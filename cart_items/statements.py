@@ -0,0 +1,202 @@
+"""
+Sentencias del carrito en una sola ida a la base.
+
+Agregar un producto es un `INSERT ... ON CONFLICT (user_id, product_id) DO
+UPDATE SET quantity = quantity + excluded.quantity ... RETURNING`: la
+restricción única sobre (user_id, product_id) hace que dos clicks
+concurrentes sumen en la misma fila en vez de crear duplicados, sin leer
+antes la fila ni refrescarla después.
+
+Incrementar, decrementar y fijar la cantidad son un `UPDATE ... RETURNING`
+condicional. Decrementar un item con cantidad 1 lo borra con un `DELETE ...
+RETURNING` en la misma transacción, sin leer la fila antes.
+
+Los lotes de /cart_items/batch se reducen primero a un efecto final por
+producto (sumar, fijar o quitar) y se aplican con a lo sumo tres sentencias:
+un DELETE, un upsert multi-fila que fija cantidades y otro que las suma.
+
+El upsert usa `ON CONFLICT` en SQLite y PostgreSQL. En otros motores se hace
+UPDATE y, si no había fila, INSERT en la misma transacción; el índice único
+hace fallar con IntegrityError un alta concurrente en vez de duplicar el
+item. Donde el motor no tiene RETURNING la fila se relee después de escribir.
+
+Las funciones reciben la tabla de items (`CartItem.__table__`). El índice
+único lo crean `create_all` en bases nuevas y la migración 44d9fc48d016 en
+las existentes (ver schema.py).
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from productos.model import Product
+
+logger = logging.getLogger(__name__)
+
+UNIQUE_INDEX_NAME = "uq_cart_items_user_product"
+
+OP_ADD = "add"
+OP_SET = "set"
+OP_REMOVE = "remove"
+
+_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def _columns(table):
+    return table.c.id, table.c.user_id, table.c.product_id, table.c.quantity
+
+
+def _read(conn, table, key):
+    return conn.execute(select(*_columns(table)).where(key)).first()
+
+
+def read_item(conn, table, item_id: int) -> Optional[dict]:
+    row = _read(conn, table, table.c.id == item_id)
+    return dict(row._mapping) if row is not None else None
+
+
+def _update_returning(conn, table, key, values: dict, *conditions) -> Optional[dict]:
+    """UPDATE de la fila `key` (si cumple `conditions`) que devuelve la fila resultante"""
+    statement = update(table).where(key, *conditions).values(**values)
+    if conn.dialect.update_returning:
+        row = conn.execute(statement.returning(*_columns(table))).first()
+    else:
+        row = _read(conn, table, key) if conn.execute(statement).rowcount else None
+    return dict(row._mapping) if row is not None else None
+
+
+def _delete_returning(conn, table, key, *conditions) -> Optional[dict]:
+    """DELETE de la fila `key` (si cumple `conditions`) que devuelve la fila borrada"""
+    statement = delete(table).where(key, *conditions)
+    if conn.dialect.delete_returning:
+        row = conn.execute(statement.returning(*_columns(table))).first()
+    else:
+        row = conn.execute(select(*_columns(table)).where(key, *conditions)).first()
+        if row is not None and not conn.execute(statement).rowcount:
+            row = None
+    return dict(row._mapping) if row is not None else None
+
+
+def increment_item(conn, table, item_id: int, step: int = 1) -> Optional[dict]:
+    """Sumar `step` a la cantidad; None si el item no existe"""
+    return _update_returning(conn, table, table.c.id == item_id, {"quantity": func.coalesce(table.c.quantity, 1) + step})
+
+
+def set_item_quantity(conn, table, item_id: int, quantity: int) -> Optional[dict]:
+    """Fijar la cantidad; None si el item no existe"""
+    return _update_returning(conn, table, table.c.id == item_id, {"quantity": quantity})
+
+
+def decrement_item(conn, table, item_id: int) -> Tuple[Optional[dict], bool]:
+    """
+    Restar 1 a la cantidad, o borrar el item si tenía 1. Devuelve (fila,
+    borrado); (None, False) si el item no existe. No confirma.
+    """
+    key = table.c.id == item_id
+    quantity = func.coalesce(table.c.quantity, 1)
+    # En SQLite el primer UPDATE ya toma el lock de escritura y el par es atómico;
+    # el segundo intento cubre a otros motores si otra transacción cambió la
+    # cantidad entre el UPDATE y el DELETE
+    for _ in range(2):
+        row = _update_returning(conn, table, key, {"quantity": quantity - 1}, quantity > 1)
+        if row is not None:
+            return row, False
+        row = _delete_returning(conn, table, key, quantity <= 1)
+        if row is not None:
+            return row, True
+    return None, False
+
+
+def _upsert(insert, table, rows: List[dict], increment: bool):
+    statement = insert(table).values(rows)
+    quantity = table.c.quantity + statement.excluded.quantity if increment else statement.excluded.quantity
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.product_id],
+        set_={"quantity": quantity},
+    ).returning(*_columns(table))
+
+
+def _upsert_rows(conn, table, dialect_name: str, rows: List[dict], increment: bool) -> List[dict]:
+    """Insertar los items o sumar/fijar la cantidad de los existentes; devuelve las filas"""
+    insert = _INSERTS.get(dialect_name)
+    if insert is not None:
+        return [dict(row._mapping) for row in conn.execute(_upsert(insert, table, rows, increment))]
+    # Motores sin ON CONFLICT: UPDATE y, si no había fila, INSERT
+    result = []
+    for row in rows:
+        key = and_(table.c.user_id == row["user_id"], table.c.product_id == row["product_id"])
+        quantity = table.c.quantity + row["quantity"] if increment else row["quantity"]
+        if not conn.execute(update(table).where(key).values(quantity=quantity)).rowcount:
+            conn.execute(table.insert().values(**row))
+        result.append(dict(_read(conn, table, key)._mapping))
+    return result
+
+
+def add_item(conn, table, dialect_name: str, user_id: int, product_id: int, quantity: int) -> dict:
+    """Insertar el item o sumar la cantidad al existente, devolviendo la fila resultante. No confirma."""
+    return _upsert_rows(
+        conn, table, dialect_name, [{"user_id": user_id, "product_id": product_id, "quantity": quantity}], True
+    )[0]
+
+
+def collapse_operations(operations: Iterable) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """
+    Reducir las operaciones (en orden) a un efecto por producto: cantidades a
+    sumar a lo que haya y cantidades finales a fijar (0 = quitar el item).
+    """
+    added: Dict[int, int] = {}
+    fixed: Dict[int, int] = {}
+    for operation in operations:
+        product_id = operation.product_id
+        if operation.op == OP_ADD:
+            if product_id in fixed:
+                fixed[product_id] += operation.quantity
+            else:
+                added[product_id] = added.get(product_id, 0) + operation.quantity
+        else:
+            added.pop(product_id, None)
+            fixed[product_id] = operation.quantity if operation.op == OP_SET else 0
+    return added, fixed
+
+
+def missing_products(conn, product_ids: Iterable[int]) -> List[int]:
+    """Ids de la lista que no existen en `products`"""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return []
+    products = Product.__table__
+    found = conn.execute(select(products.c.id).where(products.c.id.in_(product_ids))).scalars()
+    return sorted(product_ids - set(found))
+
+
+def apply_operations(conn, table, dialect_name: str, user_id: int, operations: Iterable) -> List[dict]:
+    """
+    Aplicar un lote de operaciones al carrito del usuario y devolver el carrito
+    resultante. No confirma: la transacción es de quien llama.
+    """
+    added, fixed = collapse_operations(operations)
+    missing = missing_products(conn, list(added) + [product_id for product_id, quantity in fixed.items() if quantity])
+    if missing:
+        raise ValueError(f"Productos no encontrados: {', '.join(str(product_id) for product_id in missing)}")
+
+    removed = [product_id for product_id, quantity in fixed.items() if not quantity]
+    if removed:
+        conn.execute(delete(table).where(table.c.user_id == user_id, table.c.product_id.in_(removed)))
+    for quantities, increment in ((fixed, False), (added, True)):
+        rows = [
+            {"user_id": user_id, "product_id": product_id, "quantity": quantity}
+            for product_id, quantity in quantities.items() if quantity
+        ]
+        if rows:
+            _upsert_rows(conn, table, dialect_name, rows, increment)
+
+    result = conn.execute(
+        select(*_columns(table))
+        .where(table.c.user_id == user_id)
+        .order_by(table.c.id)
+    )
+    return [dict(row._mapping) for row in result]
@@ -0,0 +1,116 @@
+"""
+Totales del carrito calculados en la base.
+
+Una sola consulta agregada sobre `cart_items JOIN products` devuelve cantidad
+de líneas y unidades, subtotal a precio de lista, descuento y total a precio
+efectivo (el mismo que cobra la compra), sin cargar objetos del ORM.
+
+El resultado se puede cachear por usuario (`CART_SUMMARY_CACHE_TTL`, 0 por
+defecto, la desactiva). Las escrituras del carrito invalidan la entrada del
+usuario y cada entrada guarda la versión del catálogo con la que se calculó,
+así un cambio de precios o descuentos la vuelve vieja sin recorrer la caché.
+La caché es local al proceso y la invalidación del carrito también: con
+varios workers, una escritura atendida por otro worker no la invalida y el
+resumen puede quedar viejo hasta el TTL. Habilitarla sólo con un worker o
+si se acepta esa demora.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select
+
+from config.cart import CART_SUMMARY_CACHE_SIZE, CART_SUMMARY_CACHE_TTL
+from productos.model import Product
+from .model import CartItem
+
+_items = CartItem.__table__
+_products = Product.__table__
+
+SUMMARY_QUERY = (
+    select(
+        func.count(_items.c.id).label("line_count"),
+        func.coalesce(func.sum(_items.c.quantity), 0).label("item_count"),
+        func.coalesce(func.sum(func.round(_items.c.quantity * _products.c.price, 2)), 0).label("subtotal"),
+        func.coalesce(func.sum(func.round(_items.c.quantity * _products.c.effective_price, 2)), 0).label("grand_total"),
+    )
+    .select_from(_items.join(_products, _products.c.id == _items.c.product_id))
+    .where(_items.c.user_id == bindparam("user_id"))
+)
+
+
+def read_summary(conn, user_id: int) -> dict:
+    """Totales del carrito del usuario en una consulta"""
+    row = conn.execute(SUMMARY_QUERY, {"user_id": user_id}).one()
+    subtotal = round(row.subtotal or 0.0, 2)
+    grand_total = round(row.grand_total or 0.0, 2)
+    return {
+        "user_id": user_id,
+        "line_count": row.line_count,
+        "item_count": row.item_count,
+        "subtotal": subtotal,
+        "discount_total": round(subtotal - grand_total, 2),
+        "grand_total": grand_total,
+    }
+
+
+class CartSummaryCache:
+    """LRU acotado de resúmenes por usuario, con TTL y versión del catálogo"""
+
+    def __init__(self, ttl: float = 30.0, maxsize: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[float, str, dict]]" = OrderedDict()
+        # Se incrementa en cada invalidación: un resumen calculado antes no se guarda
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, user_id: int, catalog: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, entry_catalog, summary = entry
+            if now >= expires_at or entry_catalog != catalog:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return dict(summary)
+
+    def put(self, user_id: int, catalog: str, summary: dict, generation: int) -> None:
+        """Guardar el resumen si no hubo invalidaciones desde `generation`"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[user_id] = (self._clock() + self.ttl, catalog, dict(summary))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+summary_cache = CartSummaryCache(ttl=CART_SUMMARY_CACHE_TTL, maxsize=CART_SUMMARY_CACHE_SIZE)
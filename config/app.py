@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from cart.routes.cart_routes import router as cart_router
-from config.basemodel import Base
+from cart.models.cart_models import Base
 from config.cnx import engine
 
 app = FastAPI(
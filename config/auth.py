@@ -15,4 +15,20 @@ if not SECRET_KEY:
 
 ALGORITHM = os.getenv('ALGORITHM', 'HS256')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '30'))
-REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS', '30'))
\ No newline at end of file
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS', '30'))
+
+# Caché de tokens JWT verificados (0 desactiva la caché)
+JWT_CACHE_MAX_SIZE = int(os.getenv('JWT_CACHE_MAX_SIZE', '2048'))
+
+# Segundos que se reutilizan los datos de usuario del principal por request
+PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', '60'))
+
+# Pool de bcrypt para login/alta: workers, trabajos en espera antes de responder 503
+# y si usar procesos en lugar de hilos
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_POOL_QUEUE = int(os.getenv('PASSWORD_POOL_QUEUE', '32'))
+PASSWORD_POOL_PROCESSES = os.getenv('PASSWORD_POOL_PROCESSES', 'False').lower() in ('1', 'true', 'yes')
+
+# Cada cuántos segundos la matriz de permisos compara su versión con la de la
+# base (tabla permission_state) para ver cambios hechos por otros workers (0 = en cada consulta)
+PERMISSION_MATRIX_CHECK_SECONDS = float(os.getenv('PERMISSION_MATRIX_CHECK_SECONDS', '1'))
@@ -0,0 +1,13 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Operaciones máximas por request de /cart_items/batch
+CART_BATCH_MAX_OPERATIONS = int(os.getenv('CART_BATCH_MAX_OPERATIONS', '500'))
+
+# Caché por usuario de /cart_items/me/summary: segundos y usuarios máximos. Es local al
+# proceso y sólo la invalidan las escrituras de ese proceso: con varios workers un
+# resumen puede quedar viejo hasta el TTL, por eso viene desactivada (0)
+CART_SUMMARY_CACHE_TTL = float(os.getenv('CART_SUMMARY_CACHE_TTL', '0'))
+CART_SUMMARY_CACHE_SIZE = int(os.getenv('CART_SUMMARY_CACHE_SIZE', '10000'))
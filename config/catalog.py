@@ -0,0 +1,51 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Cache-Control de las lecturas del catálogo. Por defecto el navegador guarda
+# la respuesta pero la revalida siempre con If-None-Match (304 si no cambió).
+CATALOG_CACHE_CONTROL = os.getenv('CATALOG_CACHE_CONTROL', 'public, no-cache')
+CATALOG_CACHE_CONTROL_LIST = os.getenv('CATALOG_CACHE_CONTROL_LIST', CATALOG_CACHE_CONTROL)
+CATALOG_CACHE_CONTROL_DETAIL = os.getenv('CATALOG_CACHE_CONTROL_DETAIL', CATALOG_CACHE_CONTROL)
+CATALOG_CACHE_CONTROL_CATEGORY = os.getenv('CATALOG_CACHE_CONTROL_CATEGORY', CATALOG_CACHE_CONTROL)
+CATALOG_CACHE_CONTROL_SEARCH = os.getenv('CATALOG_CACHE_CONTROL_SEARCH', CATALOG_CACHE_CONTROL)
+CATALOG_CACHE_CONTROL_FACETS = os.getenv('CATALOG_CACHE_CONTROL_FACETS', CATALOG_CACHE_CONTROL)
+CATALOG_CACHE_CONTROL_EXPORT = os.getenv('CATALOG_CACHE_CONTROL_EXPORT', CATALOG_CACHE_CONTROL)
+
+# Importación masiva: filas por lote/transacción y máximo de errores informados
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '1000'))
+
+# Recálculo de precios: filas por UPDATE y máximo de cambios devueltos en el diff
+REPRICE_BATCH_SIZE = int(os.getenv('REPRICE_BATCH_SIZE', '1000'))
+REPRICE_DIFF_LIMIT = int(os.getenv('REPRICE_DIFF_LIMIT', '500'))
+
+# Uploads de imágenes: tamaño máximo por archivo y tipos permitidos (detectados por contenido)
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+UPLOAD_ALLOWED_TYPES = frozenset(
+    value.strip() for value in os.getenv(
+        'UPLOAD_ALLOWED_TYPES', 'image/jpeg,image/png,image/webp,image/gif,image/avif'
+    ).split(',') if value.strip()
+)
+# Margen para los demás campos y separadores de un multipart/form-data
+UPLOAD_FORM_OVERHEAD = int(os.getenv('UPLOAD_FORM_OVERHEAD', str(64 * 1024)))
+
+# Variantes redimensionadas de las imágenes: procesos del pool (0 las desactiva)
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '1'))
+
+# Cache-Control de /static: los archivos con hash en el nombre no cambian nunca
+STATIC_CACHE_CONTROL = os.getenv('STATIC_CACHE_CONTROL', 'public, no-cache')
+STATIC_IMMUTABLE_CACHE_CONTROL = os.getenv('STATIC_IMMUTABLE_CACHE_CONTROL', 'public, max-age=31536000, immutable')
+
+# GC de uploads huérfanos: cada cuánto corre dentro de la app (segundos; 0, el
+# default, lo desactiva: con varios workers conviene correr scripts/gc_uploads.py
+# desde cron o habilitarlo en un solo proceso), antigüedad mínima para considerar
+# huérfano un archivo, y si se mueve a cuarentena o se borra
+UPLOAD_GC_INTERVAL = int(os.getenv('UPLOAD_GC_INTERVAL', '0'))
+UPLOAD_GC_GRACE_SECONDS = int(os.getenv('UPLOAD_GC_GRACE_SECONDS', str(24 * 60 * 60)))
+UPLOAD_GC_MODE = os.getenv('UPLOAD_GC_MODE', 'quarantine')
+UPLOAD_QUARANTINE_DIR = os.getenv('UPLOAD_QUARANTINE_DIR', os.path.join(os.getcwd(), 'quarantine', 'uploads'))
+
+# Exportación en streaming: filas por lote leído de la base
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
@@ -0,0 +1,173 @@
+"""
+Serialización rápida de listados a partir de objetos ORM confiables.
+
+Con `response_model` FastAPI valida cada atributo de cada fila con pydantic
+(`from_attributes`), lo vuelve a recorrer para pasarlo a tipos JSON y recién
+después lo codifica con el módulo `json`. Para salidas que vienen de
+nuestros propios modelos esa validación no aporta nada y es el mayor costo de
+CPU de los listados grandes.
+
+`FastJSON.respond` arma los dicts con un encoder precompilado por modelo (un
+`attrgetter` con los campos del DTO, anidados y computed fields incluidos) y
+los codifica directo a bytes con orjson. El `response_model` del decorador se
+mantiene para la documentación de OpenAPI. Cada router decide si lo usa con
+`FAST_JSON_ROUTERS`; deshabilitado, `respond` devuelve el contenido tal cual
+y FastAPI hace el camino normal.
+
+orjson es opcional: sin él se usa `json` (igual se ahorra la validación).
+"""
+import collections.abc
+import json
+import os
+import types
+import typing
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+load_dotenv()
+
+# Routers que responden sus listados por el camino rápido ("*" = todos, vacío = ninguno)
+FAST_JSON_ROUTERS = frozenset(
+    value.strip() for value in os.getenv('FAST_JSON_ROUTERS', 'productos,cart_items,usuarios').split(',')
+    if value.strip()
+)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
+def _json_default(value):
+    # Fechas en ISO 8601, igual que pydantic
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _identity(value):
+    return value
+
+
+def _list_encoder(item: Callable) -> Callable:
+    if item is _identity:
+        return _identity
+
+    def encode(values):
+        return None if values is None else [item(value) for value in values]
+
+    return encode
+
+
+def _model_encoder(model) -> Callable:
+    fields = []
+    for name, field in model.model_fields.items():
+        if field.exclude:
+            # Sólo lo usan los computed fields, que lo leen del objeto
+            continue
+        default = None if field.is_required() else field.get_default(call_default_factory=True)
+        fields.append((field.serialization_alias or field.alias or name, name, default, encoder_for(field.annotation)))
+    computed = [
+        (info.alias or name, info.wrapped_property.fget)
+        for name, info in model.model_computed_fields.items()
+    ]
+    keys = tuple(key for key, _, _, _ in fields)
+    names = tuple(name for _, name, _, _ in fields)
+    plain = all(encode is _identity for _, _, _, encode in fields) and len(names) > 1
+    getter = attrgetter(*names) if plain else None
+    item_getter = itemgetter(*names) if plain else None
+
+    def encode(obj):
+        if obj is None:
+            return None
+        if isinstance(obj, dict):
+            data = {key: encode_field(obj.get(name, default)) for key, name, default, encode_field in fields}
+        elif getter is not None:
+            try:
+                # Objetos ORM ya cargados: los valores están en __dict__ y se evita
+                # pasar por el descriptor de SQLAlchemy en cada atributo
+                data = dict(zip(keys, item_getter(obj.__dict__)))
+            except (AttributeError, KeyError):
+                try:
+                    data = dict(zip(keys, getter(obj)))
+                except AttributeError:
+                    data = {key: getattr(obj, name, default) for key, name, default, _ in fields}
+        else:
+            data = {key: encode_field(getattr(obj, name, default)) for key, name, default, encode_field in fields}
+        for key, fget in computed:
+            # Los computed fields leen atributos del DTO, que son los mismos del ORM
+            data[key] = fget(obj if not isinstance(obj, dict) else _DictView(obj))
+        return data
+
+    return encode
+
+
+class _DictView:
+    """Acceso por atributo a un dict, para evaluar computed fields sobre filas crudas"""
+    __slots__ = ("_data",)
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def __getattr__(self, name):
+        return self._data.get(name)
+
+
+@lru_cache(maxsize=None)
+def encoder_for(annotation) -> Callable:
+    """Función objeto -> estructura JSON para un tipo de respuesta (modelo, List[modelo], Optional...)"""
+    origin = typing.get_origin(annotation)
+    if origin in (list, tuple, set, frozenset, collections.abc.Sequence):
+        args = typing.get_args(annotation)
+        return _list_encoder(encoder_for(args[0]) if args else _identity)
+    if origin in (typing.Union, types.UnionType):
+        models = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return encoder_for(models[0]) if len(models) == 1 else _identity
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _model_encoder(annotation)
+    return _identity
+
+
+class FastJSON:
+    """Camino rápido de serialización, habilitado por router"""
+
+    def __init__(self, router_name: str, enabled: Optional[bool] = None):
+        self.router_name = router_name
+        if enabled is None:
+            enabled = "*" in FAST_JSON_ROUTERS or router_name in FAST_JSON_ROUTERS
+        self.enabled = enabled
+
+    def respond(self, response_model, content: Any, response: Optional[Response] = None, status_code: int = 200):
+        """
+        Serializar `content` como `response_model` sin validarlo. `response` es
+        el Response inyectado en el endpoint: se copian sus headers (p.ej. ETag
+        de una dependencia), que FastAPI descarta cuando se devuelve un Response.
+        """
+        if not self.enabled:
+            return content
+        fast = FastJSONResponse(encoder_for(response_model)(content), status_code=status_code)
+        if response is not None:
+            for key, value in response.headers.items():
+                if key != "content-length":
+                    fast.headers[key] = value
+        return fast
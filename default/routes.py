@@ -4,6 +4,9 @@ from fastapi.responses import FileResponse
 from uuid import uuid4
 import os
 
+from middlewares.auth import token_cache
+from usuarios.password_pool import password_pool
+
 default = APIRouter()
 
 @default.get("/")
@@ -48,7 +51,9 @@ def health_check():
             "status": "healthy",
             "timestamp": str(datetime.now()),
             "request_id": str(uuid4()),
-            "service": "FastAPI Users & Tasks API"
+            "service": "FastAPI Users & Tasks API",
+            "password_pool": password_pool.stats(),
+            "token_cache": token_cache.stats()
         }
     except Exception as e:
         raise HTTPException(
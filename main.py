@@ -1,9 +1,11 @@
 """
 KickShopping API - Aplicación Principal FastAPI
 """
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.utils import get_openapi
 
 # Configuración de base de datos y modelos
@@ -17,6 +19,8 @@ from usuarios.model import Usuario
 from productos.model import Product
 from cart_items.model import CartItem
 from config.associations import rol_permiso_association
+from productos.schema import check_product_schema
+from cart_items.schema import check_cart_schema
 
 # Importar rutas
 from default.routes import default
@@ -25,11 +29,39 @@ from usuarios.routes import usuarios
 from productos.routes import products
 from cart_items.routes import cart_items
 from permisos.routes import router as permisos_router
-from middlewares.auth import AuthMiddleware
+from middlewares.auth import AuthMiddleware, route_table
+from middlewares.upload_limit import UploadLimitMiddleware
+from middlewares.static_files import CachedStaticFiles
+from permisos.matrix import permission_matrix
+from usuarios.password_pool import password_pool
+from productos.variants import variant_pool
+from productos.upload_gc import run_periodically
+from productos.services import collect_upload_orphans
+from config.catalog import UPLOAD_GC_INTERVAL
 
 def create_tables():
     """Crear todas las tablas en la base de datos"""
     Base.metadata.create_all(bind=engine)
+    check_product_schema(engine)
+    check_cart_schema(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Precargar estructuras en memoria antes de atender requests"""
+    route_table.build(app.routes)
+    try:
+        permission_matrix.load()
+    except Exception as e:
+        # La matriz se vuelve a intentar cargar en la primera verificación
+        print(f"[startup] No se pudo cargar la matriz de permisos: {e}")
+    # GC periódico de uploads huérfanos (fuera del event loop); opcional, ver UPLOAD_GC_INTERVAL
+    gc_task = asyncio.create_task(run_periodically(collect_upload_orphans, UPLOAD_GC_INTERVAL)) if UPLOAD_GC_INTERVAL > 0 else None
+    yield
+    if gc_task:
+        gc_task.cancel()
+    password_pool.shutdown()
+    variant_pool.shutdown()
+
 
 def get_application() -> FastAPI:
     """
@@ -38,7 +70,8 @@ def get_application() -> FastAPI:
     app = FastAPI(
         title="Kick Shopping API",
         description="API para gestionar una tienda de Indumentaria",
-        version="1.0"
+        version="1.0",
+        lifespan=lifespan
     )
 
     # Configuración de orígenes permitidos para CORS
@@ -50,6 +83,9 @@ def get_application() -> FastAPI:
         "http://127.0.0.1:8000",
     ]
 
+    # Límite de tamaño de uploads (queda por dentro de auth: sólo corre para requests autorizados)
+    app.add_middleware(UploadLimitMiddleware)
+
     # Agregar middleware de autenticación primero
     app.add_middleware(AuthMiddleware)
 
@@ -79,8 +115,9 @@ def get_application() -> FastAPI:
     app.include_router(permisos_router, prefix="/permisos", tags=["Permisos"])
 
     # Servir archivos estáticos (imágenes subidas)
-    # Montamos la carpeta ./static en /static para que las imágenes estén accesibles
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+    # Montamos la carpeta ./static en /static para que las imágenes estén accesibles.
+    # Los archivos con hash se cachean como inmutables y se sirven .br/.gz si existen
+    app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
     return app
 
@@ -1,9 +1,7 @@
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from config.auth import ALGORITHM, SECRET_KEY
-from usuarios.model import Usuario
-from config.cnx import SessionLocal
+from middlewares.auth import request_principal
+from middlewares.principal import Principal
 import logging
 
 # Configurar logging
@@ -12,114 +10,36 @@ logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def verify_admin(token: str = Depends(oauth2_scheme)):
-    """Verificar que el usuario sea administrador"""
-    credentials_exception = HTTPException(
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No autorizado",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except JWTError:
-        raise credentials_exception
 
-    # Tratar distintas formas de claims en el JWT: 'sub', 'user_id', 'userId'
-    user_id = None
-    try:
-        sub = payload.get("sub")
-        if sub is not None:
-            # sub puede ser un número (id) o un string (email). Intentar convertir a int.
-            try:
-                user_id = int(sub)
-            except Exception:
-                # dejar user_id como None; luego intentaremos buscar por email/username
-                user_id = None
 
-        if user_id is None:
-            user_id = payload.get("user_id") or payload.get("userId")
-            if isinstance(user_id, str) and user_id.isdigit():
-                user_id = int(user_id)
-    except Exception:
-        # en caso de payload inesperado
-        user_id = None
-    
-    db = SessionLocal()
-    try:
-        user = None
-        # Buscar por id si lo tenemos
-        if user_id is not None:
-            user = db.query(Usuario).filter(Usuario.usu_id == user_id).first()
-
-        # Si no encontramos por id, intentar buscar por nombre de usuario/email en 'sub' o en claims comunes
-        if not user:
-            # posibles claves con nombre de usuario
-            username = payload.get('username') or payload.get('usu_usuario') or payload.get('email') or payload.get('sub')
-            if isinstance(username, str) and username:
-                user = db.query(Usuario).filter(Usuario.usu_usuario == username).first()
+async def verify_admin(request: Request, token: str = Depends(oauth2_scheme)) -> Principal:
+    """Verificar que el usuario sea administrador"""
+    principal = request_principal(request, token)
+    if principal is None:
+        raise _credentials_exception()
 
-        if not user:
-            raise credentials_exception
+    # Verificar si el usuario tiene el rol de administrador
+    if not principal.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Se requieren privilegios de administrador"
+        )
 
-        # Verificar si el usuario tiene el rol de administrador
-        # El modelo Usuario define la relación como `rol` (no usu_rol)
-        if not getattr(user, 'rol', None) or user.rol.rol_nombre != "Administrador":
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Se requieren privilegios de administrador"
-            )
-        
-        return user
-    finally:
-        db.close()
+    return principal
 
 
-async def verify_authenticated_user(token: str = Depends(oauth2_scheme)):
-    """Verificar que el token sea válido y devolver el usuario (sin requerir rol de admin).
+async def verify_authenticated_user(request: Request, token: str = Depends(oauth2_scheme)) -> Principal:
+    """Verificar que el token sea válido y devolver el principal (sin requerir rol de admin).
     Devuelve HTTP 401 si el token es inválido o el usuario no existe.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="No autorizado",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    except JWTError:
-        raise credentials_exception
-
-    user_id = None
-    try:
-        sub = payload.get("sub")
-        if sub is not None:
-            try:
-                user_id = int(sub)
-            except Exception:
-                user_id = None
-
-        if user_id is None:
-            user_id = payload.get("user_id") or payload.get("userId")
-            if isinstance(user_id, str) and user_id.isdigit():
-                user_id = int(user_id)
-    except Exception:
-        user_id = None
-
-    db = SessionLocal()
-    try:
-        user = None
-        if user_id is not None:
-            user = db.query(Usuario).filter(Usuario.usu_id == user_id).first()
-
-        if not user:
-            username = payload.get('username') or payload.get('usu_usuario') or payload.get('email') or payload.get('sub')
-            if isinstance(username, str) and username:
-                user = db.query(Usuario).filter(Usuario.usu_usuario == username).first()
-
-        if not user:
-            raise credentials_exception
-
-        return user
-    finally:
-        db.close()
\ No newline at end of file
+    principal = request_principal(request, token)
+    if principal is None:
+        raise _credentials_exception()
+    return principal
@@ -1,13 +1,22 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List, Dict, Set
+from typing import Optional, List, Dict, Set, Tuple, NamedTuple, Pattern
 from fastapi import HTTPException, Request, Depends
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.routing import APIRoute
+from starlette.routing import BaseRoute, Route
+from starlette.datastructures import Headers
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 import bcrypt
+import logging
 
-from config.auth import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from config.auth import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, JWT_CACHE_MAX_SIZE
+from permisos.matrix import permission_matrix
+from middlewares.token_cache import VerifiedTokenCache
+from middlewares.principal import Principal, resolve_principal
+
+logger = logging.getLogger(__name__)
 
 
 class RouteConfig:
@@ -29,6 +38,9 @@ class RouteConfig:
         "/usuarios/login": ["POST"],
         "/productos": ["GET", "POST"],
         "/productos/": ["GET", "POST"],
+        "/productos/search": ["GET"],
+        "/productos/facets": ["GET"],
+        "/productos/export": ["GET"],
         "/cart_items": ["GET", "POST"],
         "/cart_items/": ["GET", "POST"],
     }
@@ -38,13 +50,32 @@ class RouteConfig:
         "/productos/categoria/",
     ]
 
+    # Rutas con parámetros, expresadas como plantilla de la ruta registrada
+    PUBLIC_TEMPLATES: Dict[str, List[str]] = {
+        # Permitir ver productos individuales sin autenticación
+        "/productos/{product_id}": ["GET"],
+        "/cart_items/user/{user_id}": ["GET"],
+    }
+
     AUTHENTICATED_ONLY_ROUTES: List[str] = [
         "/usuarios/me",
         "/cart_items/me",
+        "/cart_items/me/summary",
+        # Operaciones por lote sobre el carrito propio
+        "/cart_items/batch",
         # Permitir que cualquier usuario autenticado finalice compras sin permiso adicional
         "/cart_items/purchase",
     ]
 
+    # Prefijos que requieren token pero nunca verifican permisos
+    SKIP_PERMISSION_PREFIXES: List[str] = [
+        "/health",
+        "/favicon.ico",
+        "/openapi.json",
+        "/docs",
+        "/redoc",
+    ]
+
     @classmethod
     def is_public_route(cls, path: str, method: str) -> bool:
         if path in cls.PUBLIC_ROUTES:
@@ -83,75 +114,199 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": int(expire.timestamp())})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+# Caché de payloads verificados compartida por el middleware y las dependencias
+token_cache = VerifiedTokenCache(maxsize=JWT_CACHE_MAX_SIZE)
+
+
+def decode_jwt(token: str) -> dict:
+    """Decodificar y verificar un JWT, reutilizando la verificación previa si está en caché.
+
+    Lanza las excepciones de PyJWT (ExpiredSignatureError, InvalidTokenError).
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_cache.put(token, payload)
+    return payload
+
+
 def verify_jwt_token(token: str) -> dict:
     """Verificar y decodificar un token JWT"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        # Validar que el token tenga user_id
-        if "user_id" not in payload:
-            raise HTTPException(status_code=401, detail="Token inválido: falta user_id")
-        return payload
+        payload = decode_jwt(token)
     except jwt.ExpiredSignatureError as e:
-        print("verify_jwt_token - ExpiredSignatureError:", e)
+        logger.info(f"verify_jwt_token - ExpiredSignatureError: {e}")
         raise HTTPException(status_code=401, detail="Token expirado")
     except jwt.InvalidTokenError as e:
-        print("verify_jwt_token - InvalidTokenError:", e)
+        logger.info(f"verify_jwt_token - InvalidTokenError: {e}")
         raise HTTPException(status_code=401, detail="Token inválido")
     except Exception as e:
-        print("verify_jwt_token - Exception:", repr(e))
+        logger.error(f"verify_jwt_token - Exception: {e!r}")
         raise HTTPException(status_code=401, detail="Error de autenticación")
+    # Validar que el token tenga user_id
+    if "user_id" not in payload:
+        raise HTTPException(status_code=401, detail="Token inválido: falta user_id")
+    return payload
+
+
+ACCESS_PUBLIC = "public"
+ACCESS_AUTHENTICATED = "authenticated"
+ACCESS_PERMISSION = "permission"
+
+
+class RouteRule(NamedTuple):
+    """Regla precalculada para una plantilla de ruta y un método"""
+    access: str
+    template: str
+    permission_path: str
+
+
+class RouteTable:
+    """Tabla de reglas de acceso por (plantilla de ruta, método).
+
+    Se construye una vez desde `app.routes` y `RouteConfig`. Las rutas sin
+    parámetros se resuelven con una búsqueda en diccionario; las dinámicas
+    con las expresiones ya compiladas por Starlette, respetando el orden de
+    declaración igual que el router.
+    """
+
+    def __init__(self):
+        self._static: Dict[str, List[Tuple[int, Dict[str, RouteRule]]]] = {}
+        self._dynamic: Dict[str, List[Tuple[int, Pattern, Dict[str, RouteRule]]]] = {}
+        self.built = False
+
+    @staticmethod
+    def _first_segment(path: str) -> str:
+        return path.split("/", 2)[1] if path.count("/") else ""
+
+    @staticmethod
+    def permission_path(route: BaseRoute) -> str:
+        """Plantilla con la que se guardan los permisos: parámetros enteros como {id}"""
+        template = route.path
+        dependant = getattr(route, "dependant", None)
+        if dependant is not None:
+            for param in dependant.path_params:
+                if param.field_info.annotation is int:
+                    template = template.replace("{" + param.name + "}", "{id}")
+        return template
+
+    @staticmethod
+    def classify(template: str, method: str) -> str:
+        if template in RouteConfig.PUBLIC_ROUTES:
+            return ACCESS_PUBLIC
+        if method in RouteConfig.PUBLIC_METHODS.get(template, ()):
+            return ACCESS_PUBLIC
+        if method in RouteConfig.PUBLIC_TEMPLATES.get(template, ()):
+            return ACCESS_PUBLIC
+        if any(template.startswith(prefix) for prefix in RouteConfig.PUBLIC_PATH_PREFIXES):
+            return ACCESS_PUBLIC
+        if template.startswith("/docs") or template.startswith("/redoc"):
+            return ACCESS_PUBLIC
+        if template in RouteConfig.AUTHENTICATED_ONLY_ROUTES:
+            return ACCESS_AUTHENTICATED
+        if any(template.startswith(prefix) for prefix in RouteConfig.SKIP_PERMISSION_PREFIXES):
+            return ACCESS_AUTHENTICATED
+        return ACCESS_PERMISSION
+
+    def build(self, routes: List[BaseRoute]) -> "RouteTable":
+        static: Dict[str, List[Tuple[int, Dict[str, RouteRule]]]] = {}
+        dynamic: Dict[str, List[Tuple[int, Pattern, Dict[str, RouteRule]]]] = {}
+        for index, route in enumerate(routes):
+            if not isinstance(route, (APIRoute, Route)):
+                # Mounts (p.ej. /static) se resuelven por prefijo en el middleware
+                continue
+            permission_path = self.permission_path(route)
+            rules = {
+                method: RouteRule(self.classify(route.path, method), route.path, permission_path)
+                for method in (route.methods or ())
+            }
+            if route.param_convertors:
+                bucket = dynamic.setdefault(self._first_segment(route.path), [])
+                bucket.append((index, route.path_regex, rules))
+            else:
+                static.setdefault(route.path, []).append((index, rules))
+        self._static = static
+        self._dynamic = dynamic
+        self.built = True
+        return self
+
+    def resolve(self, path: str, method: str) -> Optional[RouteRule]:
+        """Devolver la regla de la ruta que atendería el request, o None"""
+        best_index = None
+        best_rule = None
+        for index, rules in self._static.get(path, ()):
+            rule = rules.get(method)
+            if rule is not None:
+                best_index, best_rule = index, rule
+                break
+        for index, regex, rules in self._dynamic.get(self._first_segment(path), ()):
+            if best_index is not None and index > best_index:
+                break
+            rule = rules.get(method)
+            if rule is not None and regex.match(path):
+                return rule
+        return best_rule
+
+
+route_table = RouteTable()
+
+
+class AuthMiddleware:
+    """Middleware ASGI de autenticación y autorización unificado.
+
+    Implementado como ASGI puro: decide antes de llamar a la aplicación y,
+    si el request está permitido, le pasa `receive`/`send` sin envolver el
+    cuerpo del request ni de la respuesta.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        denial = self.authorize(scope)
+        if denial is not None:
+            # Devolver JSONResponse para que CORS pueda añadir cabeceras correctamente
+            await denial(scope, receive, send)
+            return
 
+        await self.app(scope, receive, send)
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    """Middleware de autenticación y autorización unificado"""
-
-    def __init__(self, app):
-        super().__init__(app)
-        self._permission_service = None
-
-    def get_permission_service(self):
-        """Obtener servicio de permisos con lazy loading"""
-        if self._permission_service:
-            return self._permission_service
-        try:
-            from config.cnx import SessionLocal
-            from permisos.services import PermisoService
-            db = SessionLocal()
-            self._permission_service = PermisoService(db)
-            return self._permission_service
-        except Exception as e:
-            print(f"Error creating permission service: {e}")
-            return None
-
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
+    def authorize(self, scope: Scope) -> Optional[JSONResponse]:
+        """Devolver la respuesta de rechazo, o None si el request puede continuar"""
+        path = scope["path"]
 
         # Verificar prefijos públicos
         for prefix in PUBLIC_PATH_PREFIXES:
             if path.startswith(prefix):
-                return await call_next(request)
+                return None
 
         # Rutas totalmente públicas
         if path in PUBLIC_ROUTES:
-            return await call_next(request)
+            return None
 
-        method = request.method
+        method = scope["method"]
 
         # Permitir siempre OPTIONS para CORS
         if method == "OPTIONS":
-            return await call_next(request)
+            return None
+
+        if not route_table.built:
+            route_table.build(scope["app"].routes)
+        rule = route_table.resolve(path, method)
 
-        # Verificar rutas públicas con lógica
-        if self.is_public_route(path, method):
-            return await call_next(request)
+        # Verificar rutas públicas precalculadas
+        if rule is not None and rule.access == ACCESS_PUBLIC:
+            return None
 
         # Obtener el token del header Authorization
-        authorization: Optional[str] = request.headers.get("Authorization")
-        print("AuthMiddleware - Authorization header:", authorization)
+        authorization: Optional[str] = Headers(scope=scope).get("Authorization")
 
         if not authorization:
-            print("AuthMiddleware - no Authorization header present")
-            # Devolver JSONResponse para que CORS pueda añadir cabeceras correctamente
+            logger.debug(f"AuthMiddleware - sin header Authorization: {method} {path}")
             return JSONResponse(status_code=401, content={"detail": "Token de autorización requerido"})
 
         try:
@@ -165,83 +320,32 @@ class AuthMiddleware(BaseHTTPMiddleware):
             try:
                 payload = verify_jwt_token(token)
             except HTTPException as ve:
-                # Devolver respuesta directamente para que CORS la procese (no relanzar)
                 return JSONResponse(status_code=ve.status_code, content={"detail": ve.detail})
 
-            request.state.user = payload
+            # Equivalente a request.state.user / request.state.principal para los handlers
+            principal = resolve_principal(payload)
+            state = scope.setdefault("state", {})
+            state["user"] = payload
+            state["principal"] = principal
 
-            if self.should_check_permissions(path):
-                user_role_id = payload.get('rol_id')
+            # Rutas no registradas: verificar permisos sobre la ruta tal cual
+            if rule is None or rule.access == ACCESS_PERMISSION:
+                user_role_id = principal.rol_id if principal is not None else payload.get('rol_id')
                 if user_role_id:
-                    normalized_path = self.normalize_path_for_permissions(path)
+                    permission_path = rule.permission_path if rule is not None else path
                     try:
-                        service = self.get_permission_service()
-                        if service:
-                            has_permission = service.user_has_permission(user_role_id, normalized_path, method)
-                            if not has_permission:
-                                return JSONResponse(status_code=403, content={"detail": "No tiene permisos para acceder a este recurso"})
-                        else:
-                            print("Warning: Permission service not available, allowing access")
+                        if not permission_matrix.has_permission(user_role_id, permission_path, method):
+                            return JSONResponse(status_code=403, content={"detail": "No tiene permisos para acceder a este recurso"})
                     except Exception as permission_error:
-                        print(f"Error verificando permisos: {permission_error}")
+                        logger.error(f"Error verificando permisos: {permission_error}")
 
         except ValueError:
             return JSONResponse(status_code=401, content={"detail": "Formato de token inválido"})
         except Exception as e:
-            print("AuthMiddleware unexpected error:", repr(e))
+            logger.error(f"AuthMiddleware unexpected error: {e!r}")
             return JSONResponse(status_code=401, content={"detail": "Error de autenticación"})
 
-        return await call_next(request)
-
-    def is_public_route(self, path: str, method: str) -> bool:
-        """Verificar si una ruta es pública"""
-        # Verificar rutas con métodos específicos
-        if path in PUBLIC_METHODS and method in PUBLIC_METHODS[path]:
-            return True
-
-        # Permitir ver productos individuales sin autenticación
-        import re
-        if method == "GET" and re.match(r'^/productos/\d+$', path):
-            return True
-        if method == "GET" and re.match(r'^/cart_items/user/\d+$', path):
-            return True
-
-        # Prefijos ya cubiertos por dispatch, pero añadir caché de seguridad
-        for public_prefix in ["/docs", "/redoc"]:
-            if path.startswith(public_prefix):
-                return True
-
-        return False
-
-    def should_check_permissions(self, path: str) -> bool:
-        """Determinar si se debe verificar permisos para una ruta"""
-        skip_permission_paths = ["/health", "/favicon.ico", "/openapi.json", "/docs", "/redoc"]
-        for skip_path in skip_permission_paths:
-            if path.startswith(skip_path):
-                return False
-        if path in AUTHENTICATED_ONLY_ROUTES:
-            return False
-        return True
-
-    def normalize_path_for_permissions(self, path: str) -> str:
-        """Normalizar ruta para verificación de permisos"""
-        import re
-        patterns = [
-            (r'/usuarios/\d+', '/usuarios/{id}'),
-            (r'/roles/\d+', '/roles/{id}'),
-            (r'/productos/\d+', '/productos/{id}'),
-            (r'/cart_items/\d+', '/cart_items/{id}'),
-            (r'/cart_items/user/\d+', '/cart_items/user/{id}'),
-            (r'/cart_items/user/\d+/clear', '/cart_items/user/{id}/clear'),
-            (r'/permisos/\d+', '/permisos/{id}'),
-            (r'/permisos/rol/\d+', '/permisos/rol/{id}'),
-            (r'/permisos/usuario/\d+/permisos', '/permisos/usuario/{id}/permisos'),
-            (r'/permisos/ruta/[^/]+/metodo/[^/]+', '/permisos/ruta/{ruta}/metodo/{metodo}'),
-        ]
-        normalized_path = path
-        for pattern, replacement in patterns:
-            normalized_path = re.sub(pattern, replacement, normalized_path)
-        return normalized_path
+        return None
 
 
 ### REVISAR 
@@ -250,7 +354,7 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 # Dependency para verificar el token JWT en endpoints específicos
 async def verify_token(token: str = Depends(oauth2_scheme)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_jwt(token)
         # Aquí podrías realizar validaciones adicionales si lo necesitas
         return payload
     except jwt.ExpiredSignatureError:
@@ -258,6 +362,27 @@ async def verify_token(token: str = Depends(oauth2_scheme)):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
+
+def request_principal(request: Request, token: Optional[str]) -> Optional[Principal]:
+    """Principal del request resuelto por el middleware.
+
+    En rutas públicas el middleware no autentica, así que se resuelve aquí a
+    partir del token y se guarda en request.state para el resto del request.
+    """
+    state = request.scope.setdefault("state", {})
+    if "principal" in state:
+        return state["principal"]
+    if not token:
+        return None
+    try:
+        payload = decode_jwt(token)
+    except jwt.InvalidTokenError:
+        return None
+    state.setdefault("user", payload)
+    state["principal"] = resolve_principal(payload)
+    return state["principal"]
+
+
 # Dependency para obtener el usuario actual desde el middleware
 async def get_current_user(request: Request):
     """Obtener el usuario actual desde el estado del request (middleware)"""
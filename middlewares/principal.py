@@ -0,0 +1,136 @@
+"""
+Principal por request: usuario, rol, nombre del rol y permisos.
+
+El AuthMiddleware lo resuelve una vez y lo deja en `request.state.principal`;
+las dependencias (verify_admin, verify_authenticated_user,
+verify_token_and_permissions) lo leen de ahí. El rol y los permisos salen de
+la matriz de permisos en memoria y los datos del usuario de una caché con
+TTL corto que los servicios de usuarios invalidan al modificar o borrar.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, Hashable, Optional, Tuple
+
+from config.auth import PRINCIPAL_CACHE_TTL
+from config.cnx import SessionLocal
+from permisos.matrix import permission_matrix
+from usuarios.model import Usuario
+
+logger = logging.getLogger(__name__)
+
+ADMIN_ROLE_NAME = "Administrador"
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    username: str
+    rol_id: int
+    rol_nombre: Optional[str]
+    permisos: FrozenSet[str]
+
+    @property
+    def is_admin(self) -> bool:
+        return self.rol_nombre == ADMIN_ROLE_NAME
+
+    def has_permission(self, permiso_nombre: str) -> bool:
+        return permiso_nombre in self.permisos
+
+
+# (usu_id, usu_usuario, usu_rol_id)
+UserRecord = Tuple[int, str, int]
+
+
+class UserCache:
+    """Caché LRU con TTL de los datos del usuario que necesita el principal"""
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 4096, session_factory=SessionLocal,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._session_factory = session_factory
+        self._clock = clock
+        self._lock = threading.Lock()
+        # La clave es el usu_id (int) o el nombre de usuario (str)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Optional[UserRecord]]]" = OrderedDict()
+
+    def _load(self, user_id: Optional[int], username: Optional[str]) -> Optional[UserRecord]:
+        db = self._session_factory()
+        try:
+            query = db.query(Usuario.usu_id, Usuario.usu_usuario, Usuario.usu_rol_id)
+            row = None
+            if user_id is not None:
+                row = query.filter(Usuario.usu_id == user_id).first()
+            if row is None and username:
+                row = query.filter(Usuario.usu_usuario == username).first()
+        finally:
+            db.close()
+        return (int(row[0]), row[1], int(row[2])) if row is not None else None
+
+    def get(self, user_id: Optional[int], username: Optional[str] = None) -> Optional[UserRecord]:
+        key: Hashable = user_id if user_id is not None else username
+        if key is None:
+            return None
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[0]:
+                self._entries.move_to_end(key)
+                return entry[1]
+        record = self._load(user_id, username)
+        with self._lock:
+            # También se cachea la ausencia para no repetir la consulta en cada request
+            self._entries[key] = (now + self.ttl, record)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return record
+
+    def invalidate(self, user_id: int) -> None:
+        """Descartar las entradas de un usuario (por id o por nombre)"""
+        with self._lock:
+            stale = [key for key, (_, record) in self._entries.items()
+                     if key == user_id or (record is not None and record[0] == user_id)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(ttl=PRINCIPAL_CACHE_TTL)
+
+
+def _lookup_keys(payload: dict) -> Tuple[Optional[int], Optional[str]]:
+    """Obtener id y nombre de usuario de las distintas formas de claims del JWT"""
+    user_id = None
+    sub = payload.get("sub")
+    # sub puede ser un número (id) o un string (email)
+    if isinstance(sub, int) or (isinstance(sub, str) and sub.isdigit()):
+        user_id = int(sub)
+    if user_id is None:
+        raw = payload.get("user_id") or payload.get("userId")
+        if isinstance(raw, int) or (isinstance(raw, str) and raw.isdigit()):
+            user_id = int(raw)
+    username = payload.get("username") or payload.get("usu_usuario") or payload.get("email") or sub
+    return user_id, username if isinstance(username, str) and username else None
+
+
+def resolve_principal(payload: dict) -> Optional[Principal]:
+    """Construir el principal a partir de un payload JWT ya verificado"""
+    user_id, username = _lookup_keys(payload)
+    record = user_cache.get(user_id, username)
+    if record is None:
+        return None
+    usu_id, usu_usuario, rol_id = record
+    return Principal(
+        user_id=usu_id,
+        username=usu_usuario,
+        rol_id=rol_id,
+        rol_nombre=permission_matrix.role_name(rol_id),
+        permisos=permission_matrix.permission_names(rol_id),
+    )
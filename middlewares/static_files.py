@@ -0,0 +1,176 @@
+"""
+Servido de /static con caché inmutable y variantes precomprimidas.
+
+- Los archivos con hash en el nombre (uploads por contenido, sus variantes,
+  assets versionados tipo `app.3f2a9c1b7d4e5f60.js`) no cambian nunca: se
+  mandan con `Cache-Control: public, max-age=31536000, immutable` y el
+  navegador no los vuelve a pedir. El resto se revalida con ETag / Last-Modified.
+- Si existe un hermano `.br` o `.gz` (lo genera `precompress_tree`, offline)
+  y el cliente lo acepta, se sirve ése con `Content-Encoding`; no se comprime
+  nada en el request. Un hermano vacío es la marca de "no conviene
+  comprimir" que deja `precompress_tree` y nunca se sirve.
+- Range e If-Modified-Since / If-None-Match los resuelve FileResponse /
+  StaticFiles sin leer el archivo. Un pedido con Range siempre recibe la
+  representación sin comprimir, para que los offsets sean los del original.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import re
+import shutil
+from typing import Dict, Iterator, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Scope
+
+from config.catalog import STATIC_CACHE_CONTROL, STATIC_IMMUTABLE_CACHE_CONTROL
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Orden de preferencia: brotli comprime mejor que gzip
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".json", ".map", ".html", ".htm", ".txt", ".svg", ".xml", ".csv", ".ico", ".wasm",
+}
+# <sha256>.<ext>, <sha256>_<variante>.<ext> o nombre.<hash hex>.<ext>. El hash de
+# un asset pide 16 hex con al menos una letra: fechas o números como
+# `promo-20251018.jpg` no son hashes y ese archivo puede reemplazarse
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(_[a-z]+)?\.[^.]+$|[.-](?=[0-9]*[a-f])[0-9a-f]{16,}\.[^.]+$")
+
+
+def is_hashed_name(path: str) -> bool:
+    """True si el nombre lleva un hash de contenido (la URL nunca cambia de contenido)"""
+    return bool(HASHED_NAME.search(os.path.basename(path)))
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Codificaciones aceptadas con su q (las de q=0 se excluyen)"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted[token] = quality
+        else:
+            accepted.pop(token, None)
+    return accepted
+
+
+class CachedStaticFiles(StaticFiles):
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        # El Content-Type es el del original aunque se sirva el .br/.gz
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+
+        encoding, served_path, served_stat = None, full_path, stat_result
+        has_siblings = False
+        if os.path.splitext(full_path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            accepted = accepted_encodings(request_headers.get("accept-encoding"))
+            for name, suffix in ENCODINGS:
+                try:
+                    sibling_stat = os.stat(full_path + suffix)
+                except OSError:
+                    continue
+                if sibling_stat.st_size == 0 or sibling_stat.st_mtime < stat_result.st_mtime:
+                    # Marca de incompresible, o quedó viejo (el original cambió
+                    # y no se volvió a precomprimir)
+                    continue
+                has_siblings = True
+                if encoding is None and "range" not in request_headers and (name in accepted or "*" in accepted):
+                    encoding, served_path, served_stat = name, full_path + suffix, sibling_stat
+
+        response = FileResponse(served_path, status_code=status_code, stat_result=served_stat, media_type=media_type)
+        if encoding is not None:
+            response.headers["content-encoding"] = encoding
+        if has_siblings:
+            response.headers["vary"] = "Accept-Encoding"
+        response.headers["cache-control"] = (
+            STATIC_IMMUTABLE_CACHE_CONTROL if is_hashed_name(full_path) else STATIC_CACHE_CONTROL
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def _compress_gzip(source: str, target: str) -> None:
+    with open(source, "rb") as src, open(target, "wb") as raw:
+        # mtime=0: el .gz es reproducible y no cambia si el original no cambió
+        with gzip.GzipFile(filename="", mode="wb", compresslevel=9, fileobj=raw, mtime=0) as out:
+            shutil.copyfileobj(src, out)
+
+
+def _compress_brotli(source: str, target: str) -> None:
+    with open(source, "rb") as src:
+        data = src.read()
+    with open(target, "wb") as out:
+        out.write(brotli.compress(data, quality=11))
+
+
+def _compressors():
+    yield ".gz", _compress_gzip
+    if brotli is not None:
+        yield ".br", _compress_brotli
+
+
+def iter_compressible(root: str) -> Iterator[str]:
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                yield os.path.join(directory, name)
+
+
+def precompress_tree(root: str, min_ratio: float = 0.95) -> Tuple[int, int]:
+    """
+    Generar los hermanos .gz (y .br si está el paquete brotli) de los archivos
+    comprimibles de `root`. Es incremental: salta los que ya están al día.
+    Si la compresión no ahorra al menos un 5% se deja un hermano vacío como
+    marca, así la próxima pasada no lo vuelve a comprimir mientras el original
+    no cambie.
+
+    Devuelve (archivos escritos, bytes ahorrados).
+    """
+    written = saved = 0
+    for path in iter_compressible(root):
+        source_stat = os.stat(path)
+        for suffix, compress in _compressors():
+            target = path + suffix
+            if os.path.exists(target) and os.stat(target).st_mtime >= source_stat.st_mtime:
+                continue
+            tmp = target + ".tmp"
+            compress(path, tmp)
+            size = os.path.getsize(tmp)
+            if size > source_stat.st_size * min_ratio:
+                os.remove(tmp)
+                open(target, "wb").close()
+                continue
+            os.replace(tmp, target)
+            written += 1
+            saved += source_stat.st_size - size
+    if brotli is None:
+        logger.warning("El paquete brotli no está instalado: sólo se generaron archivos .gz")
+    return written, saved
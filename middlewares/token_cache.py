@@ -0,0 +1,82 @@
+"""
+Caché LRU de tokens JWT ya verificados.
+
+La clave es el digest SHA-256 del token (nunca se guarda el token en claro)
+y cada entrada vence en el `exp` del propio token, así un token expirado no
+puede salir de la caché aunque siga dentro del límite de tamaño.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+class VerifiedTokenCache:
+    """LRU acotado de payloads verificados con vencimiento por `exp`"""
+
+    def __init__(self, maxsize: int = 2048, default_ttl: float = 300.0, clock: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        # TTL para tokens sin claim `exp`
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(payload)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, payload: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        now = self._clock()
+        exp = payload.get("exp")
+        expires_at = float(exp) if isinstance(exp, (int, float)) else now + self.default_ttl
+        if expires_at <= now:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._purge_expired(now)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
@@ -0,0 +1,53 @@
+"""
+Límite de tamaño para los cuerpos multipart/form-data (uploads).
+
+Starlette parsea el multipart completo antes de llamar al endpoint, así que
+un límite dentro del handler llega tarde. Este middleware ASGI corta antes:
+con Content-Length rechaza con 413 sin leer el cuerpo, y sin él (chunked)
+cuenta los bytes a medida que el parser los pide a `receive` y corta apenas
+se pasa del límite.
+"""
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.catalog import UPLOAD_FORM_OVERHEAD, UPLOAD_MAX_BYTES
+
+TOO_LARGE_DETAIL = "El archivo supera el tamaño máximo permitido"
+
+
+class UploadLimitMiddleware:
+    def __init__(self, app: ASGIApp, max_body_bytes: int = UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").lower().startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            response = JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content={"detail": TOO_LARGE_DETAIL})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+        limit = self.max_body_bytes
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI propaga las HTTPException del parseo del cuerpo tal cual
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
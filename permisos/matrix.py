@@ -0,0 +1,166 @@
+"""
+Matriz de permisos compilada en memoria.
+
+Se carga una vez desde `permisos` JOIN `rol_permiso` y responde
+(rol_id, ruta normalizada, método) con una búsqueda en un set, sin tocar
+la base de datos. También guarda el nombre de cada rol y los nombres de sus
+permisos, que usa el principal por request. Los endpoints de escritura de
+permisos y roles llaman a `invalidate()` y la matriz se reconstruye en la
+siguiente consulta.
+
+Cada worker tiene su copia. Para que los cambios hechos en otro proceso
+lleguen a todos, `invalidate()` también incrementa la versión guardada en
+`permission_state` y cada matriz la compara con la de su copia (como mucho
+cada PERMISSION_MATRIX_CHECK_SECONDS): si cambió, recarga. Si la tabla no
+está, la matriz se recarga entera en cada verificación.
+"""
+import logging
+import threading
+import time
+from typing import Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from config.associations import rol_permiso_association
+from config.auth import PERMISSION_MATRIX_CHECK_SECONDS
+from config.cnx import SessionLocal
+from permisos.model import Permiso, permission_state
+from roles.model import Rol
+
+logger = logging.getLogger(__name__)
+
+PermissionEntry = Tuple[int, str, str]
+
+
+class MatrixSnapshot(NamedTuple):
+    entries: FrozenSet[PermissionEntry]
+    role_names: Dict[int, str]
+    role_permisos: Dict[int, FrozenSet[str]]
+    # Versión de `permission_state` leída antes de cargar (None si no hay tabla)
+    db_version: Optional[int] = None
+
+
+class PermissionMatrix:
+    """Conjunto inmutable de (rol_id, ruta, método) con recarga perezosa"""
+
+    def __init__(self, session_factory=SessionLocal, check_seconds: float = PERMISSION_MATRIX_CHECK_SECONDS):
+        self._session_factory = session_factory
+        self._check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[MatrixSnapshot] = None
+        self._version = 0
+        self._checked_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def _read_version(self) -> Optional[int]:
+        """Versión compartida de la matriz; None si `permission_state` no existe"""
+        db = self._session_factory()
+        try:
+            version = db.execute(
+                select(permission_state.c.version).where(permission_state.c.id == 1)
+            ).scalar()
+        except SQLAlchemyError:
+            return None
+        finally:
+            db.close()
+        return version or 0
+
+    def _bump_version(self) -> None:
+        """Incrementar la versión compartida para que los demás procesos recarguen"""
+        db = self._session_factory()
+        try:
+            bump = update(permission_state).where(permission_state.c.id == 1).values(
+                version=permission_state.c.version + 1
+            )
+            if not db.execute(bump).rowcount:
+                try:
+                    db.execute(insert(permission_state).values(id=1, version=1))
+                except IntegrityError:
+                    # Otro proceso creó la fila al mismo tiempo
+                    db.rollback()
+                    db.execute(bump)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"No se pudo incrementar la versión de permisos: {e}")
+        finally:
+            db.close()
+
+    def _fetch(self) -> MatrixSnapshot:
+        db_version = self._read_version()
+        db = self._session_factory()
+        try:
+            rows = db.execute(
+                select(
+                    rol_permiso_association.c.rol_id,
+                    Permiso.permiso_ruta,
+                    Permiso.permiso_metodo,
+                    Permiso.permiso_nombre,
+                )
+                .join(Permiso, Permiso.permiso_id == rol_permiso_association.c.permiso_id)
+                .where(Permiso.permiso_activo == True)  # noqa: E712
+            ).all()
+            roles = db.execute(select(Rol.rol_id, Rol.rol_nombre)).all()
+        finally:
+            db.close()
+
+        names: Dict[int, set] = {}
+        for rol_id, _, _, nombre in rows:
+            names.setdefault(int(rol_id), set()).add(nombre)
+        return MatrixSnapshot(
+            entries=frozenset((int(rol_id), ruta, metodo.upper()) for rol_id, ruta, metodo, _ in rows),
+            role_names={int(rol_id): nombre for rol_id, nombre in roles},
+            role_permisos={rol_id: frozenset(values) for rol_id, values in names.items()},
+            db_version=db_version,
+        )
+
+    def load(self) -> MatrixSnapshot:
+        """Cargar (o recargar) la matriz desde la base de datos"""
+        version = self._version
+        snapshot = self._fetch()
+        with self._lock:
+            # Si hubo una invalidación durante la carga, no instalar datos viejos
+            if version == self._version:
+                self._snapshot = snapshot
+                self._checked_at = time.monotonic()
+        logger.info(f"Matriz de permisos cargada: {len(snapshot.entries)} entradas")
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Descartar la matriz en este y, vía `permission_state`, en los demás procesos"""
+        self._bump_version()
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def _stale(self, snapshot: MatrixSnapshot) -> bool:
+        """Si la versión de la base cambió desde la carga (o no hay tabla para saberlo)"""
+        now = time.monotonic()
+        if now - self._checked_at < self._check_seconds:
+            return False
+        self._checked_at = now
+        db_version = self._read_version()
+        return db_version is None or db_version != snapshot.db_version
+
+    def _current(self) -> MatrixSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or self._stale(snapshot):
+            snapshot = self.load()
+        return snapshot
+
+    def has_permission(self, rol_id: int, ruta: str, metodo: str) -> bool:
+        return (int(rol_id), ruta, metodo.upper()) in self._current().entries
+
+    def role_name(self, rol_id: int) -> Optional[str]:
+        return self._current().role_names.get(int(rol_id))
+
+    def permission_names(self, rol_id: int) -> FrozenSet[str]:
+        return self._current().role_permisos.get(int(rol_id), frozenset())
+
+
+# Instancia compartida por el middleware y los servicios de escritura
+permission_matrix = PermissionMatrix()
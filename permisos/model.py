@@ -20,4 +20,14 @@ class Permiso(Base):
     roles = relationship("Rol", secondary=rol_permiso_association, back_populates="permisos")
     
     def __repr__(self):
-        return f"<Permiso(id={self.permiso_id}, nombre='{self.permiso_nombre}', ruta='{self.permiso_ruta}', metodo='{self.permiso_metodo}')>"
\ No newline at end of file
+        return f"<Permiso(id={self.permiso_id}, nombre='{self.permiso_nombre}', ruta='{self.permiso_ruta}', metodo='{self.permiso_metodo}')>"
+
+
+# Versión de la matriz de permisos compartida entre procesos (permisos/matrix.py):
+# una sola fila (id=1) que se incrementa con cada escritura de permisos o roles
+permission_state = Table(
+    "permission_state",
+    Base.metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("version", Integer, nullable=False, default=0),
+)
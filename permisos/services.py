@@ -7,6 +7,7 @@ from fastapi import HTTPException
 from permisos.model import Permiso
 from permisos.dto import PermisoCreate, PermisoUpdate, RolPermisoAssign, RolPermisoRemove
 from roles.model import Rol
+from permisos.matrix import permission_matrix
 
 class PermisoService:
     
@@ -54,6 +55,7 @@ class PermisoService:
             self.db.add(permiso)
             self.db.commit()
             self.db.refresh(permiso)
+            permission_matrix.invalidate()
             return permiso
         except IntegrityError as e:
             self.db.rollback()
@@ -86,6 +88,7 @@ class PermisoService:
             
             self.db.commit()
             self.db.refresh(permiso)
+            permission_matrix.invalidate()
             return permiso
         except IntegrityError:
             self.db.rollback()
@@ -100,6 +103,7 @@ class PermisoService:
         try:
             self.db.delete(permiso)
             self.db.commit()
+            permission_matrix.invalidate()
             return True
         except IntegrityError:
             self.db.rollback()
@@ -138,6 +142,7 @@ class PermisoService:
                 })
             
             self.db.commit()
+            permission_matrix.invalidate()
             return {"message": "Permisos asignados correctamente", "rol_id": assign_data.rol_id}
         except IntegrityError:
             self.db.rollback()
@@ -162,6 +167,7 @@ class PermisoService:
                 })
             
             self.db.commit()
+            permission_matrix.invalidate()
             return {"message": "Permisos removidos correctamente", "rol_id": remove_data.rol_id}
         except Exception:
             self.db.rollback()
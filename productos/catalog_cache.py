@@ -0,0 +1,157 @@
+"""
+Versión del catálogo y GET condicional (ETag / If-None-Match).
+
+La versión vive en la base: una fila de `catalog_state` que triggers de
+`products` incrementan en cada INSERT, UPDATE o DELETE, venga de donde venga
+la escritura (servicios, importación, seeders, scripts, SQL manual, otro
+worker). El ETag de una respuesta de lectura es un hash de (época de la base,
+versión, ruta y query string): la dependencia lee una fila por request y, si
+el cliente manda el mismo ETag, corta con 304 antes de ejecutar el endpoint.
+Si la misma URL tiene varias representaciones (la exportación con o sin
+gzip), cada una lleva su sufijo en el ETag (`"<hash>-gzip"`).
+
+La época se genera al crear la fila, así una base recreada nunca repite un
+ETag viejo. Si la tabla no está (motor sin triggers instalados) se usa un
+contador local al proceso con una época por arranque, como antes.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+CATALOG_STATE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS catalog_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        epoch TEXT NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO catalog_state (id, epoch, version) VALUES (1, lower(hex(randomblob(8))), 0)",
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_version_{suffix} AFTER {event} ON products BEGIN
+        UPDATE catalog_state SET version = version + 1 WHERE id = 1;
+    END
+    """
+    for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE"))
+]
+
+BUMP_SQL = text("UPDATE catalog_state SET version = version + 1 WHERE id = 1")
+READ_SQL = text("SELECT epoch, version FROM catalog_state WHERE id = 1")
+
+
+def install_catalog_version(conn) -> bool:
+    """Crear la fila de versión y los triggers de `products` que la incrementan"""
+    if conn.dialect.name != "sqlite":
+        return False
+    for statement in CATALOG_STATE_DDL:
+        conn.execute(text(statement))
+    return True
+
+
+class CatalogVersion:
+    """Versión del catálogo leída de `catalog_state`, con contador local de respaldo"""
+
+    def __init__(self, connect: Optional[Callable] = None):
+        # `connect` devuelve un context manager de conexión (p.ej. `engine.connect`)
+        self._connect = connect
+        self.epoch = f"{int(time.time()):x}{os.getpid():x}"
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._connect is None:
+            from config.cnx import engine
+            self._connect = engine.connect
+        return self._connect()
+
+    def _read(self) -> Optional[Tuple[str, int]]:
+        try:
+            with self._connection() as conn:
+                row = conn.execute(READ_SQL).first()
+        except SQLAlchemyError:
+            return None
+        return (row.epoch, row.version) if row is not None else None
+
+    @property
+    def value(self) -> str:
+        """Identificador de la versión actual (época y contador)"""
+        state = self._read()
+        if state is None:
+            return f"{self.epoch}:{self._value}"
+        return f"{state[0]}:{state[1]}"
+
+    def bump(self) -> None:
+        """Forzar una versión nueva para cambios que no pasan por `products`"""
+        try:
+            with self._connection() as conn:
+                updated = conn.execute(BUMP_SQL).rowcount
+                conn.commit()
+        except SQLAlchemyError:
+            updated = 0
+        if not updated:
+            self.touch()
+
+    def touch(self) -> None:
+        """
+        Avanzar sólo el contador local, sin tocar la base: lo usan los
+        servicios después de escribir `products`, donde los triggers ya
+        incrementan `catalog_state` dentro de la misma transacción.
+        """
+        with self._lock:
+            self._value += 1
+
+    def etag(self, path: str, query: str = "", variant: str = "") -> str:
+        digest = hashlib.blake2b(
+            f"{self.value}:{path}?{query}".encode("utf-8"), digest_size=12
+        ).hexdigest()
+        return f'"{digest}-{variant}"' if variant else f'"{digest}"'
+
+
+catalog_version = CatalogVersion()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def conditional_get(cache_control: str, version: Optional[CatalogVersion] = None,
+                    variant: Optional[Callable[[Request], str]] = None):
+    """
+    Dependencia que agrega ETag/Cache-Control o responde 304 sin ejecutar el
+    endpoint. `variant` devuelve el sufijo de la representación del request
+    (p.ej. "gzip"), para que distintas codificaciones no compartan ETag.
+    """
+
+    def dependency(request: Request, response: Response) -> None:
+        # La versión se lee antes de consultar: si hay una escritura en el medio,
+        # la respuesta queda con un ETag viejo y la próxima revalidación la reemplaza
+        etag = (version or catalog_version).etag(
+            request.url.path, request.url.query, variant(request) if variant else ""
+        )
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
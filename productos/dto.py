@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, computed_field, model_validator
+from typing import Dict, List, Optional
+
+from .variants import image_variants_for
 
 
 class ProductBase(BaseModel):
@@ -43,6 +45,15 @@ class ProductUpdate(BaseModel):
 
 class ProductOut(ProductBase):
     id: int
+    effective_price: Optional[float] = Field(None, description="Precio con el descuento aplicado")
+    # Se lee con la fila para decidir si exponer las variantes; no sale en la respuesta
+    image_variants_ready: bool = Field(False, exclude=True)
+
+    @computed_field(description="URLs de las variantes redimensionadas ({thumb, card, detail} x {webp, jpeg})")
+    @property
+    def image_variants(self) -> Optional[Dict[str, Dict[str, str]]]:
+        # Se deducen del hash en image_url; None si todavía no se generaron
+        return image_variants_for(self.image_url, self.image_variants_ready)
 
     class Config:
         from_attributes = True
@@ -53,6 +64,102 @@ class ProductOut(ProductBase):
                 "description": "Zapatillas deportivas cómodas y elegantes",
                 "price": 150.99,
                 "image_url": "https://example.com/nike-air-max.jpg",
-                "discount": 10.0
+                "discount": 10.0,
+                "effective_price": 135.89
             }
         }
+
+
+class ProductPage(BaseModel):
+    items: List[ProductOut]
+    next_cursor: Optional[str] = Field(None, description="Cursor opaco para pedir la página siguiente")
+    limit: int
+
+
+class ProductSearchHit(ProductOut):
+    score: float = Field(..., description="Relevancia bm25 (menor es más relevante)")
+    name_highlight: Optional[str] = Field(None, description="Nombre con coincidencias en <mark>")
+    description_snippet: Optional[str] = Field(None, description="Fragmento de la descripción con coincidencias en <mark>")
+
+
+class ProductSearchPage(BaseModel):
+    items: List[ProductSearchHit]
+    page: int
+    limit: int
+    has_more: bool
+
+
+class FacetBucket(BaseModel):
+    value: str
+    count: int
+
+
+class ProductFacets(BaseModel):
+    categories: List[FacetBucket]
+    price: List[FacetBucket]
+    discount: List[FacetBucket]
+
+
+class ProductImportRow(ProductBase):
+    id: Optional[int] = Field(None, gt=0, description="Si se indica y existe, se actualiza ese producto")
+    # Sin valor no se pisa el descuento de un producto existente (al insertar queda en 0)
+    discount: Optional[float] = Field(None, ge=0, le=100, description="Descuento del producto (0-100%)")
+
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ProductImportReport(BaseModel):
+    processed: int
+    upserted: int
+    failed: int
+    batches: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+
+
+class RepricingRule(BaseModel):
+    # Selección (sin selector la regla aplica a todo el catálogo)
+    category: Optional[str] = Field(None, description="Categoría a la que aplica la regla")
+    ids: Optional[List[int]] = Field(None, min_length=1, description="IDs de productos a los que aplica la regla")
+    # Acciones, en este orden: fijar, multiplicar, sumar, redondear; el descuento se fija aparte
+    set_price: Optional[float] = Field(None, gt=0)
+    multiply_price: Optional[float] = Field(None, gt=0, description="Ej: 1.08 para +8%")
+    add_price: Optional[float] = None
+    round_to: Optional[float] = Field(None, ge=0, lt=1, description="Terminación del precio, ej: 0.99")
+    set_discount: Optional[float] = Field(None, ge=0, le=100)
+
+    @model_validator(mode="after")
+    def check_action(self):
+        actions = (self.set_price, self.multiply_price, self.add_price, self.round_to, self.set_discount)
+        if all(action is None for action in actions):
+            raise ValueError("La regla debe indicar al menos una acción")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {"category": "hombre", "multiply_price": 1.08, "round_to": 0.99}
+        }
+
+
+class RepricingRequest(BaseModel):
+    rules: List[RepricingRule] = Field(..., min_length=1)
+    dry_run: bool = Field(False, description="Sólo calcular el diff, sin guardar")
+
+
+class PriceChangeOut(BaseModel):
+    id: int
+    old_price: float
+    new_price: float
+    old_discount: float
+    new_discount: float
+
+
+class RepricingResult(BaseModel):
+    dry_run: bool
+    matched: int
+    changed: int
+    changes: List[PriceChangeOut]
+    changes_truncated: bool
@@ -0,0 +1,179 @@
+"""
+Exportación del catálogo en streaming (NDJSON o CSV, opcionalmente gzip).
+
+Las filas se leen con `yield_per` en ventanas por id (`id > último`), cada
+una con su propia conexión corta: la memoria queda acotada a un lote sin
+importar el tamaño del catálogo y no se mantiene abierta una transacción de
+lectura mientras un cliente lento descarga (en SQLite eso bloquearía a los
+escritores). Cada lote se convierte a bytes y, si corresponde, se comprime
+de forma incremental.
+
+`since` filtra por `updated_at`, que mantienen triggers de `products` para
+cualquier escritura (servicios, importación, recálculo, SQL manual). El
+valor se guarda como texto UTC con milisegundos para poder comparar como
+string y usar el índice (updated_at, id).
+
+La respuesta comprimida y la sin comprimir son representaciones distintas de
+la misma URL: `export_encoding` decide cuál va y el ETag lleva ese sufijo.
+"""
+import csv
+import io
+import logging
+import zlib
+from datetime import datetime, timezone
+from typing import Callable, Iterator, List, Optional
+
+from fastapi import Request
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import String, bindparam, literal_column, select, text, type_coerce, update
+
+from config.fast_json import dumps
+from middlewares.static_files import accepted_encodings
+from .model import Product
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+MEDIA_TYPES = {
+    FORMAT_NDJSON: "application/x-ndjson",
+    FORMAT_CSV: "text/csv; charset=utf-8",
+}
+EXPORT_COLUMNS = (
+    "id", "name", "description", "price", "discount", "effective_price", "category", "image_url", "updated_at",
+)
+
+_GZIP_FLAG = TypeAdapter(bool)
+
+TIMESTAMP_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Columnas cuyo cambio cuenta como modificación del producto
+TRACKED_COLUMNS = "name, description, price, image_url, discount, category, category_key"
+
+CHANGE_TRACKING_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_touch_ai AFTER INSERT ON products
+    WHEN new.updated_at IS NULL BEGIN
+        UPDATE products SET updated_at = {TIMESTAMP_SQL} WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_touch_au AFTER UPDATE OF {TRACKED_COLUMNS} ON products
+    WHEN new.updated_at IS old.updated_at BEGIN
+        UPDATE products SET updated_at = {TIMESTAMP_SQL} WHERE id = new.id;
+    END
+    """,
+]
+
+
+def install_change_tracking(conn) -> bool:
+    """Completar `updated_at` donde falte e instalar los triggers que lo mantienen"""
+    if conn.dialect.name != "sqlite":
+        return False
+    products = Product.__table__
+    conn.execute(
+        update(products).where(products.c.updated_at.is_(None)).values(updated_at=literal_column(TIMESTAMP_SQL))
+    )
+    for statement in CHANGE_TRACKING_DDL:
+        conn.execute(text(statement))
+    return True
+
+
+def format_since(since: datetime) -> str:
+    """Fecha del filtro en el mismo formato de texto que `updated_at` (UTC)"""
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def iter_batches(connect: Callable, since: Optional[datetime] = None, batch_size: int = 1000) -> Iterator[List[dict]]:
+    """
+    Lotes de filas ordenadas por id. `connect` devuelve un context manager de
+    conexión (p.ej. `engine.connect`); se abre uno por ventana.
+    """
+    products = Product.__table__
+    # updated_at se lee y compara como el texto que escriben los triggers
+    updated_at = type_coerce(products.c.updated_at, String)
+    statement = (
+        select(
+            products.c.id, products.c.name, products.c.description, products.c.price, products.c.discount,
+            products.c.effective_price, products.c.category, products.c.image_url, updated_at.label("updated_at"),
+        )
+        .where(products.c.id > bindparam("last_id"))
+        .order_by(products.c.id)
+        .limit(batch_size)
+    )
+    params = {"last_id": 0}
+    if since is not None:
+        statement = statement.where(updated_at >= format_since(since))
+    while True:
+        with connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(statement, params)
+            batch = [dict(row._mapping) for row in result]
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        params["last_id"] = batch[-1]["id"]
+
+
+def _updated_at(value) -> Optional[str]:
+    # Texto de SQLite ("2025-01-01 12:00:00.123") a ISO 8601 UTC
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    return value.replace(" ", "T") + "Z"
+
+
+def encode_ndjson(batch: List[dict]) -> bytes:
+    for row in batch:
+        row["updated_at"] = _updated_at(row["updated_at"])
+    return b"".join(dumps(row) + b"\n" for row in batch)
+
+
+def encode_csv(batch: List[dict], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in batch:
+        row["updated_at"] = _updated_at(row["updated_at"])
+        writer.writerow(["" if row[column] is None else row[column] for column in EXPORT_COLUMNS])
+    return buffer.getvalue().encode("utf-8")
+
+
+def export_stream(batches: Iterator[List[dict]], fmt: str, compress: bool = False) -> Iterator[bytes]:
+    """Convertir los lotes a bytes en el formato pedido, comprimiendo si corresponde"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: formato gzip
+    exported = 0
+
+    def emit(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    header = fmt == FORMAT_CSV
+    for batch in batches:
+        exported += len(batch)
+        chunk = emit(encode_csv(batch, header=header) if fmt == FORMAT_CSV else encode_ndjson(batch))
+        header = False
+        if chunk:
+            yield chunk
+    if header:
+        # CSV sin filas: igual lleva el encabezado
+        yield emit(encode_csv([], header=True))
+    if compressor:
+        yield compressor.flush()
+    logger.info(f"Exportación {fmt}{' (gzip)' if compress else ''}: {exported} productos")
+
+
+def export_encoding(request: Request) -> str:
+    """Codificación de la exportación, "gzip" o vacía: manda ?gzip=, si no Accept-Encoding"""
+    flag = request.query_params.get("gzip")
+    if flag is not None:
+        try:
+            return "gzip" if _GZIP_FLAG.validate_python(flag) else ""
+        except ValidationError:
+            # El endpoint responde 422 con la validación del parámetro
+            return ""
+    return "gzip" if "gzip" in accepted_encodings(request.headers.get("accept-encoding")) else ""
@@ -0,0 +1,156 @@
+"""
+Categorías normalizadas y conteos por faceta precalculados.
+
+`normalize_category` produce la clave exacta e indexada de cada categoría
+("Remeras Hombre" -> "remeras-hombre"). Los conteos para el menú de
+navegación viven en `product_facet_counts` (faceta, bucket, cantidad) y los
+actualizan triggers de `products` con +1/-1 en cada escritura, así leer las
+facetas es leer unas pocas filas y no agrupar todo el catálogo.
+"""
+import logging
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import case, column, delete, func, insert, literal, select, table, text
+
+logger = logging.getLogger(__name__)
+
+FACETS_TABLE = "product_facet_counts"
+
+facet_counts = table(FACETS_TABLE, column("facet"), column("bucket"), column("count"))
+
+# Límites inferiores de cada bucket; el último es abierto ("500+")
+PRICE_EDGES: Sequence[int] = (0, 25, 50, 100, 200, 500)
+DISCOUNT_EDGES: Sequence[int] = (0, 10, 25, 50)
+
+_SEPARATORS_RE = re.compile(r"[\s_/]+")
+
+
+def normalize_category(value: Optional[str]) -> Optional[str]:
+    """Clave de categoría: minúsculas, sin acentos y con guiones"""
+    if value is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", value)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    key = _SEPARATORS_RE.sub("-", stripped.strip().lower()).strip("-")
+    return key or None
+
+
+def bucket_labels(edges: Sequence[int]) -> List[str]:
+    labels = [f"{low}-{high}" for low, high in zip(edges, edges[1:])]
+    labels.append(f"{edges[-1]}+")
+    return labels
+
+
+def _bucket_sql(column: str, edges: Sequence[int]) -> str:
+    """CASE que asigna la etiqueta del bucket a un valor (NULL se cuenta como 0)"""
+    labels = bucket_labels(edges)
+    value = f"COALESCE({column}, 0)"
+    branches = " ".join(
+        f"WHEN {value} < {high} THEN '{label}'" for high, label in zip(edges[1:], labels)
+    )
+    return f"CASE {branches} ELSE '{labels[-1]}' END"
+
+
+def _bucket_case(value, edges: Sequence[int]):
+    """Lo mismo que `_bucket_sql` como expresión de SQLAlchemy"""
+    labels = bucket_labels(edges)
+    value = func.coalesce(value, 0)
+    return case(*[(value < high, label) for high, label in zip(edges[1:], labels)], else_=labels[-1])
+
+
+def _facet_rows(prefix: str) -> List[tuple]:
+    """(faceta, expresión del bucket) para la fila new/old de un trigger"""
+    return [
+        ("category", f"COALESCE({prefix}.category_key, '')"),
+        ("price", _bucket_sql(f"{prefix}.price", PRICE_EDGES)),
+        ("discount", _bucket_sql(f"{prefix}.discount", DISCOUNT_EDGES)),
+    ]
+
+
+def _apply(prefix: str, delta: int) -> str:
+    return "\n".join(
+        f"INSERT INTO {FACETS_TABLE}(facet, bucket, count) VALUES ('{facet}', {bucket}, {delta}) "
+        f"ON CONFLICT(facet, bucket) DO UPDATE SET count = count + {delta};"
+        for facet, bucket in _facet_rows(prefix)
+    )
+
+
+FACETS_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {FACETS_TABLE} (
+        facet VARCHAR NOT NULL,
+        bucket VARCHAR NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (facet, bucket)
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_facets_ai AFTER INSERT ON products BEGIN
+        {_apply("new", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_facets_ad AFTER DELETE ON products BEGIN
+        {_apply("old", -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_facets_au AFTER UPDATE OF category_key, price, discount ON products BEGIN
+        {_apply("old", -1)}
+        {_apply("new", 1)}
+    END
+    """,
+]
+
+
+def rebuild_facets(conn) -> None:
+    """Recalcular todos los conteos desde `products`"""
+    # Import diferido: el modelo usa normalize_category de este módulo
+    from .model import Product
+
+    products = Product.__table__
+    conn.execute(delete(facet_counts))
+    for facet, bucket in (
+        ("category", func.coalesce(products.c.category_key, "")),
+        ("price", _bucket_case(products.c.price, PRICE_EDGES)),
+        ("discount", _bucket_case(products.c.discount, DISCOUNT_EDGES)),
+    ):
+        counted = select(literal(facet), bucket, func.count()).group_by(bucket)
+        conn.execute(insert(facet_counts).from_select(["facet", "bucket", "count"], counted))
+
+
+def install_facets(conn) -> bool:
+    """Crear la tabla de conteos y los triggers; calcular si la tabla es nueva"""
+    if conn.dialect.name != "sqlite":
+        return False
+    existed = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"), {"name": FACETS_TABLE}
+    ).first() is not None
+    for statement in FACETS_DDL:
+        conn.execute(text(statement))
+    if not existed:
+        rebuild_facets(conn)
+        logger.info("Conteos de facetas de productos calculados")
+    return True
+
+
+def read_facets(conn) -> Dict[str, List[dict]]:
+    """Conteos por categoría y buckets de precio y descuento"""
+    counts: Dict[str, Dict[str, int]] = {"category": {}, "price": {}, "discount": {}}
+    rows = conn.execute(
+        select(facet_counts.c.facet, facet_counts.c.bucket, facet_counts.c.count).where(facet_counts.c.count > 0)
+    )
+    for facet, bucket, count in rows:
+        counts.setdefault(facet, {})[bucket] = count
+
+    categories = sorted(
+        ({"value": key, "count": count} for key, count in counts["category"].items() if key),
+        key=lambda item: (-item["count"], item["value"]),
+    )
+    return {
+        "categories": categories,
+        "price": [{"value": label, "count": counts["price"].get(label, 0)} for label in bucket_labels(PRICE_EDGES)],
+        "discount": [{"value": label, "count": counts["discount"].get(label, 0)} for label in bucket_labels(DISCOUNT_EDGES)],
+    }
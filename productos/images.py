@@ -0,0 +1,278 @@
+"""
+Almacenamiento de imágenes direccionado por contenido.
+
+Cada upload se hashea (SHA-256) mientras se copia a un archivo temporal, con
+límite de tamaño y tipo detectado por contenido, y se mueve atómicamente a
+`static/uploads/<2 primeros hex>/<hash><ext>`. Si ese archivo ya existe, el
+temporal se descarta: subir los mismos bytes no ocupa más disco y la URL es
+estable, así que se puede cachear para siempre.
+
+`stored_images` lleva una fila por archivo con su cantidad de referencias.
+Triggers de `products` suman y restan según el `image_url` de cada fila, así
+la cuenta es correcta venga la escritura de donde venga (servicios,
+importación, SQL manual). Cuando llega a 0 se marca `released_at`; el archivo
+no se borra en el momento porque otra subida concurrente puede estar por
+reutilizarlo.
+
+`variants_at` indica cuándo quedaron generadas las variantes redimensionadas
+(variants.py). Otros triggers copian ese estado a
+`products.image_variants_ready` al asignar la imagen, así los listados saben
+si exponer las variantes leyendo la fila, sin mirar el disco.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import BinaryIO, Collection, NamedTuple, Optional
+
+from sqlalchemy import case, column, func, literal, select, table, text, update
+from sqlalchemy.dialects import sqlite
+
+from .model import Product
+
+logger = logging.getLogger(__name__)
+
+IMAGES_TABLE = "stored_images"
+
+stored_images = table(
+    IMAGES_TABLE,
+    column("sha256"), column("url"), column("size"), column("content_type"),
+    column("refcount"), column("released_at"), column("variants_at"),
+)
+UPLOADS_URL = "/static/uploads"
+CHUNK_SIZE = 64 * 1024
+
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif"}
+EXTENSION_BY_CONTENT_TYPE = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+}
+
+
+class UploadRejected(ValueError):
+    """El upload no cumple los límites de tamaño o tipo"""
+
+
+class UploadTooLarge(UploadRejected):
+    pass
+
+
+class UnsupportedImageType(UploadRejected):
+    pass
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Tipo de imagen según los primeros bytes (no según lo que declara el cliente)"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return None
+
+
+def uploads_dir() -> str:
+    return os.path.join(os.getcwd(), "static", "uploads")
+
+
+class StoredImage(NamedTuple):
+    sha256: str
+    url: str
+    path: str
+    size: int
+    content_type: Optional[str]
+    created: bool
+
+
+def image_extension(filename: Optional[str], content_type: Optional[str], prefer_type: bool = False) -> str:
+    if prefer_type and (content_type or "").lower() in EXTENSION_BY_CONTENT_TYPE:
+        return EXTENSION_BY_CONTENT_TYPE[content_type.lower()]
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext in ALLOWED_EXTENSIONS:
+        return ".jpg" if ext == ".jpeg" else ext
+    return EXTENSION_BY_CONTENT_TYPE.get((content_type or "").lower(), ".bin")
+
+
+def content_path(sha256: str, ext: str, base_dir: Optional[str] = None):
+    """(ruta en disco, URL pública) de un contenido"""
+    relative = f"{sha256[:2]}/{sha256}{ext}"
+    return os.path.join(base_dir or uploads_dir(), sha256[:2], f"{sha256}{ext}"), f"{UPLOADS_URL}/{relative}"
+
+
+def store_upload(source: BinaryIO, filename: Optional[str], content_type: Optional[str],
+                 base_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 allowed_types: Optional[Collection[str]] = None) -> StoredImage:
+    """
+    Copiar el upload hasheándolo y dejarlo en su ruta por contenido.
+
+    Es bloqueante (lee y escribe en disco): los endpoints lo llaman desde el
+    threadpool. El tipo se detecta con el primer chunk y el tamaño se
+    controla mientras se copia; si falla alguno se borra el temporal y se
+    lanza UploadRejected.
+    """
+    base_dir = base_dir or uploads_dir()
+    os.makedirs(base_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=base_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out_file:
+            chunk = source.read(CHUNK_SIZE)
+            detected = sniff_image_type(chunk[:16])
+            if allowed_types is not None and detected not in allowed_types:
+                raise UnsupportedImageType("Tipo de archivo no permitido: se aceptan " + ", ".join(sorted(allowed_types)))
+            while chunk:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f"El archivo supera el máximo de {max_bytes} bytes")
+                digest.update(chunk)
+                out_file.write(chunk)
+                chunk = source.read(CHUNK_SIZE)
+        content_type = detected or content_type
+        sha256 = digest.hexdigest()
+        path, url = content_path(sha256, image_extension(filename, content_type, prefer_type=detected is not None), base_dir)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            # Renovar el mtime: el GC de huérfanos no toca archivos dentro del período de gracia
+            os.utime(path)
+            created = False
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            created = True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info(f"Imagen {sha256} ({size} bytes) {'guardada' if created else 'ya existía'}")
+    return StoredImage(sha256, url, path, size, content_type, created)
+
+
+def _adjust(prefix: str, delta: int) -> str:
+    return (
+        f"UPDATE {IMAGES_TABLE} SET refcount = refcount + ({delta}), "
+        f"released_at = CASE WHEN refcount + ({delta}) <= 0 THEN CURRENT_TIMESTAMP ELSE NULL END "
+        f"WHERE url = {prefix}.image_url;"
+    )
+
+
+def _copy_variants_ready(prefix: str) -> str:
+    return (
+        f"UPDATE products SET image_variants_ready = coalesce(("
+        f"SELECT variants_at IS NOT NULL FROM {IMAGES_TABLE} WHERE url = {prefix}.image_url), 0) "
+        f"WHERE id = {prefix}.id;"
+    )
+
+
+IMAGES_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {IMAGES_TABLE} (
+        sha256 VARCHAR PRIMARY KEY,
+        url VARCHAR NOT NULL UNIQUE,
+        size INTEGER NOT NULL,
+        content_type VARCHAR,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        released_at TIMESTAMP,
+        variants_at TIMESTAMP
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_images_ai AFTER INSERT ON products
+    WHEN new.image_url IS NOT NULL BEGIN
+        {_adjust("new", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_images_ad AFTER DELETE ON products
+    WHEN old.image_url IS NOT NULL BEGIN
+        {_adjust("old", -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_images_au AFTER UPDATE OF image_url ON products
+    WHEN old.image_url IS NOT new.image_url BEGIN
+        {_adjust("old", -1)}
+        {_adjust("new", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_variants_ai AFTER INSERT ON products
+    WHEN new.image_url IS NOT NULL BEGIN
+        {_copy_variants_ready("new")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_variants_au AFTER UPDATE OF image_url ON products
+    WHEN old.image_url IS NOT new.image_url BEGIN
+        {_copy_variants_ready("new")}
+    END
+    """,
+]
+
+
+def install_image_refcounts(conn) -> bool:
+    """Crear la tabla de imágenes y los triggers que mantienen las referencias"""
+    if conn.dialect.name != "sqlite":
+        return False
+    for statement in IMAGES_DDL:
+        conn.execute(text(statement))
+    columns = {row[1] for row in conn.execute(text(f"PRAGMA table_info({IMAGES_TABLE})"))}
+    if "variants_at" not in columns:
+        conn.execute(text(f"ALTER TABLE {IMAGES_TABLE} ADD COLUMN variants_at TIMESTAMP"))
+    return True
+
+
+def mark_variants_ready(conn, url: str) -> int:
+    """
+    Registrar que las variantes de la imagen ya están generadas y marcar los
+    productos que la usan; devuelve cuántos productos cambiaron.
+    """
+    if conn.dialect.name == "sqlite":
+        conn.execute(
+            update(stored_images)
+            .where(stored_images.c.url == url, stored_images.c.variants_at.is_(None))
+            .values(variants_at=func.current_timestamp())
+        )
+    products = Product.__table__
+    return conn.execute(
+        update(products)
+        .where(products.c.image_url == url, ~products.c.image_variants_ready)
+        .values(image_variants_ready=True)
+    ).rowcount
+
+
+def register_image(conn, image: StoredImage) -> None:
+    """
+    Registrar el archivo (si es nuevo) antes de asignarlo a un producto.
+
+    La cuenta de referencias arranca en la cantidad de productos que ya
+    apuntan a esa URL, por si se escribió antes de registrar la imagen.
+    """
+    products = Product.__table__
+    references = func.count()
+    existing = select(
+        literal(image.sha256), literal(image.url), literal(image.size), literal(image.content_type),
+        references, case((references == 0, func.current_timestamp())),
+    ).where(products.c.image_url == image.url)
+    conn.execute(
+        sqlite.insert(stored_images)
+        .from_select(["sha256", "url", "size", "content_type", "refcount", "released_at"], existing)
+        .on_conflict_do_nothing(index_elements=["sha256"])
+    )
+
+
+def is_content_addressed(url: Optional[str]) -> bool:
+    """True si la URL es de una imagen guardada por contenido (no un upload viejo)"""
+    if not url or not url.startswith(UPLOADS_URL + "/"):
+        return False
+    parts = url[len(UPLOADS_URL) + 1:].split("/")
+    return len(parts) == 2 and len(parts[0]) == 2 and parts[1].startswith(parts[0]) and len(parts[1].split(".")[0]) == 64
@@ -0,0 +1,242 @@
+"""
+Importación masiva de productos desde CSV o NDJSON en streaming.
+
+El cuerpo del request se lee por chunks y se decodifica línea a línea; cada
+fila se valida apenas se completa y las válidas se acumulan en lotes que se
+escriben con `flush` (un upsert por lote, una transacción por lote) en el
+threadpool. Nunca se tiene el archivo completo en memoria y las filas con
+error se informan por número de fila sin frenar la importación.
+
+El endpoint le pasa la función que escribe los lotes, que usa
+`upsert_statement` sobre la tabla de productos. Las columnas opcionales que una fila no trae no pisan el valor guardado (p.ej.
+actualizar el precio no resetea el descuento).
+
+Las filas se identifican sólo por `id`: una fila sin `id` siempre crea un
+producto nuevo, así que reimportar un archivo sin ids duplica el catálogo.
+Para actualizar hay que mandar el `id` (la exportación lo incluye, así que
+exportar, editar y reimportar no duplica). El upsert usa `ON CONFLICT`, que
+sólo está implementado para SQLite y PostgreSQL (`import_supported`).
+"""
+import codecs
+import csv
+import io
+import json
+import logging
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import bindparam, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .dto import ProductImportRow
+from .facets import normalize_category
+from .model import Product
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+
+CONTENT_TYPES = {
+    "text/csv": FORMAT_CSV,
+    "application/csv": FORMAT_CSV,
+    "application/x-ndjson": FORMAT_NDJSON,
+    "application/ndjson": FORMAT_NDJSON,
+    "application/jsonl": FORMAT_NDJSON,
+    "application/x-jsonlines": FORMAT_NDJSON,
+}
+
+# Columnas que escribe la importación; las opcionales no pisan el valor actual si vienen vacías
+IMPORT_COLUMNS = ("name", "description", "price", "image_url", "discount", "category", "category_key")
+IMPORT_KEEP_IF_NULL = ("description", "image_url", "discount", "category", "category_key")
+# Valor al insertar un producto nuevo cuando la fila no trae la columna
+IMPORT_INSERT_DEFAULTS = {"discount": 0.0}
+
+_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# (número de fila, datos) o (número de fila, mensaje de error)
+Record = Tuple[int, Optional[dict], Optional[str]]
+# Recibe las filas de un lote y devuelve [(número de fila, error)] de las que fallaron
+FlushFn = Callable[[List[Tuple[int, dict]]], List[Tuple[int, str]]]
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    if not content_type:
+        return None
+    return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Decodificar UTF-8 de forma incremental y emitir líneas completas"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_ndjson_records(lines: AsyncIterable[str]) -> AsyncIterator[Record]:
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "Cada línea debe ser un objeto JSON"
+            continue
+        yield row, data, None
+
+
+async def iter_csv_records(lines: AsyncIterable[str]) -> AsyncIterator[Record]:
+    """
+    Parsear CSV con encabezado. Un registro puede ocupar varias líneas si hay
+    un campo entre comillas con saltos de línea: se juntan líneas hasta que la
+    cantidad de comillas sea par.
+    """
+    header: Optional[List[str]] = None
+    buffer: List[str] = []
+    quotes = 0
+    row = 0
+    async for line in lines:
+        buffer.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        text = "\n".join(buffer).rstrip("\r")
+        buffer, quotes = [], 0
+        if not text.strip():
+            continue
+        values = next(csv.reader(io.StringIO(text)))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, None, f"Se esperaban {len(header)} columnas y hay {len(values)}"
+            continue
+        # En CSV un campo vacío significa "sin valor"
+        yield row, {key: (value if value != "" else None) for key, value in zip(header, values)}, None
+    if buffer:
+        yield row + 1, None, "Registro CSV incompleto (comillas sin cerrar)"
+
+
+def import_supported(dialect_name: str) -> bool:
+    """True si hay upsert de importación para el motor"""
+    return dialect_name in _INSERTS
+
+
+def upsert_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT (id) DO UPDATE para un lote de filas de `upsert_params`"""
+    insert = _INSERTS.get(dialect_name)
+    if insert is None:
+        raise NotImplementedError(f"Importación de productos no soportada para {dialect_name}")
+    table = Product.__table__
+    values = {"id": bindparam("id")}
+    for column in IMPORT_COLUMNS:
+        param = bindparam(column)
+        values[column] = func.coalesce(param, IMPORT_INSERT_DEFAULTS[column]) if column in IMPORT_INSERT_DEFAULTS else param
+    statement = insert(table).values(values)
+    # El UPDATE usa el valor recibido y no excluded, que ya trae el default del INSERT
+    updates = {
+        column: func.coalesce(bindparam(column), table.c[column]) if column in IMPORT_KEEP_IF_NULL
+        else statement.excluded[column]
+        for column in IMPORT_COLUMNS
+    }
+    return statement.on_conflict_do_update(index_elements=[table.c.id], set_=updates)
+
+
+def upsert_params(data: dict) -> dict:
+    params = {column: data.get(column) for column in IMPORT_COLUMNS}
+    params["id"] = data.get("id")
+    params["category_key"] = normalize_category(data.get("category"))
+    return params
+
+
+def validate_record(data: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """Validar una fila con el DTO de importación"""
+    data = {key: value for key, value in data.items() if value is not None}
+    try:
+        return ProductImportRow(**data).model_dump(), None
+    except ValidationError as e:
+        errors = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        )
+        return None, errors
+
+
+class ImportReport:
+    """Resultado de la importación con errores por fila"""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.processed = 0
+        self.upserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors: List[Dict[str, object]] = []
+
+    def add_error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+    def to_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+async def import_products(chunks: AsyncIterable[bytes], fmt: str, flush: FlushFn,
+                          batch_size: int = 500, max_errors: int = 1000) -> dict:
+    """Validar e importar filas en lotes a medida que llegan"""
+    lines = iter_lines(chunks)
+    records = iter_csv_records(lines) if fmt == FORMAT_CSV else iter_ndjson_records(lines)
+    report = ImportReport(max_errors)
+    batch: List[Tuple[int, dict]] = []
+
+    async def write(rows: List[Tuple[int, dict]]) -> None:
+        failures = await run_in_threadpool(flush, rows)
+        report.batches += 1
+        report.upserted += len(rows) - len(failures)
+        for row, message in failures:
+            report.add_error(row, message)
+
+    async for row, data, error in records:
+        report.processed += 1
+        if error is None:
+            data, error = validate_record(data)
+        if error is not None:
+            report.add_error(row, error)
+            continue
+        batch.append((row, data))
+        if len(batch) >= batch_size:
+            await write(batch)
+            batch = []
+    if batch:
+        await write(batch)
+
+    logger.info(
+        f"Importación de productos: {report.processed} filas, {report.upserted} guardadas, "
+        f"{report.failed} con error en {report.batches} lotes"
+    )
+    return report.to_dict()
@@ -1,10 +1,22 @@
-from sqlalchemy import Column, Integer, String, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Computed, DateTime, Integer, String, Float, Index, false
+from sqlalchemy.orm import relationship, validates
 from config.basemodel import Base
+from .facets import normalize_category
+from .pricing import EFFECTIVE_PRICE_SQL
 
 
 class Product(Base):
     __tablename__ = "products"
+    # Índices (columna de orden, id) para la paginación keyset del listado
+    __table_args__ = (
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_discount_id", "discount", "id"),
+        Index("ix_products_name_id", "name", "id"),
+        Index("ix_products_category_key_price_id", "category_key", "price", "id"),
+        Index("ix_products_effective_price_id", "effective_price", "id"),
+        Index("ix_products_category_key_effective_price_id", "category_key", "effective_price", "id"),
+        Index("ix_products_updated_at_id", "updated_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
@@ -12,7 +24,20 @@ class Product(Base):
     image_url = Column(String, nullable=True)
     discount = Column(Float, default=0.0)
     category = Column(String, nullable=True, index=True)  # Nueva columna para categorías
+    # Clave normalizada de la categoría para filtros exactos por índice
+    category_key = Column(String, nullable=True, index=True)
+    # Precio con descuento aplicado; lo calcula la base en cada escritura (columna generada)
+    effective_price = Column(Float, Computed(EFFECTIVE_PRICE_SQL, persisted=True))
+    # Última modificación (UTC); la mantienen triggers (ver exporter.py)
+    updated_at = Column(DateTime, nullable=True)
+    # Si las variantes de la imagen ya están generadas; lo mantienen triggers (ver images.py)
+    image_variants_ready = Column(Boolean, nullable=False, default=False, server_default=false())
 
     # Relación con items del carrito
     cart_items = relationship("CartItem", back_populates="product")
 
+    @validates("category")
+    def _sync_category_key(self, key, value):
+        self.category_key = normalize_category(value)
+        return value
+
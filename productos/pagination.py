@@ -0,0 +1,76 @@
+"""
+Paginación keyset (por cursor) para listados de productos.
+
+El cursor es opaco para el cliente: base64url de un JSON con la columna de
+orden, la dirección, el último valor visto y el último id. La página siguiente
+se pide con `WHERE (col, id) > (valor, id)` sobre un índice (col, id), así el
+costo no crece con el número de página como con OFFSET.
+
+El módulo no depende de ningún modelo para poder probarse con tablas sueltas.
+"""
+import base64
+import binascii
+import json
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """El cursor no se puede decodificar o no corresponde al orden pedido"""
+
+
+class Cursor(NamedTuple):
+    sort: str
+    order: str
+    value: Any
+    last_id: int
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    raw = json.dumps([cursor.sort, cursor.order, cursor.value, cursor.last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort: str, order: str) -> Cursor:
+    """Decodificar un cursor y verificar que sea del mismo orden que el request"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        cursor = Cursor(str(data[0]), str(data[1]), data[2], int(data[3]))
+    except (ValueError, TypeError, IndexError, KeyError, binascii.Error, UnicodeError):
+        raise InvalidCursor("Cursor inválido")
+    if cursor.sort != sort or cursor.order != order:
+        raise InvalidCursor("El cursor no corresponde al orden solicitado")
+    return cursor
+
+
+def keyset_condition(column, id_column, value: Any, last_id: int, descending: bool = False):
+    """
+    Condición para continuar después de (value, last_id) en el orden (column, id).
+
+    Respeta el orden de NULLs de SQLite: primero en ASC, últimos en DESC.
+    """
+    if column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+    if descending:
+        if value is None:
+            return and_(column.is_(None), id_column < last_id)
+        return or_(column < value, and_(column == value, id_column < last_id), column.is_(None))
+    if value is None:
+        return or_(and_(column.is_(None), id_column > last_id), column.isnot(None))
+    return or_(column > value, and_(column == value, id_column > last_id))
+
+
+def prefix_range(column, prefix: str):
+    """`column LIKE 'prefix%'` expresado como rango para que use el índice"""
+    return and_(column >= prefix, column < prefix + "\U0010ffff")
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
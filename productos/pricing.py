@@ -0,0 +1,28 @@
+"""
+Precio efectivo: lo que paga el cliente después del descuento.
+
+`products.effective_price` es una columna generada por SQLite con esta misma
+expresión, así que se mantiene sola con cualquier escritura (servicios,
+importación, recálculo masivo, SQL manual) y se puede indexar para ordenar y
+filtrar. Las consultas (búsqueda, exportación, resumen del carrito) leen esa
+columna en lugar de repetir la cuenta.
+
+`round()` de SQLite redondea las mitades hacia arriba sobre el valor decimal
+(2.675 -> 2.68), mientras que `round()` de Python redondea el binario exacto
+(2.675 -> 2.67). `effective_price` usa Decimal con ROUND_HALF_UP sobre los 15
+dígitos significativos que un float representa con seguridad, para cobrar lo
+mismo que muestra la columna.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional
+
+CENTS = Decimal("0.01")
+
+# Expresión SQL del precio efectivo, redondeado a centavos
+EFFECTIVE_PRICE_SQL = "round(price * (1 - coalesce(discount, 0) / 100.0), 2)"
+
+
+def effective_price(price: Optional[float], discount: Optional[float]) -> float:
+    """El mismo cálculo en Python, para filas que no traen la columna"""
+    value = (price or 0.0) * (1 - (discount or 0.0) / 100.0)
+    return float(Decimal(format(value, ".15g")).quantize(CENTS, rounding=ROUND_HALF_UP))
@@ -0,0 +1,104 @@
+"""
+Motor de recálculo masivo de precios y descuentos.
+
+Las filas seleccionadas se cargan una vez como columnas (ids, precios,
+descuentos, categorías) y cada regla se aplica a la columna completa con una
+máscara de selección, sin un objeto ORM por producto. El resultado es la
+lista de cambios (diff) que el servicio escribe con UPDATE por lotes o
+devuelve tal cual en modo dry-run. Leer y escribir la base queda del lado del
+servicio (`_load_catalog_columns` y `reprice_products` en services.py).
+"""
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .dto import RepricingRule
+from .facets import normalize_category
+
+
+class CatalogColumns(NamedTuple):
+    ids: List[int]
+    prices: List[float]
+    discounts: List[float]
+    category_keys: List[Optional[str]]
+
+
+class PriceChange(NamedTuple):
+    id: int
+    old_price: float
+    new_price: float
+    old_discount: float
+    new_discount: float
+
+
+def round_to_ending(price: float, ending: float) -> float:
+    """Llevar el precio al próximo valor terminado en `ending` (12.30 -> 12.99)"""
+    return round(math.ceil(round(price - ending, 6)) + ending, 2)
+
+
+def selection_mask(columns: CatalogColumns, rule: RepricingRule) -> List[bool]:
+    """Filas a las que aplica la regla (todas si no tiene selector)"""
+    mask = [True] * len(columns.ids)
+    if rule.category is not None:
+        key = normalize_category(rule.category)
+        mask = [selected and category == key for selected, category in zip(mask, columns.category_keys)]
+    if rule.ids is not None:
+        wanted = set(rule.ids)
+        mask = [selected and product_id in wanted for selected, product_id in zip(mask, columns.ids)]
+    return mask
+
+
+def apply_rule(columns: CatalogColumns, rule: RepricingRule) -> CatalogColumns:
+    mask = selection_mask(columns, rule)
+    prices = columns.prices
+    if rule.set_price is not None:
+        prices = [rule.set_price if selected else price for price, selected in zip(prices, mask)]
+    if rule.multiply_price is not None:
+        factor = rule.multiply_price
+        prices = [price * factor if selected else price for price, selected in zip(prices, mask)]
+    if rule.add_price is not None:
+        delta = rule.add_price
+        prices = [price + delta if selected else price for price, selected in zip(prices, mask)]
+    if rule.round_to is not None:
+        ending = rule.round_to
+        prices = [round_to_ending(price, ending) if selected else price for price, selected in zip(prices, mask)]
+    elif prices is not columns.prices:
+        prices = [round(price, 2) if selected else price for price, selected in zip(prices, mask)]
+
+    discounts = columns.discounts
+    if rule.set_discount is not None:
+        discounts = [rule.set_discount if selected else discount for discount, selected in zip(discounts, mask)]
+
+    return columns._replace(prices=prices, discounts=discounts)
+
+
+def compute_repricing(columns: CatalogColumns, rules: Sequence[RepricingRule]) -> List[PriceChange]:
+    """Aplicar las reglas en orden y devolver sólo las filas que cambian"""
+    result = columns
+    for rule in rules:
+        result = apply_rule(result, rule)
+
+    invalid = [product_id for product_id, price in zip(result.ids, result.prices) if price <= 0]
+    if invalid:
+        sample = ", ".join(str(product_id) for product_id in invalid[:10])
+        raise ValueError(f"Las reglas dejan precios menores o iguales a 0 (ids: {sample})")
+
+    return [
+        PriceChange(product_id, old_price, new_price, old_discount, new_discount)
+        for product_id, old_price, new_price, old_discount, new_discount in zip(
+            columns.ids, columns.prices, result.prices, columns.discounts, result.discounts
+        )
+        if old_price != new_price or old_discount != new_discount
+    ]
+
+
+def rule_selectors(rules: Sequence[RepricingRule]) -> Optional[Dict[str, set]]:
+    """Categorías e ids a cargar, o None si alguna regla aplica a todo el catálogo"""
+    categories, ids = set(), set()
+    for rule in rules:
+        if rule.category is None and rule.ids is None:
+            return None
+        if rule.ids is not None:
+            ids.update(rule.ids)
+        elif rule.category is not None:
+            categories.add(normalize_category(rule.category))
+    return {"categories": categories, "ids": ids}
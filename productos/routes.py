@@ -1,42 +1,112 @@
-from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, Request, Depends
+from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, Request, Response, Depends, Query
+from fastapi.responses import StreamingResponse
+import itertools
 import logging
 import os
-import uuid
-import shutil
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional, Union
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from .dto import ProductCreate, ProductOut, ProductUpdate
+from .dto import (
+    ProductCreate, ProductOut, ProductUpdate, ProductPage, ProductSearchPage, ProductFacets, ProductImportReport,
+    RepricingRequest, RepricingResult,
+)
+from .pagination import InvalidCursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from .services import (
-    get_all_products, 
+    list_products_page,
+    search_products,
+    get_product_facets,
+    export_products,
+    upsert_products_batch,
+    product_import_supported,
+    reprice_products,
+    register_stored_image,
     get_product_by_id, 
     create_product, 
     update_product, 
     delete_product,
     get_products_by_category
 )
+from .catalog_cache import conditional_get
+from .variants import variant_pool
+from .images import store_upload, is_content_addressed, UploadTooLarge, UnsupportedImageType
+from .importer import import_products, detect_format, FORMAT_CSV, FORMAT_NDJSON
+from config.catalog import (
+    CATALOG_CACHE_CONTROL_LIST,
+    CATALOG_CACHE_CONTROL_DETAIL,
+    CATALOG_CACHE_CONTROL_CATEGORY,
+    CATALOG_CACHE_CONTROL_SEARCH,
+    CATALOG_CACHE_CONTROL_FACETS,
+    CATALOG_CACHE_CONTROL_EXPORT,
+    IMPORT_BATCH_SIZE,
+    IMPORT_MAX_ERRORS,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_ALLOWED_TYPES,
+)
 from middlewares.admin_auth import verify_admin, verify_authenticated_user
-from usuarios.model import Usuario
+from middlewares.principal import Principal
+from config.fast_json import FastJSON
+from .exporter import MEDIA_TYPES, export_encoding
 
 products = APIRouter()
+# Listados serializados sin revalidar las filas del ORM (ver config/fast_json.py)
+fast_json = FastJSON("productos")
 
 logger = logging.getLogger(__name__)
 
-@products.get('/categoria/{category}', response_model=List[ProductOut])
-def list_products_by_category(category: str):
+@products.get('/categoria/{category}', response_model=List[ProductOut],
+              dependencies=[Depends(conditional_get(CATALOG_CACHE_CONTROL_CATEGORY))])
+def list_products_by_category(category: str, response: Response):
     """Obtener productos por categoría"""
     try:
-        return get_products_by_category(category)
+        return fast_json.respond(List[ProductOut], get_products_by_category(category), response)
     except SQLAlchemyError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error interno del servidor al obtener los productos: {str(e)}"
         )
 
-@products.get('', response_model=List[ProductOut], status_code=status.HTTP_200_OK)
-def get_products():
-    """Obtener todos los productos"""
+@products.get('', response_model=Union[List[ProductOut], ProductPage], status_code=status.HTTP_200_OK,
+              dependencies=[Depends(conditional_get(CATALOG_CACHE_CONTROL_LIST))])
+def get_products(
+    response: Response,
+    category: Optional[str] = Query(None, description="Categoría exacta"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_discount: Optional[float] = Query(None, ge=0, le=100),
+    min_effective_price: Optional[float] = Query(None, ge=0, description="Precio con descuento mínimo"),
+    max_effective_price: Optional[float] = Query(None, ge=0, description="Precio con descuento máximo"),
+    q: Optional[str] = Query(None, min_length=1, description="Prefijo del nombre"),
+    sort: Literal["id", "price", "effective_price", "discount", "name"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description=f"Tamaño de página (por defecto {DEFAULT_PAGE_SIZE})"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor"),
+):
+    """
+    Listar productos. Sin `limit` ni `cursor` devuelve la lista completa, como
+    siempre; con alguno de los dos devuelve una página {items, next_cursor, limit}.
+    """
     try:
-        return get_all_products()
+        paginate = limit is not None or cursor is not None
+        page = list_products_page(
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            min_discount=min_discount,
+            min_effective_price=min_effective_price,
+            max_effective_price=max_effective_price,
+            name_prefix=q,
+            sort=sort,
+            order=order,
+            limit=limit,
+            cursor=cursor,
+            paginate=paginate,
+        )
+        return fast_json.respond(ProductPage if paginate else List[ProductOut], page, response)
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except SQLAlchemyError:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -48,7 +118,67 @@ def get_products():
             detail="Error inesperado al obtener los productos"
         )
 
-@products.get('/{product_id}', response_model=ProductOut, status_code=status.HTTP_200_OK)
+@products.get('/search', response_model=ProductSearchPage, status_code=status.HTTP_200_OK,
+              dependencies=[Depends(conditional_get(CATALOG_CACHE_CONTROL_SEARCH))])
+def search_products_route(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Texto a buscar"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Buscar productos por nombre, descripción y categoría"""
+    try:
+        return fast_json.respond(ProductSearchPage, search_products(q, page=page, limit=limit), response)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al buscar productos"
+        )
+
+@products.get('/export', response_class=StreamingResponse, status_code=status.HTTP_200_OK,
+              dependencies=[Depends(conditional_get(CATALOG_CACHE_CONTROL_EXPORT, variant=export_encoding))],
+              responses={200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}}})
+def export_products_route(
+    request: Request,
+    response: Response,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = Query(None, description="Sólo productos modificados desde esta fecha (ISO 8601, UTC si no tiene zona)"),
+    # Se valida y documenta acá; la decisión la toma export_encoding
+    gzip: Optional[bool] = Query(None, description="Comprimir con gzip (por defecto según Accept-Encoding)"),
+):
+    """Exportar el catálogo en streaming como NDJSON o CSV"""
+    # La misma decisión que usa el ETag, para que cada codificación tenga el suyo
+    compress = export_encoding(request) == "gzip"
+    try:
+        stream = export_products(format, since=since, compress=compress)
+        # Leer el primer lote acá: si la base falla todavía se puede responder 500
+        first = next(stream, b"")
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al exportar el catálogo"
+        )
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    headers["Content-Disposition"] = f'attachment; filename="productos.{format}"'
+    headers["Vary"] = "Accept-Encoding"
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(itertools.chain([first], stream), media_type=MEDIA_TYPES[format], headers=headers)
+
+@products.get('/facets', response_model=ProductFacets, status_code=status.HTTP_200_OK,
+              dependencies=[Depends(conditional_get(CATALOG_CACHE_CONTROL_FACETS))])
+def get_facets():
+    """Cantidad de productos por categoría y por rango de precio y descuento"""
+    try:
+        return get_product_facets()
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al obtener las facetas"
+        )
+
+@products.get('/{product_id}', response_model=ProductOut, status_code=status.HTTP_200_OK,
+              dependencies=[Depends(conditional_get(CATALOG_CACHE_CONTROL_DETAIL))])
 def get_product(product_id: int):
     """Obtener un producto por ID"""
     try:
@@ -84,7 +214,7 @@ def get_product(product_id: int):
         )
 
 @products.post('', response_model=ProductOut, status_code=status.HTTP_201_CREATED)
-def post_product(product: ProductCreate, admin: Usuario = Depends(verify_admin)):
+def post_product(product: ProductCreate, admin: Principal = Depends(verify_admin)):
     """Crear un nuevo producto"""
     try:
         if not product.name or product.price <= 0:
@@ -118,6 +248,63 @@ def post_product(product: ProductCreate, admin: Usuario = Depends(verify_admin))
         )
 
 
+@products.post('/import', response_model=ProductImportReport, status_code=status.HTTP_200_OK)
+async def import_products_route(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Por defecto según Content-Type"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000),
+    admin: Principal = Depends(verify_admin)
+):
+    """
+    Importar productos en lote desde CSV o NDJSON (upsert por id). Las filas
+    sin id se insertan siempre: reimportar un archivo sin ids duplica productos.
+    """
+    # Antes de leer el cuerpo: sin upsert para el motor no se consume la subida
+    if not product_import_supported():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="La importación de productos sólo está disponible con SQLite o PostgreSQL"
+        )
+    fmt = format or detect_format(request.headers.get("content-type"))
+    if fmt not in (FORMAT_CSV, FORMAT_NDJSON):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Formato no soportado: use text/csv o application/x-ndjson"
+        )
+    try:
+        return await import_products(
+            request.stream(), fmt, upsert_products_batch,
+            batch_size=batch_size, max_errors=IMPORT_MAX_ERRORS
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo debe estar codificado en UTF-8"
+        )
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al importar los productos"
+        )
+
+
+@products.post('/reprice', response_model=RepricingResult, status_code=status.HTTP_200_OK)
+def reprice_products_route(request_data: RepricingRequest, admin: Principal = Depends(verify_admin)):
+    """Recalcular precios y descuentos en lote por reglas (dry_run devuelve sólo el diff)"""
+    try:
+        return reprice_products(request_data.rules, dry_run=request_data.dry_run)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor al recalcular precios"
+        )
+
+
 @products.post('/upload', response_model=ProductOut, status_code=status.HTTP_201_CREATED)
 def upload_product(
     request: Request,
@@ -130,20 +317,13 @@ def upload_product(
 ):
     """Subir una imagen y crear un producto (multipart/form-data)"""
     try:
-        # Ensure uploads directory exists
-        base_dir = os.path.join(os.getcwd(), 'static', 'uploads')
-        os.makedirs(base_dir, exist_ok=True)
-
-        # Create a safe unique filename
-        filename = f"{uuid.uuid4().hex}_{file.filename}"
-        file_path = os.path.join(base_dir, filename)
-
-        # Save the uploaded file to disk
-        with open(file_path, 'wb') as out_file:
-            shutil.copyfileobj(file.file, out_file)
-
-        # Build a public URL for the saved file (served under /static)
-        image_url = f"/static/uploads/{filename}"
+        # Guardar la imagen por contenido (los mismos bytes reutilizan el mismo archivo)
+        stored = store_upload(file.file, file.filename, file.content_type,
+                              max_bytes=UPLOAD_MAX_BYTES, allowed_types=UPLOAD_ALLOWED_TYPES)
+        register_stored_image(stored)
+        # Las variantes se generan en segundo plano; hasta entonces se usa el original
+        variant_pool.schedule(stored)
+        image_url = stored.url
 
         # Create product using existing service
         product_data = ProductCreate(
@@ -158,6 +338,10 @@ def upload_product(
         return create_product(product_data)
     except HTTPException:
         raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except UnsupportedImageType as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -165,34 +349,17 @@ def upload_product(
         )
 
 @products.post('/{product_id}/imagen', response_model=ProductOut)
-async def update_product_image(
+def update_product_image(
     product_id: int,
     file: UploadFile = File(...),
-    user: Usuario = Depends(verify_authenticated_user)
+    user: Principal = Depends(verify_authenticated_user)
 ):
     """Actualizar la imagen de un producto existente"""
+    # Endpoint sync a propósito: FastAPI lo corre en el threadpool y la copia del
+    # archivo, el acceso a disco y las consultas no bloquean el event loop
     # Log who is calling this endpoint (helps debug 403s)
+    logger.info(f"update_product_image called by user={user.username} id={user.user_id} for product_id={product_id}")
     try:
-        logger.info(f"update_product_image called by user={getattr(user,'usu_usuario',None)} id={getattr(user,'usu_id',None)} for product_id={product_id}")
-    except Exception:
-        logger.info(f"update_product_image called for product_id={product_id} (user info unavailable)")
-    try:
-        # Ensure uploads directory exists
-        base_dir = os.path.join(os.getcwd(), 'static', 'uploads')
-        os.makedirs(base_dir, exist_ok=True)
-
-        # Create a safe unique filename
-        filename = f"{uuid.uuid4().hex}_{file.filename}"
-        file_path = os.path.join(base_dir, filename)
-
-        # Save the uploaded file to disk
-        with open(file_path, 'wb') as out_file:
-            shutil.copyfileobj(file.file, out_file)
-
-        # Build a public URL for the saved file
-        image_url = f"/static/uploads/{filename}"
-
-        # Update product with new image URL
         # Get the current product first
         product = get_product_by_id(product_id)
         if not product:
@@ -200,17 +367,26 @@ async def update_product_image(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Producto con ID {product_id} no encontrado"
             )
-            
+
+        # Guardar la imagen por contenido y registrarla antes de asignarla
+        stored = store_upload(file.file, file.filename, file.content_type,
+                              max_bytes=UPLOAD_MAX_BYTES, allowed_types=UPLOAD_ALLOWED_TYPES)
+        register_stored_image(stored)
+        variant_pool.schedule(stored)
+        filename = os.path.basename(stored.path)
+
         # Just update the image_url
-        update_data = ProductUpdate(image_url=image_url)
+        update_data = ProductUpdate(image_url=stored.url)
         updated = update_product(product_id, update_data)
 
-        # Attempt to remove the previous image file from disk to avoid orphaned files
+        # Attempt to remove the previous image file from disk to avoid orphaned files.
+        # Las imágenes por contenido pueden estar compartidas: esas se liberan por
+        # cuenta de referencias y no se borran acá
         try:
             old_url = getattr(product, 'image_url', '') or ''
             # Only delete files that live under /static/uploads/
             prefix = '/static/uploads/'
-            if isinstance(old_url, str) and old_url.startswith(prefix):
+            if isinstance(old_url, str) and old_url.startswith(prefix) and not is_content_addressed(old_url):
                 old_filename = old_url[len(prefix):]
                 # Ensure we don't accidentally delete the file we just saved
                 old_filename = str(old_filename)
@@ -229,6 +405,10 @@ async def update_product_image(
         return updated
     except HTTPException:
         raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except UnsupportedImageType as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -236,7 +416,7 @@ async def update_product_image(
         )
 
 @products.patch('/{product_id}', response_model=ProductOut, status_code=status.HTTP_200_OK)
-def patch_product(product_id: int, update_data: ProductUpdate, admin: Usuario = Depends(verify_admin)):
+def patch_product(product_id: int, update_data: ProductUpdate, admin: Principal = Depends(verify_admin)):
     """Actualizar campos de un producto existente"""
     try:
         if product_id <= 0:
@@ -265,7 +445,7 @@ def patch_product(product_id: int, update_data: ProductUpdate, admin: Usuario =
         )
     
 @products.delete('/{product_id}', status_code=status.HTTP_200_OK)
-def delete_product_route(product_id: int, admin: Usuario = Depends(verify_admin)):
+def delete_product_route(product_id: int, admin: Principal = Depends(verify_admin)):
     """Eliminar un producto por ID"""
     try:
         if product_id <= 0:
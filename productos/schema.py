@@ -0,0 +1,47 @@
+"""
+Verificación del esquema de `products` al arrancar.
+
+Las columnas que `create_all` no agrega a una tabla existente (category_key,
+effective_price, updated_at, image_variants_ready), los índices nuevos del
+modelo y, en SQLite, el índice FTS5 de búsqueda (search.py), los conteos de
+facetas (facets.py), las referencias a imágenes (images.py), el seguimiento
+de cambios para la exportación (exporter.py) y la versión del catálogo para
+los ETag (catalog_cache.py), con sus triggers, los crea la migración
+2105dfef153e (`alembic upgrade head`). Acá no se modifica la base: sin las
+columnas el modelo no puede leer `products` y el arranque se corta; sin las
+tablas auxiliares sólo se avisa.
+"""
+import logging
+from typing import List
+
+from sqlalchemy import inspect
+
+from .facets import FACETS_TABLE
+from .images import IMAGES_TABLE
+from .search import FTS_TABLE
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ("category_key", "effective_price", "updated_at", "image_variants_ready")
+SQLITE_TABLES = (FTS_TABLE, FACETS_TABLE, IMAGES_TABLE, "catalog_state")
+
+
+def check_product_schema(engine) -> List[str]:
+    """Tablas auxiliares de SQLite que faltan; error si faltan columnas del modelo"""
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("products")}
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing_columns:
+        raise RuntimeError(
+            f"Faltan columnas en products ({', '.join(missing_columns)}): correr `alembic upgrade head`"
+        )
+    missing: List[str] = []
+    if engine.dialect.name == "sqlite":
+        tables = set(inspector.get_table_names())
+        missing = [table for table in SQLITE_TABLES if table not in tables]
+    if missing:
+        logger.warning(
+            f"Faltan tablas del catálogo ({', '.join(missing)}): búsqueda, facetas, imágenes y "
+            "ETag no funcionan hasta correr `alembic upgrade head`"
+        )
+    return missing
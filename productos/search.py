@@ -0,0 +1,123 @@
+"""
+Búsqueda de texto completo sobre productos con SQLite FTS5.
+
+`products_fts` es una tabla FTS5 de contenido externo (content='products'):
+guarda sólo el índice invertido de name, description y category y lee el
+texto de `products`. Tres triggers la mantienen sincronizada con cualquier
+INSERT/UPDATE/DELETE, venga de los servicios, de los seeders o de SQL manual.
+"""
+import html
+import logging
+import re
+from typing import List
+
+from sqlalchemy import column, func, select, table, text
+
+from .model import Product
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "products_fts"
+
+# La columna oculta con el nombre de la tabla es la que reciben MATCH y las
+# funciones auxiliares de FTS5 (bm25, highlight, snippet)
+fts = table(FTS_TABLE, column(FTS_TABLE), column("rowid"))
+
+# Pesos de bm25 por columna: name, description, category
+BM25_WEIGHTS = (10.0, 2.0, 4.0)
+
+# FTS marca las coincidencias con caracteres de uso privado; después se escapa
+# el texto y se reemplazan por <mark>, así el HTML del producto nunca se inyecta
+_MARK_OPEN = "\ue000"
+_MARK_CLOSE = "\ue001"
+
+FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END
+    """,
+]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def install_fts(conn) -> bool:
+    """Crear la tabla FTS y los triggers; reindexar si la tabla es nueva"""
+    if conn.dialect.name != "sqlite":
+        return False
+    existed = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"), {"name": FTS_TABLE}
+    ).first() is not None
+    for statement in FTS_DDL:
+        conn.execute(text(statement))
+    if not existed:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        logger.info("Índice FTS de productos creado y reconstruido")
+    return True
+
+
+def build_match_query(query: str) -> str:
+    """
+    Convertir el texto del usuario en una expresión MATCH segura.
+
+    Cada palabra va entre comillas (sin operadores FTS del usuario) y se
+    busca como prefijo, todas deben aparecer: `zapa nik` -> `"zapa"* "nik"*`.
+    """
+    tokens: List[str] = _TOKEN_RE.findall(query or "")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_rows(conn, query: str, limit: int, offset: int = 0):
+    """Ejecutar la búsqueda y devolver filas ordenadas por relevancia"""
+    match = build_match_query(query)
+    if not match:
+        return []
+    products = Product.__table__
+    fts_column = fts.c[FTS_TABLE]
+    score = func.bm25(fts_column, *BM25_WEIGHTS).label("score")
+    statement = (
+        select(
+            products.c.id, products.c.name, products.c.description, products.c.price,
+            products.c.image_url, products.c.discount, products.c.category,
+            products.c.image_variants_ready, products.c.effective_price,
+            score,
+            func.highlight(fts_column, 0, _MARK_OPEN, _MARK_CLOSE).label("name_highlight"),
+            func.snippet(fts_column, 1, _MARK_OPEN, _MARK_CLOSE, "…", 12).label("description_snippet"),
+        )
+        .select_from(fts.join(products, products.c.id == fts.c.rowid))
+        .where(fts_column.op("MATCH")(match))
+        .order_by(score, products.c.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return conn.execute(statement).mappings().all()
+
+
+def render_highlight(value):
+    """Escapar el fragmento resaltado y convertir las marcas en <mark>"""
+    if value is None:
+        return None
+    return html.escape(value).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
@@ -1,7 +1,21 @@
+from sqlalchemy import bindparam, func, or_, update
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from config.cnx import SessionLocal
+from config.cnx import SessionLocal, engine
 from .model import Product
 from .dto import ProductCreate, ProductUpdate
+from .catalog_cache import catalog_version
+from .search import search_rows, render_highlight
+from .facets import normalize_category, read_facets
+from .images import register_image
+from .upload_gc import collect_orphans
+from .exporter import export_stream, iter_batches
+from .importer import import_supported, upsert_params, upsert_statement
+from .repricing import CatalogColumns, compute_repricing, rule_selectors
+from config.catalog import (
+    EXPORT_BATCH_SIZE, REPRICE_BATCH_SIZE, REPRICE_DIFF_LIMIT, UPLOAD_GC_GRACE_SECONDS, UPLOAD_GC_MODE, UPLOAD_QUARANTINE_DIR,
+)
+from .pagination import Cursor, encode_cursor, decode_cursor, keyset_condition, prefix_range, clamp_limit
+from typing import Optional
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -13,7 +27,7 @@ def get_products_by_category(category: str):
     db = None
     try:
         db = SessionLocal()
-        products = db.query(Product).filter(Product.category.ilike(f"%{category}%")).all()
+        products = db.query(Product).filter(Product.category_key == normalize_category(category)).all()
         logger.info(f"Se obtuvieron {len(products)} productos para la categoría {category}")
         return products
     except Exception as e:
@@ -56,6 +70,296 @@ def get_all_products():
             db.close()
 
 
+# Columnas por las que se puede ordenar el listado paginado
+SORT_COLUMNS = {
+    "id": Product.id,
+    "price": Product.price,
+    "effective_price": Product.effective_price,
+    "discount": Product.discount,
+    "name": Product.name,
+}
+
+
+def list_products_page(
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_discount: Optional[float] = None,
+    min_effective_price: Optional[float] = None,
+    max_effective_price: Optional[float] = None,
+    name_prefix: Optional[str] = None,
+    sort: str = "id",
+    order: str = "asc",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    paginate: bool = True,
+):
+    """
+    Obtener una página de productos con filtros y paginación keyset. Con
+    `paginate=False` devuelve la lista completa (forma original de GET /productos).
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Orden inválido: {sort}")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Dirección de orden inválida: {order}")
+    limit = clamp_limit(limit)
+    descending = order == "desc"
+    column = SORT_COLUMNS[sort]
+
+    db = None
+    try:
+        db = SessionLocal()
+        query = db.query(Product)
+        if category:
+            query = query.filter(Product.category_key == normalize_category(category))
+        if min_price is not None:
+            query = query.filter(Product.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Product.price <= max_price)
+        if min_discount is not None:
+            query = query.filter(Product.discount >= min_discount)
+        if min_effective_price is not None:
+            query = query.filter(Product.effective_price >= min_effective_price)
+        if max_effective_price is not None:
+            query = query.filter(Product.effective_price <= max_effective_price)
+        if name_prefix:
+            query = query.filter(prefix_range(Product.name, name_prefix))
+        if cursor:
+            position = decode_cursor(cursor, sort, order)
+            query = query.filter(keyset_condition(column, Product.id, position.value, position.last_id, descending))
+
+        if column is Product.id:
+            ordering = [Product.id.desc() if descending else Product.id.asc()]
+        elif descending:
+            ordering = [column.desc(), Product.id.desc()]
+        else:
+            ordering = [column.asc(), Product.id.asc()]
+
+        if not paginate:
+            items = query.order_by(*ordering).all()
+            logger.info(f"Se obtuvieron {len(items)} productos (sort={sort} {order}, sin paginar)")
+            return items
+
+        # Se pide una fila de más para saber si hay página siguiente
+        rows = query.order_by(*ordering).limit(limit + 1).all()
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(Cursor(sort, order, getattr(last, column.key), last.id))
+
+        logger.info(f"Se obtuvieron {len(items)} productos (sort={sort} {order}, limit={limit})")
+        return {"items": items, "next_cursor": next_cursor, "limit": limit}
+    except ValueError:
+        raise
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al listar productos: {str(e)}")
+        raise SQLAlchemyError("Error al acceder a la base de datos")
+    finally:
+        if db:
+            db.close()
+
+
+def search_products(query: str, page: int = 1, limit: Optional[int] = None):
+    """Búsqueda de texto completo ordenada por relevancia (bm25)"""
+    limit = clamp_limit(limit)
+    page = max(page, 1)
+    db = None
+    try:
+        db = SessionLocal()
+        rows = search_rows(db.connection(), query, limit + 1, (page - 1) * limit)
+        items = []
+        for row in rows[:limit]:
+            hit = dict(row)
+            hit["name_highlight"] = render_highlight(hit["name_highlight"])
+            hit["description_snippet"] = render_highlight(hit["description_snippet"])
+            items.append(hit)
+        logger.info(f"Búsqueda '{query}': {len(items)} resultados (página {page})")
+        return {"items": items, "page": page, "limit": limit, "has_more": len(rows) > limit}
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al buscar productos: {str(e)}")
+        raise SQLAlchemyError("Error al acceder a la base de datos")
+    finally:
+        if db:
+            db.close()
+
+
+def get_product_facets():
+    """Conteos por categoría y buckets de precio/descuento (precalculados)"""
+    db = None
+    try:
+        db = SessionLocal()
+        return read_facets(db.connection())
+    except SQLAlchemyError as e:
+        logger.error(f"Error de base de datos al obtener facetas: {str(e)}")
+        raise SQLAlchemyError("Error al acceder a la base de datos")
+    finally:
+        if db:
+            db.close()
+
+
+def product_import_supported() -> bool:
+    """Si el motor configurado permite la importación masiva (ver importer.py)"""
+    return import_supported(engine.dialect.name)
+
+
+def upsert_products_batch(rows):
+    """
+    Insertar o actualizar (por id) un lote de productos en una transacción.
+
+    Si el lote falla se reintenta fila por fila para informar cuáles fallaron.
+    Devuelve [(número de fila, error)].
+    """
+    if not rows:
+        return []
+    db = None
+    try:
+        db = SessionLocal()
+        stmt = upsert_statement(db.get_bind().dialect.name)
+        try:
+            db.execute(stmt, [upsert_params(data) for _, data in rows])
+            db.commit()
+            return []
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Lote de importación con errores, reintentando fila por fila: {str(e)}")
+
+        failures = []
+        for row, data in rows:
+            try:
+                db.execute(stmt, [upsert_params(data)])
+                db.commit()
+            except SQLAlchemyError as e:
+                db.rollback()
+                failures.append((row, f"Error de base de datos: {getattr(e, 'orig', e)}"))
+        return failures
+    finally:
+        catalog_version.touch()
+        if db:
+            db.close()
+
+
+def _load_catalog_columns(db, rules) -> CatalogColumns:
+    """Cargar en columnas sólo las filas que alguna regla puede tocar"""
+    query = db.query(
+        Product.id, Product.price, func.coalesce(Product.discount, 0.0), Product.category_key
+    ).filter(Product.price.isnot(None))
+    selectors = rule_selectors(rules)
+    if selectors is not None:
+        conditions = []
+        if selectors["categories"]:
+            conditions.append(Product.category_key.in_(selectors["categories"]))
+        if selectors["ids"]:
+            conditions.append(Product.id.in_(selectors["ids"]))
+        query = query.filter(or_(*conditions))
+    rows = query.order_by(Product.id).all()
+    return CatalogColumns(
+        ids=[row[0] for row in rows],
+        prices=[float(row[1]) for row in rows],
+        discounts=[float(row[2]) for row in rows],
+        category_keys=[row[3] for row in rows],
+    )
+
+
+def reprice_products(rules, dry_run: bool = False):
+    """Recalcular precios/descuentos por reglas y guardarlos en una transacción"""
+    db = None
+    try:
+        db = SessionLocal()
+        columns = _load_catalog_columns(db, rules)
+        changes = compute_repricing(columns, rules)
+
+        if not dry_run and changes:
+            table = Product.__table__
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(price=bindparam("b_price"), discount=bindparam("b_discount"))
+            )
+            for start in range(0, len(changes), REPRICE_BATCH_SIZE):
+                chunk = changes[start:start + REPRICE_BATCH_SIZE]
+                db.execute(stmt, [
+                    {"b_id": change.id, "b_price": change.new_price, "b_discount": change.new_discount}
+                    for change in chunk
+                ])
+            db.commit()
+            catalog_version.touch()
+
+        logger.info(
+            f"Recálculo de precios{' (dry-run)' if dry_run else ''}: "
+            f"{len(columns.ids)} productos evaluados, {len(changes)} con cambios"
+        )
+        return {
+            "dry_run": dry_run,
+            "matched": len(columns.ids),
+            "changed": len(changes),
+            "changes": [change._asdict() for change in changes[:REPRICE_DIFF_LIMIT]],
+            "changes_truncated": len(changes) > REPRICE_DIFF_LIMIT,
+        }
+    except ValueError:
+        if db:
+            db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        if db:
+            db.rollback()
+        logger.error(f"Error de base de datos al recalcular precios: {str(e)}")
+        raise SQLAlchemyError("Error al acceder a la base de datos")
+    finally:
+        if db:
+            db.close()
+
+
+def register_stored_image(image):
+    """Registrar una imagen guardada por contenido antes de asignarla a un producto"""
+    db = None
+    try:
+        db = SessionLocal()
+        register_image(db.connection(), image)
+        db.commit()
+    except SQLAlchemyError as e:
+        if db:
+            db.rollback()
+        logger.error(f"Error de base de datos al registrar la imagen {image.sha256}: {str(e)}")
+        raise SQLAlchemyError("Error al acceder a la base de datos")
+    finally:
+        if db:
+            db.close()
+
+
+def export_products(fmt: str, since=None, compress: bool = False, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Iterador de bytes con el catálogo completo (o lo modificado desde `since`).
+    Es bloqueante: StreamingResponse lo recorre en el threadpool.
+    """
+    return export_stream(iter_batches(engine.connect, since=since, batch_size=batch_size), fmt, compress=compress)
+
+
+def collect_upload_orphans(dry_run: bool = False, mode: str = UPLOAD_GC_MODE,
+                           grace_seconds: int = UPLOAD_GC_GRACE_SECONDS) -> dict:
+    """Liberar los uploads que no usa ningún producto (cuarentena o borrado)"""
+    db = None
+    try:
+        db = SessionLocal()
+        report = collect_orphans(
+            db.connection(),
+            grace_seconds=grace_seconds,
+            mode=mode,
+            quarantine_dir=UPLOAD_QUARANTINE_DIR,
+            dry_run=dry_run,
+        )
+        db.commit()
+        return report.to_dict()
+    except SQLAlchemyError as e:
+        if db:
+            db.rollback()
+        logger.error(f"Error de base de datos en el GC de uploads: {str(e)}")
+        raise SQLAlchemyError("Error al acceder a la base de datos")
+    finally:
+        if db:
+            db.close()
+
+
 def get_product_by_id(product_id: int):
     """Obtener un producto por ID"""
     db = None
@@ -99,6 +403,7 @@ def create_product(product_data: ProductCreate):
 
         db.add(product)
         db.commit()
+        catalog_version.touch()
         db.refresh(product)
 
         logger.info(f"Producto creado exitosamente: ID {product.id}, Nombre: {product.name}")
@@ -141,6 +446,7 @@ def update_product(product_id: int, update_data: ProductUpdate):
             setattr(product, key, value)
 
         db.commit()
+        catalog_version.touch()
         db.refresh(product)
 
         logger.info(f"Producto {product_id} actualizado exitosamente")
@@ -180,6 +486,7 @@ def delete_product(product_id: int):
 
         db.delete(product)
         db.commit()
+        catalog_version.touch()
 
         logger.info(f"Producto {product_id} eliminado exitosamente")
         return True
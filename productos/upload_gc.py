@@ -0,0 +1,242 @@
+"""
+Recolección de archivos huérfanos en `static/uploads`.
+
+Un archivo queda huérfano cuando ningún producto lo referencia: imágenes
+reemplazadas o de productos borrados, uploads cuyo alta falló después de
+guardar el archivo, temporales de un proceso que se cortó. El GC arma en
+memoria el conjunto de lo vivo (una pasada en streaming sobre
+`products.image_url`, más las imágenes por contenido referenciadas o
+liberadas hace poco según `stored_images`) y recorre el directorio con
+`os.scandir`, sin listar todo de una vez. Lo que no está vivo y es más viejo
+que el período de gracia se mueve a cuarentena o se borra.
+
+Las variantes (`<sha256>_<variante>.<ext>`) viven mientras viva su original.
+
+Los productos viejos guardan la imagen en formas que no siempre pasan por
+`/static/uploads` (`/buzo.jpeg`, `buzo.jpeg`, `http://host/buzo.jpeg`): de
+esas URLs se toma el nombre del archivo y cualquier upload con ese nombre se
+considera vivo. Ante la duda se conserva el archivo.
+
+El GC no arranca solo (`UPLOAD_GC_INTERVAL` en 0): con varios workers cada
+uno correría su propia pasada. Se corre desde un único lugar, con
+`scripts/gc_uploads.py` en un cron o con el intervalo en un solo proceso.
+
+El período de gracia cubre la ventana entre guardar el archivo y crear o
+actualizar el producto que lo usa; `store_upload` renueva el mtime cuando
+reutiliza un archivo existente para que no caiga en esa ventana.
+"""
+import asyncio
+import logging
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import bindparam, delete, or_, select
+from starlette.concurrency import run_in_threadpool
+
+from .images import IMAGES_TABLE, UPLOADS_URL, stored_images, uploads_dir
+from .model import Product
+
+logger = logging.getLogger(__name__)
+
+MODES = ("quarantine", "delete")
+_HASHED = re.compile(r"^([0-9a-f]{64})(?:_[a-z]+)?\.")
+_UPLOADS_PREFIX = UPLOADS_URL + "/"
+
+
+class UploadGCReport:
+    """Resultado de una pasada del GC"""
+
+    def __init__(self, mode: str, dry_run: bool):
+        self.mode = mode
+        self.dry_run = dry_run
+        self.scanned = 0
+        self.live = 0
+        self.recent = 0
+        self.orphans = 0
+        self.removed = 0
+        self.bytes_reclaimed = 0
+        self.errors = 0
+        self.released_hashes: Set[str] = set()
+
+    def to_dict(self) -> dict:
+        return {
+            "mode": self.mode,
+            "dry_run": self.dry_run,
+            "scanned": self.scanned,
+            "live": self.live,
+            "recent": self.recent,
+            "orphans": self.orphans,
+            "removed": self.removed,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "errors": self.errors,
+        }
+
+
+def _relative_upload_path(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    _, found, relative = url.partition(_UPLOADS_PREFIX)
+    if not found:
+        return None
+    return relative.split("?", 1)[0] or None
+
+
+def _legacy_name(url: str) -> Optional[str]:
+    """Nombre de archivo de un image_url que no apunta a /static/uploads (`/buzo.jpeg`)"""
+    if url.startswith("data:"):
+        return None
+    return os.path.basename(urlsplit(url.strip()).path) or None
+
+
+class LiveUploads:
+    """Lo que referencian los productos: rutas relativas, hashes y nombres de formas viejas"""
+
+    def __init__(self):
+        self.paths: Set[str] = set()
+        self.hashes: Set[str] = set()
+        self.names: Set[str] = set()
+
+    def is_live(self, relative: str, name: str) -> bool:
+        if relative in self.paths or name in self.names:
+            return True
+        match = _HASHED.match(name)
+        return bool(match and match.group(1) in self.hashes)
+
+
+def live_uploads(conn, grace_seconds: int) -> LiveUploads:
+    """
+    Rutas relativas, hashes y nombres de archivo vivos. Los hashes incluyen
+    las imágenes con referencias y las liberadas dentro del período de gracia;
+    los nombres salen de los image_url en formas viejas.
+    """
+    live = LiveUploads()
+    products = Product.__table__
+    result = conn.execution_options(stream_results=True).execute(
+        select(products.c.image_url).where(products.c.image_url.is_not(None)).distinct()
+    )
+    for (url,) in result:
+        relative = _relative_upload_path(url)
+        if relative is None:
+            name = _legacy_name(url)
+            if name:
+                live.names.add(name)
+            continue
+        match = _HASHED.match(os.path.basename(relative))
+        if match:
+            live.hashes.add(match.group(1))
+        else:
+            live.paths.add(relative)
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)).strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        rows = conn.execute(select(stored_images.c.sha256).where(or_(
+            stored_images.c.refcount > 0,
+            stored_images.c.released_at.is_(None),
+            stored_images.c.released_at > cutoff,
+        )))
+        live.hashes.update(row[0] for row in rows)
+    except Exception as e:
+        # Bases sin la tabla de imágenes: alcanza con lo que referencian los productos
+        logger.debug(f"Sin {IMAGES_TABLE}: {e}")
+    return live
+
+
+def iter_upload_files(root: str, relative: str = "") -> Iterator[Tuple[str, os.DirEntry]]:
+    """(ruta relativa, entrada) de cada archivo, recorriendo con scandir"""
+    try:
+        with os.scandir(os.path.join(root, relative) if relative else root) as entries:
+            for entry in entries:
+                child = f"{relative}/{entry.name}" if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    yield from iter_upload_files(root, child)
+                elif entry.is_file(follow_symlinks=False):
+                    yield child, entry
+    except FileNotFoundError:
+        return
+
+
+def _dispose(root: str, relative: str, mode: str, quarantine_dir: Optional[str]) -> None:
+    path = os.path.join(root, relative)
+    if mode == "delete":
+        os.remove(path)
+        return
+    target = os.path.join(quarantine_dir, relative)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(path, target)
+
+
+def collect_orphans(conn, root: Optional[str] = None, grace_seconds: int = 86400, mode: str = "quarantine",
+                    quarantine_dir: Optional[str] = None, dry_run: bool = False,
+                    now: Optional[float] = None) -> UploadGCReport:
+    """
+    Mover a cuarentena (o borrar) los archivos de `root` que no usa ningún
+    producto y tienen más de `grace_seconds`. Bloqueante: correrlo fuera del
+    event loop.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modo de GC inválido: {mode} (use {' o '.join(MODES)})")
+    if mode == "quarantine" and not quarantine_dir:
+        raise ValueError("El modo cuarentena necesita un directorio de cuarentena")
+    root = root or uploads_dir()
+    cutoff = (now if now is not None else time.time()) - grace_seconds
+    live = live_uploads(conn, grace_seconds)
+    report = UploadGCReport(mode, dry_run)
+
+    for relative, entry in iter_upload_files(root):
+        report.scanned += 1
+        if live.is_live(relative, entry.name):
+            report.live += 1
+            continue
+        try:
+            stat_result = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        if stat_result.st_mtime > cutoff:
+            report.recent += 1
+            continue
+        report.orphans += 1
+        if dry_run:
+            report.bytes_reclaimed += stat_result.st_size
+            continue
+        try:
+            _dispose(root, relative, mode, quarantine_dir)
+        except OSError as e:
+            report.errors += 1
+            logger.warning(f"No se pudo liberar {relative}: {e}")
+            continue
+        report.removed += 1
+        report.bytes_reclaimed += stat_result.st_size
+        match = _HASHED.match(entry.name)
+        if match:
+            report.released_hashes.add(match.group(1))
+
+    if report.released_hashes:
+        try:
+            conn.execute(
+                delete(stored_images).where(
+                    stored_images.c.sha256 == bindparam("b_sha256"), stored_images.c.refcount <= 0
+                ),
+                [{"b_sha256": sha256} for sha256 in report.released_hashes],
+            )
+        except Exception as e:
+            logger.debug(f"Sin {IMAGES_TABLE}: {e}")
+    logger.info(
+        f"GC de uploads: {report.scanned} archivos, {report.removed} liberados "
+        f"({report.bytes_reclaimed} bytes), {report.errors} errores"
+    )
+    return report
+
+
+async def run_periodically(job, interval_seconds: int) -> None:
+    """Correr `job` (bloqueante) cada `interval_seconds` en el threadpool hasta que se cancele"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(job)
+        except Exception as e:
+            logger.error(f"Falló el GC de uploads: {e}")
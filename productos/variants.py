@@ -0,0 +1,218 @@
+"""
+Variantes redimensionadas de las imágenes de producto (thumb, card, detail).
+
+Al subir una imagen se encola su procesamiento en un pool de procesos: el
+redimensionado y la compresión consumen CPU y no deben correr en el request
+ni competir por el GIL con el event loop. Cada variante se guarda en WebP y
+JPEG junto al original, con nombre derivado del hash:
+`<aa>/<sha256>_<variante>.<ext>`. Como las URLs se deducen del `image_url`,
+`ProductOut` las arma sin consultar la base; sólo se incluyen cuando las
+variantes ya están generadas.
+
+Cuando el pool termina lo registra en la base (`stored_images.variants_at` y
+`products.image_variants_ready`, ver images.py), así todos los workers lo ven
+y el listado lo lee con la fila en vez de revisar el disco por producto.
+
+Pillow es opcional: si no está instalado, las variantes no se generan y los
+productos siguen usando la imagen original.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import select, update
+
+from config.catalog import IMAGE_VARIANT_WORKERS
+from .images import UPLOADS_URL, StoredImage, is_content_addressed, mark_variants_ready, stored_images, uploads_dir
+from .model import Product
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depende del entorno
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+
+class VariantSpec(NamedTuple):
+    name: str
+    max_size: int
+
+
+VARIANTS = (
+    VariantSpec("thumb", 160),
+    VariantSpec("card", 480),
+    VariantSpec("detail", 1200),
+)
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+SAVE_OPTIONS = {
+    "WEBP": {"quality": 80, "method": 4},
+    "JPEG": {"quality": 82, "optimize": True, "progressive": True},
+}
+EXTENSIONS = {"webp": ".webp", "jpeg": ".jpg"}
+
+# La última variante que se escribe; si existe, están todas
+_MARKER = (VARIANTS[-1].name, "jpeg")
+
+
+def variant_relative(sha256: str, variant: str, fmt: str) -> str:
+    return f"{sha256[:2]}/{sha256}_{variant}{EXTENSIONS[fmt]}"
+
+
+def variant_urls(sha256: str) -> Dict[str, Dict[str, str]]:
+    return {
+        spec.name: {fmt: f"{UPLOADS_URL}/{variant_relative(sha256, spec.name, fmt)}" for fmt in FORMATS}
+        for spec in VARIANTS
+    }
+
+
+def _flatten_for_jpeg(image):
+    """JPEG no tiene transparencia: componer sobre fondo blanco"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def generate_variants(source_path: str, sha256: str, base_dir: str) -> List[str]:
+    """Generar todas las variantes de una imagen (corre en un proceso del pool)"""
+    with Image.open(source_path) as original:
+        original.seek(0)
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    written = []
+    for spec in VARIANTS:
+        resized = image.copy()
+        # thumbnail conserva la proporción y nunca agranda
+        resized.thumbnail((spec.max_size, spec.max_size), Image.LANCZOS)
+        for fmt, pil_format in FORMATS.items():
+            target = os.path.join(base_dir, variant_relative(sha256, spec.name, fmt))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = f"{target}.tmp"
+            frame = _flatten_for_jpeg(resized) if pil_format == "JPEG" else resized
+            if pil_format == "WEBP" and frame.mode not in ("RGB", "RGBA"):
+                frame = frame.convert("RGBA" if "A" in frame.getbands() or frame.mode == "P" else "RGB")
+            frame.save(tmp, format=pil_format, **SAVE_OPTIONS[pil_format])
+            os.replace(tmp, target)
+            written.append(target)
+    return written
+
+
+class VariantPool:
+    """Pool de procesos para generar variantes fuera del request"""
+
+    def __init__(self, max_workers: int = 1, begin: Optional[Callable] = None):
+        self.max_workers = max_workers
+        self._begin_factory = begin
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return Image is not None and self.max_workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _begin(self):
+        if self._begin_factory is None:
+            from config.cnx import engine
+            return engine.begin()
+        return self._begin_factory()
+
+    def schedule(self, image: StoredImage) -> Optional[Future]:
+        """Encolar la generación de variantes de una imagen (no espera el resultado)"""
+        if not self.enabled:
+            if Image is None:
+                logger.warning("Pillow no está instalado: no se generan variantes de imágenes")
+            return None
+        sha256 = image.sha256
+        base_dir = os.path.dirname(os.path.dirname(image.path))
+        if variants_on_disk(sha256, base_dir):
+            # Subida repetida: las variantes ya estaban, sólo falta registrarlas
+            self._mark_ready(image.url)
+            return None
+        with self._lock:
+            if sha256 in self._pending:
+                return self._pending[sha256]
+        future = self._get_executor().submit(generate_variants, image.path, sha256, base_dir)
+        with self._lock:
+            self._pending[sha256] = future
+        future.add_done_callback(lambda done: self._finished(sha256, image.url, done))
+        return future
+
+    def _finished(self, sha256: str, url: str, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(sha256, None)
+        error = future.exception()
+        if error is None:
+            self._mark_ready(url)
+        else:
+            logger.error(f"No se pudieron generar las variantes de {sha256}: {error}")
+
+    def _mark_ready(self, url: str) -> None:
+        # El UPDATE de products dispara el trigger de la versión del catálogo:
+        # los ETag de las respuestas que ahora incluyen las variantes cambian solos
+        try:
+            with self._begin() as conn:
+                mark_variants_ready(conn, url)
+        except Exception as e:
+            logger.error(f"No se pudo registrar las variantes de {url}: {e}")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+variant_pool = VariantPool(max_workers=IMAGE_VARIANT_WORKERS)
+
+
+def variants_on_disk(sha256: str, base_dir: Optional[str] = None) -> bool:
+    marker = os.path.join(base_dir or uploads_dir(), variant_relative(sha256, *_MARKER))
+    return os.path.exists(marker)
+
+
+def sync_variant_readiness(conn, base_dir: Optional[str] = None) -> int:
+    """
+    Registrar las variantes que ya están en disco pero no en la base (bases
+    anteriores a `variants_at`); devuelve cuántas imágenes se marcaron.
+    """
+    if conn.dialect.name != "sqlite":
+        return 0
+    rows = conn.execute(
+        select(stored_images.c.sha256, stored_images.c.url).where(stored_images.c.variants_at.is_(None))
+    ).all()
+    marked = 0
+    for row in rows:
+        if variants_on_disk(row.sha256, base_dir):
+            mark_variants_ready(conn, row.url)
+            marked += 1
+    # Productos que apuntan a imágenes ya marcadas (columna recién agregada)
+    products = Product.__table__
+    conn.execute(
+        update(products)
+        .where(
+            ~products.c.image_variants_ready,
+            products.c.image_url.in_(select(stored_images.c.url).where(stored_images.c.variants_at.is_not(None))),
+        )
+        .values(image_variants_ready=True)
+    )
+    return marked
+
+
+def image_variants_for(image_url: Optional[str], ready: bool) -> Optional[Dict[str, Dict[str, str]]]:
+    """URLs de las variantes de un image_url, o None si no hay (todavía)"""
+    if not ready or not is_content_addressed(image_url):
+        return None
+    return variant_urls(image_url.rsplit("/", 1)[1].split(".")[0])
@@ -2,6 +2,7 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from config.cnx import SessionLocal
 from .model import Rol
 from .dto import RolCreate, RolUpdate
+from permisos.matrix import permission_matrix
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -64,6 +65,7 @@ def create_rol(rol_data: RolCreate):
         db.add(rol)
         db.commit()
         db.refresh(rol)
+        permission_matrix.invalidate()
 
         logger.info(f"Rol creado exitosamente: ID {rol.rol_id}, Nombre: {rol.rol_nombre}")
         return rol
@@ -102,6 +104,7 @@ def update_rol(rol_id: int, update_data: RolUpdate):
 
         db.commit()
         db.refresh(rol)
+        permission_matrix.invalidate()
 
         logger.info(f"Rol {rol_id} actualizado exitosamente")
         return rol
@@ -134,6 +137,7 @@ def delete_rol(rol_id: int):
 
         db.delete(rol)
         db.commit()
+        permission_matrix.invalidate()
 
         logger.info(f"Rol {rol_id} eliminado exitosamente")
         return True
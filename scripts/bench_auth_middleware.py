@@ -0,0 +1,129 @@
+"""
+Microbenchmark del overhead por request del AuthMiddleware.
+
+Compara, llamando a la aplicación ASGI directamente (sin red ni cliente HTTP):
+  - sin middleware
+  - la lógica de autorización envuelta en BaseHTTPMiddleware (implementación anterior)
+  - el AuthMiddleware ASGI puro
+
+Uso:
+    python scripts/bench_auth_middleware.py [iteraciones]
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from middlewares.auth import AuthMiddleware, RouteTable, create_access_token
+import middlewares.auth as auth_module
+
+BODY = b"x" * (256 * 1024)
+
+
+def build_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/productos/{product_id}")
+    def get_product(product_id: int):
+        return {"id": product_id}
+
+    @app.get("/usuarios/me")
+    def me():
+        return {"ok": True}
+
+    @app.get("/productos/{product_id}/archivo")
+    def archivo(product_id: int):
+        # Respuesta grande: se registra como pública en main()
+        return Response(BODY, media_type="application/octet-stream")
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+class BaseHTTPAuthMiddleware(BaseHTTPMiddleware):
+    """Misma lógica de autorización envuelta como antes en BaseHTTPMiddleware"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._auth = AuthMiddleware(app)
+
+    async def dispatch(self, request, call_next):
+        denial = self._auth.authorize(request.scope)
+        if denial is not None:
+            return denial
+        return await call_next(request)
+
+
+async def call(app, path: str, headers) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8000),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(app, path: str, headers, iterations: int) -> float:
+    # Calentar (construcción del middleware stack y de la tabla de rutas)
+    for _ in range(50):
+        await call(app, path, headers)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await call(app, path, headers)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    token = create_access_token({"sub": "bench", "user_id": 1, "rol_id": 1})
+    auth_headers = [(b"authorization", f"Bearer {token}".encode())]
+    auth_module.RouteConfig.PUBLIC_TEMPLATES.setdefault("/productos/{product_id}/archivo", ["GET"])
+
+    scenarios = [
+        ("GET público /productos/1", "/productos/1", []),
+        ("GET autenticado /usuarios/me", "/usuarios/me", auth_headers),
+        ("GET público 256 KiB", "/productos/1/archivo", []),
+    ]
+    variants = [
+        ("sin middleware", None),
+        ("BaseHTTPMiddleware", BaseHTTPAuthMiddleware),
+        ("ASGI puro", AuthMiddleware),
+    ]
+
+    print(f"{'escenario':32} {'variante':20} {'us/request':>12}")
+    for label, path, headers in scenarios:
+        for name, middleware in variants:
+            auth_module.route_table = RouteTable()
+            app = build_app(middleware)
+            micros = asyncio.run(run(app, path, headers, iterations))
+            print(f"{label:32} {name:20} {micros:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark de serialización de listados: camino estándar de FastAPI vs FastJSON.
+
+Carga N productos en una base SQLite en memoria, los consulta como objetos
+ORM (igual que los servicios) y mide sólo la serialización de la respuesta:
+  - FastAPI: `serialize_response` con `response_model` (validación
+    from_attributes + dump a tipos JSON) y `JSONResponse` (módulo json)
+  - FastJSON: encoder precompilado + orjson (config/fast_json.py)
+
+Uso:
+    python scripts/bench_json_serialization.py [tamaños...]   (por defecto 1000 10000 100000)
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from config.basemodel import Base
+from config.fast_json import FastJSON, orjson
+# Mismo orden de imports que main.py para registrar todas las relaciones
+from permisos.model import Permiso  # noqa: F401
+from roles.model import Rol  # noqa: F401
+from usuarios.model import Usuario  # noqa: F401
+from productos.model import Product
+from cart_items.model import CartItem  # noqa: F401
+from productos.dto import ProductOut
+
+RESPONSE_MODEL = List[ProductOut]
+
+
+def load_catalog(size: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Product.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(Product.__table__), [
+            {
+                "id": i,
+                "name": f"Producto {i}",
+                "description": "Zapatillas deportivas cómodas y elegantes",
+                "price": 10 + (i % 500) * 1.25,
+                "image_url": f"/static/uploads/legacy_{i}.jpg",
+                "discount": float(i % 40),
+                "category": ("hombre", "mujer", "niños")[i % 3],
+                "category_key": ("hombre", "mujer", "ninos")[i % 3],
+            }
+            for i in range(1, size + 1)
+        ])
+    session = sessionmaker(bind=engine)()
+    rows = session.query(Product).order_by(Product.id).all()
+    session.close()
+    return rows
+
+
+def fastapi_path(field, rows) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def fast_path(fast_json, rows) -> bytes:
+    return fast_json.respond(RESPONSE_MODEL, rows).body
+
+
+def measure(function, *args, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(body)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    field = create_model_field(name="Response_bench", type_=RESPONSE_MODEL, mode="serialization")
+    fast_json = FastJSON("bench", enabled=True)
+    encoder = "orjson" if orjson is not None else "json"
+
+    print(f"{'filas':>8} {'variante':22} {'ms':>10} {'bytes':>12} {'x':>6}")
+    for size in sizes:
+        rows = load_catalog(size)
+        baseline, _ = measure(fastapi_path, field, rows)
+        fast, length = measure(fast_path, fast_json, rows)
+        print(f"{size:>8} {'FastAPI response_model':22} {baseline:10.1f} {length:12d} {1:6.1f}")
+        print(f"{size:>8} {'FastJSON (' + encoder + ')':22} {fast:10.1f} {length:12d} {baseline / fast:6.1f}")
+
+
+if __name__ == "__main__":
+    main()
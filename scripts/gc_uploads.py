@@ -0,0 +1,36 @@
+"""
+Script para liberar los uploads huérfanos de static/uploads
+
+Uso: python scripts/gc_uploads.py [--dry-run] [--delete] [--grace SEGUNDOS]
+Por defecto mueve los huérfanos a UPLOAD_QUARANTINE_DIR (ver config/catalog.py).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Asegurar que la ruta del proyecto esté en sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.catalog import UPLOAD_GC_GRACE_SECONDS, UPLOAD_GC_MODE
+from productos.services import collect_upload_orphans
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GC de uploads huérfanos")
+    parser.add_argument("--dry-run", action="store_true", help="Sólo informar, sin mover ni borrar")
+    parser.add_argument("--delete", action="store_true", help="Borrar en lugar de mover a cuarentena")
+    parser.add_argument("--grace", type=int, default=UPLOAD_GC_GRACE_SECONDS, help="Antigüedad mínima en segundos")
+    args = parser.parse_args()
+
+    report = collect_upload_orphans(
+        dry_run=args.dry_run,
+        mode="delete" if args.delete else UPLOAD_GC_MODE,
+        grace_seconds=args.grace,
+    )
+    print(json.dumps(report, indent=2))
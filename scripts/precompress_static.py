@@ -0,0 +1,23 @@
+"""
+Script para generar las variantes .gz / .br de los archivos de static/
+
+Correrlo en cada deploy (o después de copiar assets nuevos); es incremental.
+"""
+import sys
+from pathlib import Path
+
+# Asegurar que la ruta del proyecto esté en sys.path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from middlewares.static_files import precompress_tree
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else str(PROJECT_ROOT / "static")
+    written, saved = precompress_tree(root)
+    logger.info(f"Precomprimidos {written} archivos en {root} ({saved} bytes ahorrados)")
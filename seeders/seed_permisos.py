@@ -124,6 +124,18 @@ def seed_permisos():
                 "permiso_metodo": "POST",
                 "permiso_descripcion": "Subir imágenes de productos"
             },
+            {
+                "permiso_nombre": "productos.importar",
+                "permiso_ruta": "/productos/import",
+                "permiso_metodo": "POST",
+                "permiso_descripcion": "Importar productos en lote (CSV/NDJSON)"
+            },
+            {
+                "permiso_nombre": "productos.recalcular_precios",
+                "permiso_ruta": "/productos/reprice",
+                "permiso_metodo": "POST",
+                "permiso_descripcion": "Recalcular precios y descuentos en lote"
+            },
             {
                 "permiso_nombre": "productos.ver",
                 "permiso_ruta": "/productos/{id}",
@@ -44,6 +44,7 @@ def seed_rol_permisos():
                 "roles.listar", "roles.crear", "roles.ver", "roles.actualizar", "roles.eliminar",
                 # Productos
                 "productos.listar", "productos.crear", "productos.ver", "productos.actualizar", "productos.eliminar",
+                "productos.importar", "productos.recalcular_precios",
                 # Carrito
                 "cart_items.listar", "cart_items.ver_usuario", "cart_items.ver", "cart_items.crear",
                 "cart_items.actualizar", "cart_items.eliminar", "cart_items.limpiar_carrito",
@@ -0,0 +1,48 @@
+"""
+Configuración común de las pruebas.
+
+Las pruebas que levantan la app (test_cart.py) usan la base de config/cnx.py:
+`ENGINE` y `DATABASE` apuntan a un archivo temporal antes de importar la
+configuración, para no escribir kikshopping.db en el repo ni depender de lo
+que haya quedado de una corrida anterior.
+
+`engine` / `conn` dan una base SQLite en memoria con el esquema de los
+modelos (`Base.metadata.create_all`); cada prueba instala encima las tablas
+auxiliares y triggers que necesita.
+"""
+import os
+import shutil
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="kikshopping-tests-")
+os.environ["ENGINE"] = "sqlite"
+os.environ["DATABASE"] = os.path.join(_DB_DIR, "kikshopping.db")
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from config.basemodel import Base  # noqa: E402
+import cart_items.model  # noqa: E402,F401 - registrar las tablas de los modelos
+import permisos.model  # noqa: E402,F401
+import productos.model  # noqa: E402,F401
+import roles.model  # noqa: E402,F401
+import usuarios.model  # noqa: E402,F401
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def conn(engine):
+    with engine.begin() as connection:
+        yield connection
@@ -0,0 +1,37 @@
+"""
+Pruebas de la vista del carrito con proyección de columnas.
+"""
+
+from sqlalchemy import insert
+
+from cart_items.model import CartItem
+from cart_items.projection import delete_items, read_user_cart
+from productos.model import Product
+from usuarios.model import Usuario
+
+
+def test_items_con_usuario_unico_y_huerfanos(conn):
+    conn.execute(insert(Usuario.__table__).values(
+        usu_id=1, usu_usuario="ana", usu_nombre_completo="Ana Pérez", usu_contrasenia="secreto", usu_rol_id=1,
+    ))
+    conn.execute(insert(Product.__table__), [
+        {"id": 10, "name": "Nike", "price": 150.99, "image_url": "/static/a.jpg", "description": "Zapatillas", "discount": None},
+        {"id": 11, "name": "Adidas", "price": 99, "image_url": None, "description": None, "discount": 10},
+    ])
+    conn.execute(insert(CartItem.__table__), [
+        {"id": 1, "user_id": 1, "product_id": 10, "quantity": 2},
+        {"id": 2, "user_id": 1, "product_id": 99, "quantity": 1},
+        {"id": 3, "user_id": 1, "product_id": 11, "quantity": 1},
+        {"id": 4, "user_id": 2, "product_id": 10, "quantity": 5},
+    ])
+
+    items, orphans = read_user_cart(conn, 1)
+    assert orphans == [2]
+    assert [(item["id"], item["product"]["name"], item["quantity"]) for item in items] == [(1, "Nike", 2), (3, "Adidas", 1)]
+    assert items[0]["user"] == {"usu_id": 1, "usu_usuario": "ana", "usu_nombre_completo": "Ana Pérez"}
+    assert items[0]["user"] is items[1]["user"]
+    assert items[0]["product"]["discount"] == 0.0
+
+    assert delete_items(conn, orphans) == 1
+    assert read_user_cart(conn, 1)[1] == []
+    assert read_user_cart(conn, 3) == ([], [])
@@ -0,0 +1,57 @@
+"""
+Pruebas del resumen del carrito (consulta agregada y caché por usuario).
+"""
+
+import pytest
+from sqlalchemy import text
+
+from cart_items.summary import CartSummaryCache, read_summary
+
+
+@pytest.fixture()
+def conn(conn):
+    conn.execute(text("INSERT INTO products (id, price, discount) VALUES (1, 100, 10), (2, 19.99, NULL), (3, 50, 0)"))
+    conn.execute(text(
+        "INSERT INTO cart_items (user_id, product_id, quantity) VALUES (1, 1, 2), (1, 2, 3), (1, 99, 1), (2, 3, 1)"
+    ))
+    return conn
+
+
+def test_totales_en_una_consulta(conn):
+    # El item sin producto (99) no suma, igual que en la compra
+    assert read_summary(conn, 1) == {
+        "user_id": 1,
+        "line_count": 2,
+        "item_count": 5,
+        "subtotal": 259.97,
+        "discount_total": 20.0,
+        "grand_total": 239.97,
+    }
+    empty = read_summary(conn, 3)
+    assert (empty["line_count"], empty["item_count"], empty["grand_total"]) == (0, 0, 0.0)
+
+
+def test_cache_invalida_por_escritura_catalogo_y_ttl():
+    now = [0.0]
+    cache = CartSummaryCache(ttl=30, clock=lambda: now[0])
+    summary = {"user_id": 1, "grand_total": 10.0}
+
+    cache.put(1, "e:0", summary, cache.generation)
+    assert cache.get(1, "e:0") == summary
+    # Otra versión del catálogo (cambio de precios) no usa la entrada
+    assert cache.get(1, "e:1") is None
+
+    cache.put(1, "e:0", summary, cache.generation)
+    cache.invalidate(1)
+    assert cache.get(1, "e:0") is None
+
+    # Un resumen calculado antes de una invalidación no se guarda
+    generation = cache.generation
+    cache.invalidate(2)
+    cache.put(1, "e:0", summary, generation)
+    assert cache.get(1, "e:0") is None
+
+    cache.put(1, "e:0", summary, cache.generation)
+    now[0] = 31
+    assert cache.get(1, "e:0") is None
+    assert CartSummaryCache(ttl=0).enabled is False
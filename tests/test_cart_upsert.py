@@ -0,0 +1,108 @@
+"""
+Pruebas del upsert del carrito (índice único + INSERT ... ON CONFLICT ... RETURNING)
+de las operaciones por lote y de los cambios de cantidad.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from cart_items.dto import CartBatchRequest
+from cart_items.model import CartItem
+from cart_items.statements import (
+    add_item,
+    apply_operations,
+    collapse_operations,
+    decrement_item,
+    increment_item,
+    set_item_quantity,
+)
+
+cart_items = CartItem.__table__
+
+
+def add(conn, user_id, product_id, quantity):
+    return add_item(conn, cart_items, "sqlite", user_id, product_id, quantity)
+
+
+def test_agregar_dos_veces_suma_en_la_misma_fila(conn):
+    first = add(conn, 1, 10, 2)
+    second = add(conn, 1, 10, 3)
+    other = add(conn, 2, 10, 1)
+
+    assert first == {"id": 1, "user_id": 1, "product_id": 10, "quantity": 2}
+    assert second == {"id": 1, "user_id": 1, "product_id": 10, "quantity": 5}
+    assert other["id"] != first["id"] and other["quantity"] == 1
+    assert conn.execute(text("SELECT COUNT(*) FROM cart_items")).scalar() == 2
+
+
+def test_lote_se_reduce_a_un_efecto_por_producto():
+    batch = CartBatchRequest(operations=[
+        {"op": "add", "product_id": 1},
+        {"op": "add", "product_id": 1, "quantity": 2},
+        {"op": "set", "product_id": 2, "quantity": 4},
+        {"op": "add", "product_id": 2},
+        {"op": "add", "product_id": 3},
+        {"op": "remove", "product_id": 3},
+    ])
+    assert collapse_operations(batch.operations) == ({1: 3}, {2: 5, 3: 0})
+
+
+def test_lote_aplica_y_devuelve_el_carrito(conn):
+    conn.execute(text("INSERT INTO products (id) VALUES (10), (11), (12), (13)"))
+    add(conn, 1, 10, 2)
+    add(conn, 1, 11, 1)
+    add(conn, 2, 12, 1)
+
+    batch = CartBatchRequest(operations=[
+        {"op": "add", "product_id": 10, "quantity": 3},
+        {"op": "remove", "product_id": 11},
+        {"op": "set", "product_id": 12, "quantity": 7},
+        {"op": "set", "product_id": 13, "quantity": 0},
+    ])
+    cart = apply_operations(conn, cart_items, "sqlite", 1, batch.operations)
+    assert [(item["product_id"], item["quantity"]) for item in cart] == [(10, 5), (12, 7)]
+    # El carrito de otro usuario no cambia
+    assert conn.execute(text("SELECT quantity FROM cart_items WHERE user_id = 2")).scalar() == 1
+
+    with pytest.raises(ValueError):
+        apply_operations(conn, cart_items, "sqlite", 1, CartBatchRequest(operations=[{"op": "add", "product_id": 99}]).operations)
+
+
+def test_incrementar_decrementar_y_fijar_en_una_sentencia(conn):
+    item_id = add(conn, 1, 10, 1)["id"]
+
+    assert increment_item(conn, cart_items, item_id)["quantity"] == 2
+    assert set_item_quantity(conn, cart_items, item_id, 5)["quantity"] == 5
+    assert decrement_item(conn, cart_items, item_id) == ({"id": item_id, "user_id": 1, "product_id": 10, "quantity": 4}, False)
+
+    set_item_quantity(conn, cart_items, item_id, 1)
+    row, deleted = decrement_item(conn, cart_items, item_id)
+    assert deleted and row["user_id"] == 1
+    assert conn.execute(text("SELECT COUNT(*) FROM cart_items")).scalar() == 0
+
+    # Item inexistente
+    assert increment_item(conn, cart_items, item_id) is None
+    assert set_item_quantity(conn, cart_items, item_id, 3) is None
+    assert decrement_item(conn, cart_items, item_id) == (None, False)
+
+
+def test_motor_sin_on_conflict_ni_returning(conn, monkeypatch):
+    # Se simula un motor genérico: sin dialecto de upsert ni RETURNING
+    monkeypatch.setattr(conn.dialect, "update_returning", False)
+    monkeypatch.setattr(conn.dialect, "delete_returning", False)
+    conn.execute(text("INSERT INTO products (id) VALUES (10), (11)"))
+
+    first = add_item(conn, cart_items, "generic", 1, 10, 2)
+    assert add_item(conn, cart_items, "generic", 1, 10, 3) == {**first, "quantity": 5}
+    assert increment_item(conn, cart_items, first["id"]) == {**first, "quantity": 6}
+    assert set_item_quantity(conn, cart_items, first["id"], 1) == {**first, "quantity": 1}
+    assert decrement_item(conn, cart_items, first["id"]) == ({**first, "quantity": 1}, True)
+    assert decrement_item(conn, cart_items, first["id"]) == (None, False)
+
+    batch = CartBatchRequest(operations=[
+        {"op": "add", "product_id": 10, "quantity": 2},
+        {"op": "set", "product_id": 11, "quantity": 4},
+    ])
+    cart = apply_operations(conn, cart_items, "generic", 1, batch.operations)
+    # Se aplican primero las cantidades fijas y después las sumas
+    assert [(item["product_id"], item["quantity"]) for item in cart] == [(11, 4), (10, 2)]
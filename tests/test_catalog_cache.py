@@ -0,0 +1,120 @@
+"""
+Pruebas del GET condicional del catálogo.
+"""
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from config.basemodel import Base
+from productos.catalog_cache import CatalogVersion, conditional_get, etag_matches, install_catalog_version
+from productos.exporter import export_encoding
+
+
+def build_engine(install: bool = True):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    if install:
+        with engine.begin() as conn:
+            install_catalog_version(conn)
+    return engine
+
+
+def build_client(version: CatalogVersion):
+    app = FastAPI()
+    calls = []
+
+    @app.get("/items", dependencies=[Depends(conditional_get("public, max-age=30", version))])
+    def list_items():
+        calls.append(1)
+        return [1, 2, 3]
+
+    return TestClient(app), calls
+
+
+def test_etag_matches():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+
+def test_304_sin_ejecutar_el_endpoint_hasta_que_cambia_la_version():
+    version = CatalogVersion(build_engine().connect)
+    client, calls = build_client(version)
+    first = client.get("/items?page=1")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "public, max-age=30"
+
+    cached = client.get("/items?page=1", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert len(calls) == 1
+
+    # Otra query string es otra representación
+    assert client.get("/items?page=2", headers={"If-None-Match": etag}).status_code == 200
+
+    version.bump()
+    fresh = client.get("/items?page=1", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+
+
+def test_escritura_por_sql_sin_bump_cambia_el_etag():
+    engine = build_engine()
+    # Dos "workers": cada uno con su propia instancia, la versión sale de la base
+    worker_a = CatalogVersion(engine.connect)
+    worker_b = CatalogVersion(engine.connect)
+    client, _ = build_client(worker_a)
+    etag = client.get("/items").headers["etag"]
+    assert worker_b.etag("/items") == etag
+
+    for statement in (
+        "INSERT INTO products (id, price) VALUES (1, 10)",
+        "UPDATE products SET price = 12 WHERE id = 1",
+        "DELETE FROM products WHERE id = 1",
+    ):
+        with engine.begin() as conn:
+            conn.execute(text(statement))
+        response = client.get("/items", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        etag = response.headers["etag"]
+        assert worker_b.etag("/items") == etag
+
+
+def test_sin_tabla_usa_el_contador_local():
+    version = CatalogVersion(build_engine(install=False).connect)
+    etag = version.etag("/items")
+    assert version.etag("/items") == etag
+    version.bump()
+    assert version.etag("/items") != etag
+    etag = version.etag("/items")
+    version.touch()
+    assert version.etag("/items") != etag
+
+
+def test_touch_no_escribe_en_la_base():
+    version = CatalogVersion(build_engine().connect)
+    before = version.value
+    version.touch()
+    assert version.value == before
+
+
+def test_cada_codificacion_tiene_su_etag():
+    app = FastAPI()
+    version = CatalogVersion(build_engine().connect)
+
+    @app.get("/export", dependencies=[Depends(conditional_get("public, max-age=30", version, export_encoding))])
+    def export():
+        return [1, 2, 3]
+
+    client = TestClient(app)
+    identity = client.get("/export", headers={"Accept-Encoding": "identity"}).headers["etag"]
+    gzipped = client.get("/export", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    assert gzipped != identity and gzipped.endswith('-gzip"')
+    # El ETag de una codificación no valida la otra
+    assert client.get("/export", headers={"Accept-Encoding": "identity", "If-None-Match": gzipped}).status_code == 200
+    assert client.get("/export", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped}).status_code == 304
+    assert client.get("/export?gzip=false", headers={"Accept-Encoding": "gzip"}).headers["etag"] != gzipped
@@ -0,0 +1,47 @@
+"""
+Pruebas del precio efectivo (columna generada con descuento aplicado).
+"""
+
+import pytest
+from sqlalchemy import text
+
+from productos.pricing import effective_price
+
+
+@pytest.fixture()
+def conn(conn):
+    conn.execute(text(
+        "INSERT INTO products (id, price, discount) VALUES (1, 100, 50), (2, 60, 0), (3, 80, NULL), (4, 150.99, 10)"
+    ))
+    return conn
+
+
+def test_columna_sigue_a_precio_y_descuento(conn):
+    values = dict(conn.execute(text("SELECT id, effective_price FROM products")).all())
+    assert values == {1: 50.0, 2: 60.0, 3: 80.0, 4: 135.89}
+    assert values[4] == effective_price(150.99, 10)
+
+    # Cualquier escritura (p.ej. el UPDATE por lotes del recálculo) la mantiene
+    conn.execute(text("UPDATE products SET discount = 25 WHERE id = 2"))
+    assert conn.execute(text("SELECT effective_price FROM products WHERE id = 2")).scalar() == 45.0
+
+
+def test_orden_y_rango_usan_el_indice(conn):
+    statement = "SELECT id FROM products WHERE effective_price BETWEEN 40 AND 90 ORDER BY effective_price, id"
+    assert [row[0] for row in conn.execute(text(statement))] == [1, 2, 3]
+    plan = " ".join(str(row[-1]) for row in conn.execute(text("EXPLAIN QUERY PLAN " + statement)))
+    assert "ix_products_effective_price_id" in plan
+
+
+@pytest.mark.parametrize("price, discount", [(2.675, 0), (5.35, 50), (1.005, 0), (19.99, 12.5), (60.935, 0)])
+def test_python_redondea_igual_que_sqlite(conn, price, discount):
+    conn.execute(text("INSERT INTO products (id, price, discount) VALUES (10, :price, :discount)"),
+                 {"price": price, "discount": discount})
+    stored = conn.execute(text("SELECT effective_price FROM products WHERE id = 10")).scalar()
+    assert effective_price(price, discount) == stored
+
+
+def test_mitad_redondea_hacia_arriba():
+    # round() de Python daría 2.67 (el binario de 2.675 está apenas por debajo)
+    assert effective_price(2.675, 0) == 2.68
+    assert effective_price(10.0, 50.05) == 5.0
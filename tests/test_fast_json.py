@@ -0,0 +1,62 @@
+"""
+Pruebas del camino rápido de serialización (config/fast_json.py).
+"""
+
+import json
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import List, Optional
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from config.fast_json import FastJSON, encoder_for
+from productos.dto import ProductOut, ProductPage
+
+
+class Owner(BaseModel):
+    id: int
+    name: str
+
+
+class Item(BaseModel):
+    id: int
+    created: datetime
+    birthday: Optional[date] = None
+    owner: Optional[Owner] = None
+    tags: List[str] = []
+
+
+def product(**overrides):
+    values = dict(id=1, name="Nike", description=None, price=100.0, image_url="/x.jpg", discount=10.0,
+                  category="hombre", effective_price=90.0, image_variants_ready=False)
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_misma_salida_que_pydantic():
+    hashed = "/static/uploads/ab/ab" + "0" * 62 + ".jpg"
+    rows = [product(), product(id=2, name="Ñandú", image_url=None), product(id=3, image_url=hashed, image_variants_ready=True)]
+    page = {"items": rows, "next_cursor": "abc", "limit": 3}
+
+    fast = FastJSON("productos", enabled=True).respond(ProductPage, page)
+    expected = ProductPage.model_validate(page, from_attributes=True).model_dump(mode="json")
+    assert json.loads(fast.body) == expected
+    assert "image_variants" in expected["items"][0] and expected["items"][2]["image_variants"] is not None
+
+    items = [SimpleNamespace(id=1, created=datetime(2025, 9, 11, 12, 0), birthday=date(1995, 3, 15),
+                             owner=SimpleNamespace(id=7, name="Ana"), tags=["a"]),
+             {"id": 2, "created": datetime(2025, 1, 1)}]
+    fast_items = json.loads(FastJSON("x", enabled=True).respond(List[Item], items).body)
+    assert fast_items == [Item.model_validate(item, from_attributes=True).model_dump(mode="json") for item in items]
+
+
+def test_headers_del_response_y_flag_por_router():
+    response = Response()
+    response.headers["ETag"] = '"v1"'
+    fast = FastJSON("productos", enabled=True).respond(List[ProductOut], [product()], response)
+    assert fast.headers["etag"] == '"v1"' and fast.media_type == "application/json"
+
+    rows = [product()]
+    assert FastJSON("productos", enabled=False).respond(List[ProductOut], rows) is rows
+    assert encoder_for(List[ProductOut]) is encoder_for(List[ProductOut])
@@ -0,0 +1,73 @@
+"""
+Pruebas del almacenamiento de imágenes por contenido y sus referencias.
+"""
+
+import io
+import os
+
+import pytest
+from sqlalchemy import text
+
+from productos.images import (
+    UnsupportedImageType, UploadTooLarge, install_image_refcounts, is_content_addressed, register_image, store_upload,
+)
+
+
+@pytest.fixture()
+def conn(conn):
+    install_image_refcounts(conn)
+    return conn
+
+
+def refcount(conn, url):
+    return conn.execute(text("SELECT refcount, released_at IS NOT NULL FROM stored_images WHERE url = :url"),
+                        {"url": url}).one()
+
+
+def test_mismos_bytes_mismo_archivo(tmp_path):
+    first = store_upload(io.BytesIO(b"png-bytes"), "foto.PNG", "image/png", base_dir=str(tmp_path))
+    second = store_upload(io.BytesIO(b"png-bytes"), "otra.png", "image/png", base_dir=str(tmp_path))
+
+    assert first.created and not second.created
+    assert first.url == second.url == f"/static/uploads/{first.sha256[:2]}/{first.sha256}.png"
+    assert is_content_addressed(first.url)
+    assert not is_content_addressed("/static/uploads/abc_foto.png")
+    # Sólo queda el archivo final, sin temporales
+    assert sorted(os.listdir(tmp_path)) == [first.sha256[:2]]
+
+
+def test_triggers_cuentan_referencias(conn, tmp_path):
+    image = store_upload(io.BytesIO(b"jpeg"), "a.jpg", "image/jpeg", base_dir=str(tmp_path))
+    register_image(conn, image)
+    assert refcount(conn, image.url) == (0, True)
+
+    conn.execute(text("INSERT INTO products (id, name, image_url) VALUES (1, 'A', :url), (2, 'B', :url)"),
+                 {"url": image.url})
+    assert refcount(conn, image.url) == (2, False)
+
+    conn.execute(text("UPDATE products SET image_url = NULL WHERE id = 1"))
+    conn.execute(text("UPDATE products SET name = 'B2' WHERE id = 2"))
+    assert refcount(conn, image.url) == (1, False)
+
+    conn.execute(text("DELETE FROM products WHERE id = 2"))
+    assert refcount(conn, image.url) == (0, True)
+
+    # Registrar de nuevo los mismos bytes no duplica ni reinicia la cuenta
+    register_image(conn, image)
+    assert conn.execute(text("SELECT COUNT(*) FROM stored_images")).scalar() == 1
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+def test_rechaza_por_tipo_detectado_y_por_tamano(tmp_path):
+    allowed = {"image/png", "image/jpeg"}
+    with pytest.raises(UnsupportedImageType):
+        store_upload(io.BytesIO(b"<?php echo 1;"), "foto.png", "image/png", base_dir=str(tmp_path), allowed_types=allowed)
+    with pytest.raises(UploadTooLarge):
+        store_upload(io.BytesIO(PNG), "foto.png", "image/png", base_dir=str(tmp_path), max_bytes=50, allowed_types=allowed)
+    assert os.listdir(tmp_path) == []
+
+    # La extensión sale del contenido, no del nombre declarado
+    stored = store_upload(io.BytesIO(PNG), "foto.jpg", "image/jpeg", base_dir=str(tmp_path), max_bytes=200, allowed_types=allowed)
+    assert stored.url.endswith(".png") and stored.content_type == "image/png"
@@ -0,0 +1,107 @@
+"""
+Pruebas de las variantes redimensionadas de imágenes.
+"""
+
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+
+from productos.dto import ProductOut
+from productos.images import install_image_refcounts, register_image, store_upload
+from productos.variants import VARIANTS, VariantPool, generate_variants, sync_variant_readiness, variant_urls
+
+Image = pytest.importorskip("PIL.Image")
+
+SHA = "ab" + "0" * 62
+
+
+def test_genera_variantes_sin_agrandar(tmp_path):
+    source = tmp_path / "original.png"
+    Image.new("RGBA", (2000, 1000), (255, 0, 0, 128)).save(source)
+
+    written = generate_variants(str(source), SHA, str(tmp_path))
+
+    assert len(written) == len(VARIANTS) * 2
+    with Image.open(tmp_path / "ab" / f"{SHA}_thumb.webp") as thumb:
+        assert thumb.size == (160, 80)
+    with Image.open(tmp_path / "ab" / f"{SHA}_detail.jpg") as detail:
+        assert detail.size == (1200, 600) and detail.mode == "RGB"
+    assert not [name for name in os.listdir(tmp_path / "ab") if name.endswith(".tmp")]
+
+    small = tmp_path / "small.png"
+    Image.new("RGB", (100, 50)).save(small)
+    generate_variants(str(small), SHA, str(tmp_path))
+    with Image.open(tmp_path / "ab" / f"{SHA}_card.jpg") as card:
+        assert card.size == (100, 50)
+
+
+def test_product_out_solo_expone_variantes_generadas():
+    url = f"/static/uploads/ab/{SHA}.png"
+    product = dict(id=1, name="A", price=10.0, image_url=url)
+    assert ProductOut(**product).image_variants is None
+
+    dumped = ProductOut(**product, image_variants_ready=True).model_dump()
+    assert dumped["image_variants"] == variant_urls(SHA)
+    assert dumped["image_variants"]["thumb"]["webp"] == f"/static/uploads/ab/{SHA}_thumb.webp"
+    assert "image_variants_ready" not in dumped
+    assert ProductOut(id=2, name="B", price=1.0, image_url="https://example.com/x.jpg",
+                      image_variants_ready=True).image_variants is None
+
+
+@pytest.fixture()
+def engine(engine):
+    with engine.begin() as conn:
+        install_image_refcounts(conn)
+    return engine
+
+
+def ready(conn):
+    return dict(conn.execute(text("SELECT id, image_variants_ready FROM products ORDER BY id")).all())
+
+
+def test_pool_registra_variantes_en_la_base(engine, tmp_path):
+    source = tmp_path / "original.png"
+    Image.new("RGB", (800, 800)).save(source)
+    stored = store_upload(open(source, "rb"), "foto.png", "image/png", base_dir=str(tmp_path / "uploads"))
+    with engine.begin() as conn:
+        register_image(conn, stored)
+        conn.execute(text("INSERT INTO products (id, image_url) VALUES (1, :url)"), {"url": stored.url})
+        assert ready(conn) == {1: 0}
+
+    pool = VariantPool(max_workers=1, begin=engine.begin)
+    try:
+        pool.schedule(stored).result(timeout=30)
+        # El callback del future registra el resultado apenas después
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            with engine.connect() as conn:
+                if ready(conn) == {1: 1}:
+                    break
+            time.sleep(0.01)
+    finally:
+        pool.shutdown()
+
+    with engine.begin() as conn:
+        assert ready(conn) == {1: 1}
+        # Otro producto que toma la misma imagen la hereda por trigger, sin mirar el disco
+        conn.execute(text("INSERT INTO products (id, image_url) VALUES (2, :url), (3, '/otra.jpg')"), {"url": stored.url})
+        assert ready(conn) == {1: 1, 2: 1, 3: 0}
+        conn.execute(text("UPDATE products SET image_url = '/otra.jpg' WHERE id = 1"))
+        assert ready(conn) == {1: 0, 2: 1, 3: 0}
+
+
+def test_sincroniza_variantes_generadas_antes_de_la_columna(engine, tmp_path):
+    source = tmp_path / "original.png"
+    Image.new("RGB", (300, 300)).save(source)
+    uploads = tmp_path / "uploads"
+    stored = store_upload(open(source, "rb"), "foto.png", "image/png", base_dir=str(uploads))
+    generate_variants(stored.path, stored.sha256, str(uploads))
+    with engine.begin() as conn:
+        register_image(conn, stored)
+        conn.execute(text("INSERT INTO products (id, image_url) VALUES (1, :url)"), {"url": stored.url})
+
+        assert sync_variant_readiness(conn, str(uploads)) == 1
+        assert ready(conn) == {1: 1}
+        assert sync_variant_readiness(conn, str(uploads)) == 0
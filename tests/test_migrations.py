@@ -0,0 +1,90 @@
+"""
+Pruebas de las migraciones Alembic del catálogo, del carrito y de permisos sobre una base anterior.
+"""
+
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from cart_items.schema import check_cart_schema
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture()
+def old_db(tmp_path, monkeypatch):
+    """Base con `products` como la dejaba la app antes de las migraciones, en 76bfceeb7ef1"""
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR, description VARCHAR, "
+            "price FLOAT, image_url VARCHAR, discount FLOAT, category VARCHAR)"
+        ))
+        conn.execute(text(
+            "INSERT INTO products (id, name, price, discount, category) "
+            "VALUES (1, 'Remera', 100, 10, 'Remeras Hombre'), (2, 'Gorra', 20, NULL, NULL)"
+        ))
+        # Sin índice único: items repetidos de antes del upsert
+        conn.execute(text(
+            "CREATE TABLE cart_items (id INTEGER PRIMARY KEY, user_id INTEGER, product_id INTEGER, quantity INTEGER)"
+        ))
+        conn.execute(text(
+            "INSERT INTO cart_items (id, user_id, product_id, quantity) VALUES "
+            "(1, 1, 10, 2), (2, 1, 11, 1), (3, 1, 10, 4), (4, 1, 10, NULL)"
+        ))
+    monkeypatch.setenv("DATABASE_URL", url)
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    command.stamp(config, "76bfceeb7ef1")
+    yield engine, config
+    engine.dispose()
+
+
+def test_catalogo_se_completa_y_es_idempotente(old_db):
+    engine, config = old_db
+    command.upgrade(config, "2105dfef153e")
+    # Volver a correrla sobre una base que ya tiene todo no falla
+    command.stamp(config, "76bfceeb7ef1")
+    command.upgrade(config, "2105dfef153e")
+
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, category_key, effective_price FROM products ORDER BY id")).all()
+        assert [tuple(row) for row in rows] == [(1, "remeras-hombre", 90.0), (2, None, 20.0)]
+        assert conn.execute(text("SELECT rowid FROM products_fts WHERE products_fts MATCH 'remera'")).all() == [(1,)]
+
+        version = conn.execute(text("SELECT version FROM catalog_state")).scalar()
+        conn.execute(text("UPDATE products SET price = 50 WHERE id = 2"))
+        assert conn.execute(text("SELECT version FROM catalog_state")).scalar() > version
+    assert "ix_products_effective_price_id" in {index["name"] for index in inspect(engine).get_indexes("products")}
+
+    command.downgrade(config, "76bfceeb7ef1")
+    assert "category_key" not in {column["name"] for column in inspect(engine).get_columns("products")}
+    assert "catalog_state" not in inspect(engine).get_table_names()
+
+
+def test_carrito_une_repetidos_y_crea_el_indice_unico(old_db):
+    engine, config = old_db
+    command.upgrade(config, "head")
+
+    with engine.begin() as conn:
+        rows = conn.execute(text("SELECT id, product_id, quantity FROM cart_items ORDER BY id")).all()
+        assert [tuple(row) for row in rows] == [(1, 10, 7), (2, 11, 1)]
+    check_cart_schema(engine)
+
+    command.downgrade(config, "2105dfef153e")
+    with pytest.raises(RuntimeError):
+        check_cart_schema(engine)
+
+
+def test_version_de_permisos(old_db):
+    engine, config = old_db
+    command.upgrade(config, "head")
+    with engine.begin() as conn:
+        assert conn.execute(text("SELECT id, version FROM permission_state")).all() == [(1, 0)]
+
+    command.downgrade(config, "44d9fc48d016")
+    assert "permission_state" not in inspect(engine).get_table_names()
@@ -0,0 +1,90 @@
+"""
+Pruebas del pool acotado de bcrypt.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from middlewares.auth import hash_password
+from usuarios import password_pool as pool_module
+from usuarios.password_pool import PasswordHasherPool, PasswordPoolSaturated
+
+
+def test_hash_y_verify_en_el_pool():
+    pool = PasswordHasherPool(max_workers=1, max_queue=1)
+
+    async def run():
+        hashed = await pool.hash("secreto")
+        return await pool.verify("secreto", hashed), await pool.verify("otra", hashed)
+
+    try:
+        assert asyncio.run(run()) == (True, False)
+        stats = pool.stats()
+        assert stats["completed"] == 3
+        assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_rechaza_cuando_la_cola_esta_llena(monkeypatch):
+    release = threading.Event()
+
+    def slow_compare(password, hashed):
+        release.wait(5)
+        return True
+
+    monkeypatch.setattr(pool_module, "compare_password", slow_compare)
+    pool = PasswordHasherPool(max_workers=1, max_queue=1)
+    hashed = hash_password("x")
+
+    async def run():
+        running = [asyncio.create_task(pool.verify("x", hashed)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.stats()["queue_depth"] == 1
+        with pytest.raises(PasswordPoolSaturated):
+            await pool.verify("x", hashed)
+        release.set()
+        return await asyncio.gather(*running)
+
+    try:
+        assert asyncio.run(run()) == [True, True]
+        assert pool.stats()["rejected"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_cancelar_el_request_no_libera_el_lugar_del_trabajo(monkeypatch):
+    release = threading.Event()
+
+    def slow_compare(password, hashed):
+        release.wait(5)
+        return True
+
+    monkeypatch.setattr(pool_module, "compare_password", slow_compare)
+    pool = PasswordHasherPool(max_workers=1, max_queue=0)
+    hashed = hash_password("x")
+
+    async def run():
+        task = asyncio.create_task(pool.verify("x", hashed))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # bcrypt sigue corriendo en el worker: el lugar sigue ocupado
+        assert pool.stats()["in_flight"] == 1
+        with pytest.raises(PasswordPoolSaturated):
+            await pool.verify("x", hashed)
+        release.set()
+        for _ in range(100):
+            if pool.stats()["in_flight"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        return await pool.verify("x", hashed)
+
+    try:
+        assert asyncio.run(run()) is True
+        assert pool.stats()["completed"] == 2
+    finally:
+        release.set()
+        pool.shutdown()
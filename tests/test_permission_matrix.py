@@ -0,0 +1,107 @@
+"""
+Pruebas de la matriz de permisos en memoria.
+Usan una base SQLite en memoria para no tocar la base de desarrollo.
+"""
+
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config.basemodel import Base
+from config.associations import rol_permiso_association
+from permisos.model import Permiso, permission_state
+from roles.model import Rol
+from usuarios.model import Usuario  # noqa: F401 - registrar la tabla usuarios
+from permisos.matrix import PermissionMatrix
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(Rol(rol_id=1, rol_nombre="Administrador"))
+    db.add(Permiso(permiso_id=1, permiso_nombre="productos.ver", permiso_ruta="/productos/{id}", permiso_metodo="GET"))
+    db.add(Permiso(permiso_id=2, permiso_nombre="productos.borrar", permiso_ruta="/productos/{id}", permiso_metodo="DELETE", permiso_activo=False))
+    db.commit()
+    db.execute(insert(rol_permiso_association), [{"rol_id": 1, "permiso_id": 1}, {"rol_id": 1, "permiso_id": 2}])
+    db.commit()
+    db.close()
+    return factory
+
+
+def test_matriz_responde_sin_consultar_la_base(session_factory):
+    matrix = PermissionMatrix(session_factory)
+    matrix.load()
+    assert matrix.has_permission(1, "/productos/{id}", "get")
+    # Los permisos inactivos no se cargan
+    assert not matrix.has_permission(1, "/productos/{id}", "DELETE")
+    assert not matrix.has_permission(2, "/productos/{id}", "GET")
+
+
+def test_invalidate_recarga_en_la_proxima_consulta(session_factory):
+    matrix = PermissionMatrix(session_factory)
+    assert not matrix.has_permission(1, "/productos/{id}", "DELETE")
+
+    db = session_factory()
+    db.query(Permiso).filter(Permiso.permiso_id == 2).update({"permiso_activo": True})
+    db.commit()
+    db.close()
+
+    # Sin invalidar, la matriz sigue respondiendo con los datos cargados
+    assert not matrix.has_permission(1, "/productos/{id}", "DELETE")
+    matrix.invalidate()
+    assert not matrix.loaded
+    assert matrix.has_permission(1, "/productos/{id}", "DELETE")
+
+
+def _activar_borrado(session_factory):
+    db = session_factory()
+    db.query(Permiso).filter(Permiso.permiso_id == 2).update({"permiso_activo": True})
+    db.commit()
+    db.close()
+
+
+def test_invalidate_en_otro_proceso_recarga_por_la_version_de_la_base(session_factory):
+    # Dos matrices con la misma base hacen de dos workers
+    worker = PermissionMatrix(session_factory, check_seconds=0)
+    other = PermissionMatrix(session_factory, check_seconds=0)
+    assert not worker.has_permission(1, "/productos/{id}", "DELETE")
+
+    _activar_borrado(session_factory)
+    other.invalidate()
+
+    db = session_factory()
+    assert db.execute(select(permission_state.c.version)).scalar() == 1
+    db.close()
+    assert worker.has_permission(1, "/productos/{id}", "DELETE")
+
+
+def test_la_version_se_compara_cada_check_seconds(session_factory):
+    worker = PermissionMatrix(session_factory, check_seconds=3600)
+    assert not worker.has_permission(1, "/productos/{id}", "DELETE")
+
+    _activar_borrado(session_factory)
+    PermissionMatrix(session_factory).invalidate()
+    # Dentro del intervalo la copia sigue vigente
+    assert not worker.has_permission(1, "/productos/{id}", "DELETE")
+    worker._checked_at -= 3600
+    assert worker.has_permission(1, "/productos/{id}", "DELETE")
+
+
+def test_sin_tabla_de_version_recarga_en_cada_verificacion(session_factory):
+    db = session_factory()
+    db.execute(text("DROP TABLE permission_state"))
+    db.commit()
+    db.close()
+
+    worker = PermissionMatrix(session_factory, check_seconds=0)
+    assert not worker.has_permission(1, "/productos/{id}", "DELETE")
+    _activar_borrado(session_factory)
+    assert worker.has_permission(1, "/productos/{id}", "DELETE")
@@ -0,0 +1,164 @@
+"""
+Pruebas del principal por request: caché de usuarios (TTL, LRU, ausencias,
+invalidación) y rechazo de tokens cuyo usuario ya no existe.
+Usan una base SQLite en memoria para no tocar la base de desarrollo.
+"""
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import Request
+
+from config.auth import SECRET_KEY, ALGORITHM
+from config.basemodel import Base
+from config.associations import rol_permiso_association
+from permisos.model import Permiso
+from roles.model import Rol
+from usuarios.model import Usuario
+from permisos.matrix import PermissionMatrix
+from middlewares import principal as principal_module
+from middlewares.cart_auth import verify_token_and_permissions
+from middlewares.principal import UserCache, resolve_principal
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingFactory:
+    """Session factory que cuenta cuántas veces se consulta la base"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.factory()
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(Rol(rol_id=1, rol_nombre="Administrador"))
+    db.add(Rol(rol_id=2, rol_nombre="Comprador"))
+    db.add(Permiso(permiso_id=1, permiso_nombre="productos.borrar", permiso_ruta="/productos/{id}", permiso_metodo="DELETE"))
+    for usu_id, usuario, rol_id in ((1, "admin@x.com", 1), (2, "ana@x.com", 2), (3, "luis@x.com", 2)):
+        db.add(Usuario(usu_id=usu_id, usu_usuario=usuario, usu_contrasenia="x", usu_rol_id=rol_id, usu_nombre_completo=usuario))
+    db.commit()
+    db.execute(insert(rol_permiso_association), [{"rol_id": 1, "permiso_id": 1}])
+    db.commit()
+    db.close()
+    return factory
+
+
+@pytest.fixture()
+def wired(session_factory, monkeypatch):
+    """Caché y matriz del módulo apuntando a la base en memoria"""
+    cache = UserCache(ttl=60, session_factory=session_factory)
+    matrix = PermissionMatrix(session_factory)
+    monkeypatch.setattr(principal_module, "user_cache", cache)
+    monkeypatch.setattr(principal_module, "permission_matrix", matrix)
+    return cache, matrix
+
+
+def test_ttl_vence_y_vuelve_a_consultar(session_factory):
+    clock = FakeClock()
+    factory = CountingFactory(session_factory)
+    cache = UserCache(ttl=60, session_factory=factory, clock=clock)
+
+    assert cache.get(2) == (2, "ana@x.com", 2)
+    assert cache.get(2) == (2, "ana@x.com", 2)
+    assert factory.calls == 1
+    clock.now += 60
+    cache.get(2)
+    assert factory.calls == 2
+
+
+def test_lru_descarta_el_menos_usado(session_factory):
+    factory = CountingFactory(session_factory)
+    cache = UserCache(ttl=60, maxsize=2, session_factory=factory)
+
+    cache.get(1)
+    cache.get(2)
+    cache.get(1)  # 2 queda como el menos usado
+    cache.get(3)
+    assert factory.calls == 3
+    cache.get(1)
+    assert factory.calls == 3
+    cache.get(2)
+    assert factory.calls == 4
+
+
+def test_ausencia_se_cachea_hasta_el_ttl(session_factory):
+    clock = FakeClock()
+    factory = CountingFactory(session_factory)
+    cache = UserCache(ttl=60, session_factory=factory, clock=clock)
+
+    assert cache.get(99) is None
+    assert cache.get(99) is None
+    assert factory.calls == 1
+    # Búsqueda por nombre cuando el id no existe
+    assert cache.get(None, "luis@x.com") == (3, "luis@x.com", 2)
+
+
+def test_invalidar_tras_modificar_usuario_y_rol(session_factory, wired):
+    cache, matrix = wired
+    payload = {"sub": "ana@x.com", "user_id": 2}
+    principal = resolve_principal(payload)
+    assert (principal.rol_id, principal.is_admin) == (2, False)
+
+    db = session_factory()
+    db.query(Usuario).filter(Usuario.usu_id == 2).update({"usu_rol_id": 1})
+    db.commit()
+    db.close()
+
+    # Hasta invalidar (lo hacen update_usuario/delete_usuario) se usa la entrada cacheada
+    assert resolve_principal(payload).rol_id == 2
+    cache.invalidate(2)
+    principal = resolve_principal(payload)
+    assert principal.is_admin and principal.has_permission("productos.borrar")
+
+    # Cambios en permisos del rol: los servicios invalidan la matriz
+    db = session_factory()
+    db.query(Permiso).filter(Permiso.permiso_id == 1).update({"permiso_activo": False})
+    db.commit()
+    db.close()
+    matrix.invalidate()
+    assert not resolve_principal(payload).has_permission("productos.borrar")
+
+
+def test_token_de_usuario_borrado_responde_401(session_factory, wired):
+    cache, _ = wired
+    token = jwt.encode({"sub": "luis@x.com", "user_id": 3, "rol_id": 2}, SECRET_KEY, algorithm=ALGORITHM)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    def request():
+        return Request({"type": "http", "method": "GET", "path": "/cart_items/me", "headers": []})
+
+    assert verify_token_and_permissions(request(), credentials)["user_id"] == 3
+
+    db = session_factory()
+    db.query(Usuario).filter(Usuario.usu_id == 3).delete()
+    db.commit()
+    db.close()
+    cache.invalidate(3)
+
+    with pytest.raises(HTTPException) as error:
+        verify_token_and_permissions(request(), credentials)
+    assert error.value.status_code == 401
@@ -0,0 +1,52 @@
+"""
+Pruebas de la exportación del catálogo en streaming.
+"""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from productos.exporter import export_stream, install_change_tracking, iter_batches
+
+
+@pytest.fixture()
+def engine(engine):
+    with engine.begin() as conn:
+        install_change_tracking(conn)
+        conn.execute(text("INSERT INTO products (id, name, price, discount, category) VALUES (:id, :name, 100, 10, 'Hombre')"),
+                     [{"id": i, "name": f"Producto {i}"} for i in range(1, 8)])
+    return engine
+
+
+def test_lotes_por_ventana_y_formatos(engine):
+    batches = list(iter_batches(engine.connect, batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+    lines = b"".join(export_stream(iter_batches(engine.connect, batch_size=3), "ndjson")).splitlines()
+    first = json.loads(lines[0])
+    assert len(lines) == 7 and first["effective_price"] == 90.0
+    assert first["updated_at"].endswith("Z") and "T" in first["updated_at"]
+
+    body = gzip.decompress(b"".join(export_stream(iter_batches(engine.connect, batch_size=2), "csv", compress=True)))
+    rows = list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+    assert len(rows) == 7 and rows[6]["name"] == "Producto 7" and rows[0]["description"] == ""
+
+
+def test_since_usa_updated_at_mantenido_por_triggers(engine):
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE products SET updated_at = '2020-01-01 00:00:00.000'"))
+        conn.execute(text("UPDATE products SET price = 50 WHERE id = 4"))
+
+    since = datetime.now(timezone.utc) - timedelta(minutes=1)
+    changed = [row["id"] for batch in iter_batches(engine.connect, since=since) for row in batch]
+    assert changed == [4]
+
+    empty = b"".join(export_stream(iter_batches(engine.connect, since=datetime(2099, 1, 1)), "csv"))
+    assert empty.decode().splitlines() == [
+        "id,name,description,price,discount,effective_price,category,image_url,updated_at"
+    ]
@@ -0,0 +1,48 @@
+"""
+Pruebas de la clave de categoría y de los conteos de facetas.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from productos.facets import install_facets, normalize_category, read_facets, rebuild_facets
+
+
+INSERT = "INSERT INTO products (id, name, price, discount, category, category_key) VALUES "
+
+
+@pytest.fixture()
+def conn(conn):
+    conn.execute(text(INSERT + "(1, 'A', 30, 0, 'Hombre', 'hombre')"))
+    install_facets(conn)
+    return conn
+
+
+def counts(facets, name):
+    return {bucket["value"]: bucket["count"] for bucket in facets[name] if bucket["count"]}
+
+
+def test_normalize_category():
+    assert normalize_category("  Remeras Hombre ") == "remeras-hombre"
+    assert normalize_category("Niños_Calzado") == "ninos-calzado"
+    assert normalize_category("   ") is None
+    assert normalize_category(None) is None
+
+
+def test_conteos_se_actualizan_con_cada_escritura(conn):
+    conn.execute(text(INSERT + "(2, 'B', 120, 30, 'Mujer', 'mujer')"))
+    conn.execute(text(INSERT + "(3, 'C', 600, NULL, 'Mujer', 'mujer')"))
+    facets = read_facets(conn)
+    assert facets["categories"] == [{"value": "mujer", "count": 2}, {"value": "hombre", "count": 1}]
+    assert counts(facets, "price") == {"25-50": 1, "100-200": 1, "500+": 1}
+    assert counts(facets, "discount") == {"0-10": 2, "25-50": 1}
+
+    conn.execute(text("UPDATE products SET category_key = 'hombre', price = 10 WHERE id = 3"))
+    conn.execute(text("DELETE FROM products WHERE id = 2"))
+    facets = read_facets(conn)
+    assert facets["categories"] == [{"value": "hombre", "count": 2}]
+    assert counts(facets, "price") == {"0-25": 1, "25-50": 1}
+
+    # Los triggers y un recálculo completo dan lo mismo
+    rebuild_facets(conn)
+    assert read_facets(conn) == facets
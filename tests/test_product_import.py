@@ -0,0 +1,88 @@
+"""
+Pruebas de la importación de productos en streaming.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from productos.importer import (
+    FORMAT_CSV, FORMAT_NDJSON, import_products, import_supported, upsert_params, upsert_statement, validate_record,
+)
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def run_import(data: bytes, fmt: str, batch_size: int = 2):
+    batches = []
+
+    def flush(rows):
+        batches.append(rows)
+        # Simula un error de base de datos en una fila puntual
+        return [(row, "duplicado") for row, item in rows if item["name"] == "Falla"]
+
+    report = asyncio.run(import_products(chunked(data, 7), fmt, flush, batch_size=batch_size))
+    return report, batches
+
+
+def test_csv_en_chunks_con_campos_multilinea_y_errores_por_fila():
+    data = (
+        "﻿name,description,price,discount,category\r\n"
+        "Zapatilla Ñandú,\"Cómoda,\nliviana\",100,10,Hombre\r\n"
+        "Sin precio,,,0,\r\n"
+        "Falla,,50,,\r\n"
+        "Ojota,,20,,Mujer\r\n"
+    ).encode("utf-8")
+
+    report, batches = run_import(data, FORMAT_CSV)
+
+    assert report["processed"] == 4
+    assert report["upserted"] == 2
+    assert report["batches"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert "price" in report["errors"][0]["error"]
+    first = batches[0][0][1]
+    assert first["name"] == "Zapatilla Ñandú"
+    assert first["description"] == "Cómoda,\nliviana"
+    assert first["discount"] == 10.0
+
+
+def test_ndjson_informa_lineas_invalidas():
+    data = b'{"name": "A", "price": 10}\n\nno-json\n[1]\n{"id": 5, "name": "B", "price": 3}'
+
+    report, batches = run_import(data, FORMAT_NDJSON, batch_size=10)
+
+    assert report["upserted"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 3]
+    assert batches[0][1][1]["id"] == 5
+
+
+def test_actualizar_sin_descuento_no_lo_resetea(conn):
+    statement = upsert_statement("sqlite")
+
+    rows = [
+        validate_record({"id": "1", "name": "Nike", "price": "100", "discount": "25", "category": "Hombre"})[0],
+        validate_record({"id": "2", "name": "Adidas", "price": "80"})[0],
+    ]
+    conn.execute(statement, [upsert_params(row) for row in rows])
+    # Actualización sin discount ni category: se conservan
+    update = validate_record({"id": "1", "name": "Nike", "price": "120"})[0]
+    conn.execute(statement, [upsert_params(update)])
+
+    saved = conn.execute(text("SELECT id, price, discount, category_key FROM products ORDER BY id")).all()
+    assert [tuple(row) for row in saved] == [(1, 120.0, 25.0, "hombre"), (2, 80.0, 0.0, None)]
+
+    # Un descuento explícito sí se aplica, también 0
+    conn.execute(statement, [upsert_params(validate_record({"id": "1", "name": "Nike", "price": "120", "discount": "0"})[0])])
+    assert conn.execute(text("SELECT discount FROM products WHERE id = 1")).scalar() == 0.0
+
+
+def test_motores_sin_upsert_se_informan_antes_de_importar():
+    assert import_supported("sqlite") and import_supported("postgresql")
+    assert not import_supported("mysql")
+    with pytest.raises(NotImplementedError):
+        upsert_statement("mysql")
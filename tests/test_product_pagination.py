@@ -0,0 +1,76 @@
+"""
+Pruebas de la paginación keyset del listado de productos.
+"""
+
+import pytest
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, select
+
+from productos.pagination import (
+    Cursor, InvalidCursor, decode_cursor, encode_cursor, keyset_condition, prefix_range,
+)
+
+metadata = MetaData()
+items = Table(
+    "items", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("price", Float),
+)
+
+ROWS = [
+    {"id": 1, "name": "Air Max", "price": 100.0},
+    {"id": 2, "name": "Air Force", "price": None},
+    {"id": 3, "name": "Blazer", "price": 50.0},
+    {"id": 4, "name": "Cortez", "price": 100.0},
+    {"id": 5, "name": "Dunk", "price": None},
+    {"id": 6, "name": "Air Jordan", "price": 75.0},
+]
+
+
+@pytest.fixture()
+def conn():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(items.insert(), ROWS)
+        yield connection
+
+
+def walk(conn, column, descending, page_size=2):
+    """Recorrer todas las páginas y devolver los ids en orden"""
+    ordering = [column.desc(), items.c.id.desc()] if descending else [column.asc(), items.c.id.asc()]
+    seen, position = [], None
+    while True:
+        query = select(items).order_by(*ordering).limit(page_size)
+        if position is not None:
+            query = query.where(keyset_condition(column, items.c.id, position[0], position[1], descending))
+        page = conn.execute(query).all()
+        if not page:
+            return seen
+        seen.extend(row.id for row in page)
+        position = (getattr(page[-1], column.key), page[-1].id)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_keyset_recorre_igual_que_un_order_by_completo(conn, descending):
+    column = items.c.price
+    ordering = [column.desc(), items.c.id.desc()] if descending else [column.asc(), items.c.id.asc()]
+    expected = [row.id for row in conn.execute(select(items).order_by(*ordering))]
+
+    assert walk(conn, column, descending) == expected
+
+
+def test_filtro_por_prefijo_de_nombre(conn):
+    rows = conn.execute(select(items.c.id).where(prefix_range(items.c.name, "Air")).order_by(items.c.id)).all()
+    assert [row.id for row in rows] == [1, 2, 6]
+
+
+def test_cursor_es_opaco_y_valida_el_orden():
+    token = encode_cursor(Cursor("price", "desc", 99.5, 7))
+
+    assert "price" not in token
+    assert decode_cursor(token, "price", "desc") == Cursor("price", "desc", 99.5, 7)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, "name", "desc")
+    with pytest.raises(InvalidCursor):
+        decode_cursor("no-es-un-cursor", "price", "desc")
@@ -0,0 +1,55 @@
+"""
+Pruebas de la búsqueda FTS5 de productos.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from productos.search import build_match_query, install_fts, render_highlight, search_rows
+
+
+@pytest.fixture()
+def conn(conn):
+    # Fila previa a la instalación: debe quedar indexada por el rebuild
+    conn.execute(text(
+        "INSERT INTO products (id, name, description, price, discount, category) "
+        "VALUES (1, 'Zapatilla Running', 'Liviana para correr', 100, 0, 'hombre')"
+    ))
+    install_fts(conn)
+    return conn
+
+
+def ids(conn, query):
+    return [row["id"] for row in search_rows(conn, query, limit=10)]
+
+
+def test_match_query_escapa_operadores():
+    assert build_match_query('zapa nik') == '"zapa"* "nik"*'
+    assert build_match_query('OR "NEAR(') == '"OR"* "NEAR"*'
+    assert build_match_query('  ***  ') == ""
+
+
+def test_triggers_mantienen_el_indice_sincronizado(conn):
+    conn.execute(text(
+        "INSERT INTO products (id, name, description, price, discount, category) "
+        "VALUES (2, 'Botín Fútbol', 'Con tapones para correr en césped', 80, 0, 'hombre')"
+    ))
+    assert ids(conn, "running") == [1]
+    assert ids(conn, "futbol") == [2]
+    assert sorted(ids(conn, "corr")) == [1, 2]
+
+    conn.execute(text("UPDATE products SET name = 'Sandalia' WHERE id = 1"))
+    assert ids(conn, "running") == []
+    assert ids(conn, "sandalia") == [1]
+
+    conn.execute(text("DELETE FROM products WHERE id = 2"))
+    assert ids(conn, "futbol") == []
+
+
+def test_resaltado_escapa_html(conn):
+    conn.execute(text(
+        "INSERT INTO products (id, name, description, price, discount, category) "
+        "VALUES (3, '<b>Ojotas</b>', NULL, 10, 0, NULL)"
+    ))
+    row = search_rows(conn, "ojotas", limit=1)[0]
+    assert render_highlight(row["name_highlight"]) == "&lt;b&gt;<mark>Ojotas</mark>&lt;/b&gt;"
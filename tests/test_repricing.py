@@ -0,0 +1,55 @@
+"""
+Pruebas del motor de recálculo de precios.
+"""
+
+import pytest
+
+from productos.dto import RepricingRule
+from productos.repricing import CatalogColumns, compute_repricing, round_to_ending, rule_selectors
+
+CATALOG = CatalogColumns(
+    ids=[1, 2, 3, 4],
+    prices=[100.0, 12.3, 50.0, 80.0],
+    discounts=[0.0, 5.0, 0.0, 10.0],
+    category_keys=["hombre", "hombre", "mujer", None],
+)
+
+
+def test_round_to_ending():
+    assert round_to_ending(12.30, 0.99) == 12.99
+    assert round_to_ending(12.99, 0.99) == 12.99
+    assert round_to_ending(13.00, 0.99) == 13.99
+
+
+def test_reglas_se_aplican_en_orden_y_el_diff_solo_trae_cambios():
+    rules = [
+        RepricingRule(multiply_price=1.08, round_to=0.99),
+        RepricingRule(category="Hombre", set_discount=15),
+        RepricingRule(ids=[3], set_price=45.5),
+    ]
+
+    changes = {change.id: change for change in compute_repricing(CATALOG, rules)}
+
+    assert changes[1].new_price == 108.99 and changes[1].new_discount == 15
+    assert changes[2].new_price == 13.99 and changes[2].old_discount == 5.0
+    assert changes[3].new_price == 45.5 and changes[3].new_discount == 0.0
+    assert changes[4].new_price == 86.99 and changes[4].new_discount == 10.0
+
+
+def test_descuento_solo_no_toca_precios():
+    changes = compute_repricing(CATALOG, [RepricingRule(ids=[4], set_discount=10)])
+    assert changes == []
+
+
+def test_precios_invalidos_y_reglas_sin_accion():
+    with pytest.raises(ValueError):
+        compute_repricing(CATALOG, [RepricingRule(add_price=-60)])
+    with pytest.raises(ValueError):
+        RepricingRule(category="hombre")
+
+
+def test_selectores_para_cargar_solo_lo_necesario():
+    assert rule_selectors([RepricingRule(category="Niños", set_discount=5), RepricingRule(ids=[7], set_price=1)]) == {
+        "categories": {"ninos"}, "ids": {7},
+    }
+    assert rule_selectors([RepricingRule(multiply_price=1.1)]) is None
@@ -0,0 +1,63 @@
+"""
+Pruebas de la tabla de reglas por plantilla de ruta del AuthMiddleware.
+"""
+
+from fastapi import FastAPI
+
+from middlewares.auth import RouteTable, ACCESS_PUBLIC, ACCESS_AUTHENTICATED, ACCESS_PERMISSION
+
+
+def build_table():
+    app = FastAPI()
+
+    @app.get("/productos/{product_id}")
+    def get_product(product_id: int):
+        return {}
+
+    @app.delete("/productos/{product_id}")
+    def delete_product(product_id: int):
+        return {}
+
+    @app.get("/usuarios/me")
+    def me():
+        return {}
+
+    @app.delete("/usuarios/{usu_id}")
+    def delete_usuario(usu_id: int):
+        return {}
+
+    @app.delete("/usuarios/todos")
+    def delete_todos():
+        return {}
+
+    @app.get("/permisos/ruta/{ruta}/metodo/{metodo}")
+    def by_ruta(ruta: str, metodo: str):
+        return {}
+
+    return RouteTable().build(app.routes)
+
+
+def test_clasificacion_por_plantilla():
+    table = build_table()
+    assert table.resolve("/productos/5", "GET").access == ACCESS_PUBLIC
+    assert table.resolve("/usuarios/me", "GET").access == ACCESS_AUTHENTICATED
+    rule = table.resolve("/productos/5", "DELETE")
+    assert rule.access == ACCESS_PERMISSION
+    assert rule.permission_path == "/productos/{id}"
+
+
+def test_parametros_no_enteros_conservan_su_nombre():
+    rule = build_table().resolve("/permisos/ruta/x/metodo/GET", "GET")
+    assert rule.permission_path == "/permisos/ruta/{ruta}/metodo/{metodo}"
+
+
+def test_respeta_el_orden_de_declaracion_del_router():
+    # /usuarios/{usu_id} se declaró antes, así que el router lo atiende primero
+    rule = build_table().resolve("/usuarios/todos", "DELETE")
+    assert rule.template == "/usuarios/{usu_id}"
+
+
+def test_rutas_desconocidas_no_tienen_regla():
+    table = build_table()
+    assert table.resolve("/inexistente/3", "GET") is None
+    assert table.resolve("/usuarios/me", "POST") is None
@@ -0,0 +1,85 @@
+"""
+Pruebas del servido de /static (caché inmutable y variantes precomprimidas).
+"""
+
+import gzip
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from middlewares.static_files import CachedStaticFiles, accepted_encodings, is_hashed_name, precompress_tree
+
+SHA = "ab" + "0" * 62
+CSS = b"body { color: red; }\n" * 200
+
+
+def make_client(root):
+    app = FastAPI()
+    app.mount("/static", CachedStaticFiles(directory=str(root)), name="static")
+    return TestClient(app)
+
+
+def test_nombres_con_hash_y_accept_encoding():
+    assert is_hashed_name(f"uploads/ab/{SHA}.jpg")
+    assert is_hashed_name(f"uploads/ab/{SHA}_thumb.webp")
+    assert is_hashed_name("assets/app.3f2a9c1b7d4e5f60.js")
+    assert not is_hashed_name("css/site.css")
+    # Fechas, números y hashes cortos no alcanzan: el archivo puede cambiar
+    assert not is_hashed_name("uploads/promo-20251018.jpg")
+    assert not is_hashed_name("uploads/foto-2025101812345678.jpg")
+    assert not is_hashed_name("assets/app.3f2a9c1b.js")
+    assert not is_hashed_name(f"uploads/ab/{SHA[:63]}.jpg")
+    assert not is_hashed_name(f"uploads/ab/{SHA}.jpg.bak.txt")
+    assert accepted_encodings("gzip, br;q=0, *;q=0.1") == {"gzip": 1.0, "*": 0.1}
+
+
+def test_precomprimidos_cache_y_range(tmp_path):
+    (tmp_path / "site.css").write_bytes(CSS)
+    (tmp_path / f"{SHA}.png").write_bytes(b"\x89PNG" + b"\x00" * 100)
+
+    written, saved = precompress_tree(str(tmp_path))
+    assert written >= 1 and saved > 0
+    assert gzip.decompress((tmp_path / "site.css.gz").read_bytes()) == CSS
+    assert not os.path.exists(tmp_path / f"{SHA}.png.gz")
+    # Incremental: una segunda pasada no reescribe nada
+    assert precompress_tree(str(tmp_path))[0] == 0
+
+    client = make_client(tmp_path)
+    response = client.get("/static/site.css", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == "public, no-cache"
+    assert response.content == CSS
+
+    identity = client.get("/static/site.css", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers and identity.content == CSS
+
+    ranged = client.get("/static/site.css", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-3"})
+    assert ranged.status_code == 206 and ranged.content == CSS[:4]
+    assert "content-encoding" not in ranged.headers
+
+    image = client.get(f"/static/{SHA}.png")
+    assert image.headers["cache-control"] == "public, max-age=31536000, immutable"
+    again = client.get(f"/static/{SHA}.png", headers={"If-Modified-Since": image.headers["last-modified"]})
+    assert again.status_code == 304
+
+
+def test_incompresibles_quedan_marcados(tmp_path, monkeypatch):
+    from middlewares import static_files
+
+    data = os.urandom(4096)
+    (tmp_path / "data.json").write_bytes(data)
+    assert precompress_tree(str(tmp_path)) == (0, 0)
+    assert (tmp_path / "data.json.gz").stat().st_size == 0
+
+    # La segunda pasada no vuelve a comprimir lo que ya se descartó
+    calls = []
+    monkeypatch.setattr(static_files, "_compressors", lambda: iter([(".gz", lambda *a: calls.append(a))]))
+    assert precompress_tree(str(tmp_path)) == (0, 0)
+    assert calls == []
+
+    response = make_client(tmp_path).get("/static/data.json", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+    assert response.content == data
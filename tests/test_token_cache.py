@@ -0,0 +1,60 @@
+"""
+Pruebas de la caché LRU de tokens JWT verificados.
+"""
+
+import jwt
+import pytest
+
+from config.auth import SECRET_KEY, ALGORITHM
+from middlewares.auth import decode_jwt, token_cache
+from middlewares.token_cache import VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entrada_vence_en_exp_del_token():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(maxsize=10, clock=clock)
+    cache.put("token-a", {"user_id": 1, "exp": 1010})
+
+    assert cache.get("token-a") == {"user_id": 1, "exp": 1010}
+    clock.now = 1010
+    assert cache.get("token-a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 0, "maxsize": 10}
+
+
+def test_lru_descarta_la_entrada_menos_usada():
+    cache = VerifiedTokenCache(maxsize=2, clock=FakeClock())
+    cache.put("a", {"exp": 2000})
+    cache.put("b", {"exp": 2000})
+    cache.get("a")
+    cache.put("c", {"exp": 2000})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_decode_jwt_reutiliza_la_verificacion():
+    token_cache.clear()
+    token = jwt.encode({"user_id": 7, "exp": 4102444800}, SECRET_KEY, algorithm=ALGORITHM)
+
+    assert decode_jwt(token)["user_id"] == 7
+    assert decode_jwt(token)["user_id"] == 7
+    assert token_cache.stats()["hits"] == 1
+
+
+def test_decode_jwt_no_cachea_tokens_invalidos():
+    token_cache.clear()
+    token = jwt.encode({"user_id": 7}, "otra-clave", algorithm=ALGORITHM)
+
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidTokenError):
+            decode_jwt(token)
+    assert token_cache.stats()["size"] == 0
@@ -0,0 +1,105 @@
+"""
+Pruebas del GC de uploads huérfanos.
+"""
+
+import ast
+import os
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from productos.images import install_image_refcounts
+from productos.upload_gc import collect_orphans
+
+LIVE = "a1" + "0" * 62
+DEAD = "b2" + "0" * 62
+OLD = time.time() - 10 * 86400
+
+
+def write(root, relative, size=10, mtime=OLD):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture()
+def conn(conn):
+    install_image_refcounts(conn)
+    conn.execute(text("INSERT INTO products (id, image_url) VALUES (1, :a), (2, :b), (3, NULL)"), {
+        "a": f"/static/uploads/a1/{LIVE}.jpg",
+        "b": "http://localhost:8000/static/uploads/legacy_vivo.png",
+    })
+    return conn
+
+
+def test_libera_solo_huerfanos_viejos(conn, tmp_path):
+    uploads, quarantine = tmp_path / "uploads", tmp_path / "quarantine"
+    write(uploads, f"a1/{LIVE}.jpg")
+    write(uploads, f"a1/{LIVE}_thumb.webp")
+    write(uploads, "legacy_vivo.png")
+    write(uploads, f"b2/{DEAD}.jpg", size=100)
+    write(uploads, f"b2/{DEAD}_card.jpg", size=50)
+    write(uploads, "legacy_muerto.png", size=7)
+    write(uploads, "recien_subido.png", mtime=time.time())
+
+    preview = collect_orphans(conn, str(uploads), grace_seconds=86400, quarantine_dir=str(quarantine), dry_run=True)
+    assert preview.orphans == 3 and preview.bytes_reclaimed == 157 and preview.removed == 0
+    assert not quarantine.exists()
+
+    report = collect_orphans(conn, str(uploads), grace_seconds=86400, quarantine_dir=str(quarantine))
+    assert report.to_dict() == {
+        "mode": "quarantine", "dry_run": False, "scanned": 7, "live": 3, "recent": 1,
+        "orphans": 3, "removed": 3, "bytes_reclaimed": 157, "errors": 0,
+    }
+    assert (quarantine / "b2" / f"{DEAD}.jpg").exists()
+    assert sorted(p.name for p in uploads.rglob("*") if p.is_file()) == sorted(
+        [f"{LIVE}.jpg", f"{LIVE}_thumb.webp", "legacy_vivo.png", "recien_subido.png"]
+    )
+
+    deleted = collect_orphans(conn, str(uploads), grace_seconds=0, mode="delete")
+    assert deleted.removed == 1 and not (uploads / "recien_subido.png").exists()
+    assert not list(quarantine.glob("recien_subido.png"))
+
+
+def test_imagen_liberada_hace_poco_sigue_viva(conn, tmp_path):
+    write(tmp_path, f"b2/{DEAD}.jpg")
+    conn.execute(text(
+        "INSERT INTO stored_images (sha256, url, size, refcount, released_at) VALUES (:sha, :url, 10, 0, CURRENT_TIMESTAMP)"
+    ), {"sha": DEAD, "url": f"/static/uploads/b2/{DEAD}.jpg"})
+
+    assert collect_orphans(conn, str(tmp_path), grace_seconds=3600, mode="delete").removed == 0
+    with pytest.raises(ValueError):
+        collect_orphans(conn, str(tmp_path), mode="quarantine")
+
+
+def seed_image_urls():
+    """image_url de los productos del seeder, leídos del archivo sin importar el modelo"""
+    source = Path(__file__).resolve().parent.parent / "seeders" / "seed_productos.py"
+    urls = set()
+    for node in ast.walk(ast.parse(source.read_text(encoding="utf-8"))):
+        if isinstance(node, ast.Dict):
+            for key, value in zip(node.keys, node.values):
+                if isinstance(key, ast.Constant) and key.value == "image_url" and isinstance(value, ast.Constant):
+                    urls.add(value.value)
+    return urls
+
+
+def test_datos_del_seeder_conservan_uploads_viejos(conn, tmp_path):
+    urls = seed_image_urls()
+    assert "/buzo.jpeg" in urls
+    conn.execute(text("DELETE FROM products"))
+    conn.execute(text("INSERT INTO products (image_url) VALUES (:url)"), [{"url": url} for url in sorted(urls)])
+
+    uploads = tmp_path / "uploads"
+    real_uploads = Path(__file__).resolve().parent.parent / "static" / "uploads"
+    for entry in real_uploads.iterdir():
+        if entry.is_file():
+            write(uploads, entry.name)
+    write(uploads, "sin_usar.jpeg")
+
+    collect_orphans(conn, str(uploads), grace_seconds=0, mode="delete")
+    assert (uploads / "buzo.jpeg").exists()
+    assert not (uploads / "sin_usar.jpeg").exists()
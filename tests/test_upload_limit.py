@@ -0,0 +1,49 @@
+"""
+Pruebas del límite de tamaño de uploads multipart.
+"""
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from middlewares.upload_limit import UploadLimitMiddleware
+
+
+def build_client(limit: int) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    def upload(file: UploadFile = File(...)):
+        return {"size": len(file.file.read())}
+
+    app.add_middleware(UploadLimitMiddleware, max_body_bytes=limit)
+    return TestClient(app)
+
+
+def test_permite_uploads_dentro_del_limite():
+    client = build_client(1024)
+    response = client.post("/upload", files={"file": ("a.png", b"x" * 100, "image/png")})
+    assert response.json() == {"size": 100}
+
+
+def test_rechaza_por_content_length_sin_leer_el_cuerpo():
+    client = build_client(1024)
+    response = client.post("/upload", files={"file": ("a.png", b"x" * 4096, "image/png")})
+    assert response.status_code == 413
+
+
+def test_rechaza_cuerpos_chunked_mientras_llegan():
+    client = build_client(1024)
+    boundary = "limite"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n"
+        f"Content-Type: image/png\r\n\r\n"
+    ).encode() + b"x" * 4096 + f"\r\n--{boundary}--\r\n".encode()
+
+    def chunks():
+        for start in range(0, len(body), 512):
+            yield body[start:start + 512]
+
+    response = client.post(
+        "/upload", content=chunks(), headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+    assert response.status_code == 413
@@ -0,0 +1,105 @@
+"""
+Pool acotado para hashear y verificar contraseñas con bcrypt fuera del event loop.
+
+bcrypt libera el GIL mientras calcula, así que por defecto se usan hilos;
+con PASSWORD_POOL_PROCESSES=true se usa un pool de procesos. Cuando hay más
+trabajos pendientes que workers + cola, se rechaza enseguida con
+PasswordPoolSaturated para que el endpoint devuelva 503 en lugar de dejar
+esperando a todos los demás requests.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from config.auth import PASSWORD_POOL_WORKERS, PASSWORD_POOL_QUEUE, PASSWORD_POOL_PROCESSES
+from middlewares.auth import hash_password, compare_password
+
+
+class PasswordPoolSaturated(Exception):
+    """El pool de contraseñas no admite más trabajos en este momento"""
+
+
+class PasswordHasherPool:
+    """Ejecutor de bcrypt con límite de concurrencia y métricas"""
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 16, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordPoolSaturated("Pool de contraseñas saturado")
+            self._pending += 1
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # El trabajo se cuenta como pendiente hasta que termina en el executor,
+        # aunque el request que lo esperaba se haya cancelado
+        future.add_done_callback(lambda _: self._finish(start))
+        return await asyncio.wrap_future(future)
+
+    def _finish(self, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            self._total_latency += elapsed
+            self._max_latency = max(self._max_latency, elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(compare_password, password, hashed_password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "in_flight": min(self._pending, self.max_workers),
+                "queue_depth": max(0, self._pending - self.max_workers),
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_latency_ms": round(self._total_latency / self.completed * 1000, 2) if self.completed else 0.0,
+                "max_latency_ms": round(self._max_latency * 1000, 2),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordHasherPool(
+    max_workers=PASSWORD_POOL_WORKERS,
+    max_queue=PASSWORD_POOL_QUEUE,
+    use_processes=PASSWORD_POOL_PROCESSES,
+)
@@ -4,24 +4,36 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from .dto import UsuarioCreate, UsuarioOut, UsuarioUpdate, LoginResponse, LoginRequest
+from .password_pool import PasswordPoolSaturated
+from config.fast_json import FastJSON
 from .services import (
     get_all_usuarios,
     get_usuario_by_id,
-    create_usuario,
+    create_usuario_async,
     update_usuario,
     delete_usuario,
-    login,
+    login_async,
     decode_token,
     create_access_token,
     create_refresh_token,
 )
 
 usuarios = APIRouter()
+fast_json = FastJSON("usuarios")
 
 # Bearer scheme para el token JWT
 bearer_scheme = HTTPBearer()
 
 
+def password_pool_busy() -> HTTPException:
+    """503 rápido cuando el pool de bcrypt está saturado"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servicio ocupado, intente nuevamente en unos segundos",
+        headers={"Retry-After": "1"}
+    )
+
+
 # Endpoint para eliminar la tabla de usuarios (debe ir después de definir 'usuarios')
 @usuarios.delete("/drop-table")
 def eliminar_tabla_usuarios():
@@ -40,7 +52,7 @@ def listar_usuarios():
         users = get_all_usuarios()
         if not users:
             return []
-        return users
+        return fast_json.respond(List[UsuarioOut], users)
     except SQLAlchemyError:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -97,7 +109,7 @@ async def crear_usuario(request: Request):
         }
         from .dto import UsuarioCreate
         usuario_obj = UsuarioCreate(**usuario_data)
-        nuevo_usuario = create_usuario(usuario_obj)
+        nuevo_usuario = await create_usuario_async(usuario_obj)
         access_token = create_access_token({
             "sub": nuevo_usuario.usu_usuario,
             "rol_id": nuevo_usuario.usu_rol_id,
@@ -116,6 +128,8 @@ async def crear_usuario(request: Request):
             "user_id": nuevo_usuario.usu_id,
             "username": nuevo_usuario.usu_usuario
         }
+    except PasswordPoolSaturated:
+        raise password_pool_busy()
     except IntegrityError:
         raise HTTPException(
             status_code=409,
@@ -143,9 +157,12 @@ def eliminar_usuario(usu_id: int):
 
 
 @usuarios.post("/login", response_model=LoginResponse)
-def login_usuario(login_data: LoginRequest):
+async def login_usuario(login_data: LoginRequest):
     """Iniciar sesión con usuario y contraseña. Devuelve un JWT junto con el user_id y username."""
-    return login(login_data.username, login_data.password)
+    try:
+        return await login_async(login_data.username, login_data.password)
+    except PasswordPoolSaturated:
+        raise password_pool_busy()
 
 
 @usuarios.post("/refresh")
@@ -2,17 +2,23 @@
 def drop_usuarios_table():
     from config.cnx import engine
     from .model import Usuario
+    from middlewares.principal import user_cache
     Usuario.__table__.drop(engine)
+    user_cache.clear()
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 import jwt
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 import os
 from dotenv import load_dotenv
 
 from config.cnx import SessionLocal
 from .model import Usuario
 from .dto import UsuarioCreate, UsuarioUpdate
+from middlewares.principal import user_cache
+from .password_pool import password_pool
 
 # Preferir las constantes centrales de config/auth.py para evitar divergencias
 from config.auth import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
@@ -105,16 +111,18 @@ def get_usuario_by_id(usu_id: int):
             db.close()
 
 
-def create_usuario(usuario: UsuarioCreate):
+def create_usuario(usuario: UsuarioCreate, hashed_password: Optional[str] = None):
     db = None
     try:
         from middlewares.auth import hash_password
         db = SessionLocal()
-        
+        if hashed_password is None:
+            hashed_password = hash_password(usuario.usu_contrasenia)
+
         # Asignar siempre el rol de comprador (rol_id=2)
         nuevo_usuario = Usuario(
             usu_usuario=usuario.usu_usuario,
-            usu_contrasenia=hash_password(usuario.usu_contrasenia),
+            usu_contrasenia=hashed_password,
             usu_rol_id=2,
             usu_nombre_completo=usuario.usu_nombre_completo,
             birthdate=usuario.birthdate,
@@ -151,6 +159,7 @@ def update_usuario(usu_id: int, update_data: UsuarioUpdate):
 
         db.commit()
         db.refresh(usuario)
+        user_cache.invalidate(usu_id)
         return usuario
     except Exception as e:
         if db:
@@ -170,6 +179,7 @@ def delete_usuario(usu_id: int):
             raise ValueError(f"Usuario con ID {usu_id} no encontrado")
         db.delete(usuario)
         db.commit()
+        user_cache.invalidate(usu_id)
         return True
     except Exception as e:
         if db:
@@ -194,32 +204,62 @@ def authenticate_user(username: str, password: str):
             db.close()
 
 
-def login(username: str, password: str):
+def get_login_candidate(username: str):
+    """Obtener los datos necesarios para el login (sin verificar la contraseña)"""
     db = None
     try:
         db = SessionLocal()
         usuario = db.query(Usuario).filter(Usuario.usu_usuario == username).first()
-        from middlewares.auth import compare_password
-        if not usuario or not compare_password(password, str(usuario.usu_contrasenia)):
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
+        if not usuario:
+            return None
         # Acceder al nombre del rol dentro de la sesión
-        user_type = None
-        if usuario.rol:
-            user_type = usuario.rol.rol_nombre
-        access_token = create_access_token(data={"sub": usuario.usu_usuario, "rol_id": usuario.usu_rol_id, "user_id": usuario.usu_id})
-        refresh_token = create_refresh_token(data={"sub": usuario.usu_usuario, "rol_id": usuario.usu_rol_id, "user_id": usuario.usu_id})
         return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
-            "user_id": usuario.usu_id,
-            "username": usuario.usu_usuario,
-            "user_type": user_type
+            "usu_id": usuario.usu_id,
+            "usu_usuario": usuario.usu_usuario,
+            "usu_contrasenia": str(usuario.usu_contrasenia),
+            "usu_rol_id": usuario.usu_rol_id,
+            "user_type": usuario.rol.rol_nombre if usuario.rol else None,
         }
     finally:
         if db:
             db.close()
 
+
+def build_login_response(candidate: dict):
+    token_data = {"sub": candidate["usu_usuario"], "rol_id": candidate["usu_rol_id"], "user_id": candidate["usu_id"]}
+    access_token = create_access_token(data=token_data)
+    refresh_token = create_refresh_token(data=token_data)
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "user_id": candidate["usu_id"],
+        "username": candidate["usu_usuario"],
+        "user_type": candidate["user_type"]
+    }
+
+
+def login(username: str, password: str):
+    from middlewares.auth import compare_password
+    candidate = get_login_candidate(username)
+    if not candidate or not compare_password(password, candidate["usu_contrasenia"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
+    return build_login_response(candidate)
+
+
+async def login_async(username: str, password: str):
+    """Login con la consulta en el threadpool y bcrypt en el pool de contraseñas"""
+    candidate = await run_in_threadpool(get_login_candidate, username)
+    if not candidate or not await password_pool.verify(password, candidate["usu_contrasenia"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
+    return build_login_response(candidate)
+
+
+async def create_usuario_async(usuario: UsuarioCreate):
+    """Alta de usuario con el hash en el pool de contraseñas y el INSERT en el threadpool"""
+    hashed_password = await password_pool.hash(usuario.usu_contrasenia)
+    return await run_in_threadpool(create_usuario, usuario, hashed_password)
+
 # Nueva función para borrar todos los usuarios
 def delete_all_usuarios():
     db = None
@@ -229,6 +269,7 @@ def delete_all_usuarios():
         for usuario in usuarios:
             db.delete(usuario)
         db.commit()
+        user_cache.clear()
         return True
     except Exception as e:
         if db: